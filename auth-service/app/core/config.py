@@ -5,6 +5,26 @@ class Settings(BaseSettings):
     JWT_SECRET: str
     JWT_ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
+    TOKEN_CACHE_MAX_ENTRIES: int = 10000
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_QUEUE: int = 64
+    PASSWORD_HASH_RETRY_AFTER_SECONDS: int = 1
+
+    # Database connection pool, per worker process. Keep workers x (DB_POOL_SIZE + DB_MAX_OVERFLOW),
+    # summed over all services, under the Postgres connection limit
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 5
+    DB_POOL_TIMEOUT_SECONDS: float = 10.0  # wait for a free connection, then fail the request
+    DB_POOL_RECYCLE_SECONDS: int = 1800  # reopen older connections before server or proxy idle limits drop them
+    DB_POOL_PRE_PING: bool = False  # test connections at checkout, at one round trip per checkout
+    DB_STATEMENT_CACHE_SIZE: int = 100  # prepared statements per connection; 0 behind pgbouncer in transaction mode
+
+    # Tracing (W3C traceparent); TRACE_EXPORTER is none, memory or file
+    SERVICE_NAME: str = "auth-service"
+    TRACE_EXPORTER: str = "none"
+    TRACE_SAMPLE_RATIO: float = 1.0  # share of new traces recorded; incoming traceparents decide for theirs
+    TRACE_FILE: str = "traces.jsonl"
+    TRACE_MEMORY_MAX_SPANS: int = 10000
 
     class Config:
         env_file = ".env"
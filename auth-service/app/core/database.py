@@ -1,6 +1,8 @@
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
+from app.core.metrics import instrument_engine, instrument_pool
+from app.core.tracing import trace_statement
 
 DATABASE_URL = settings.DATABASE_URL.replace(
     "postgresql://",
@@ -10,8 +12,19 @@ DATABASE_URL = settings.DATABASE_URL.replace(
 engine = create_async_engine(
     DATABASE_URL,
     echo=False,
-    pool_pre_ping=True
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+    pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+    connect_args={
+        # SQLAlchemy's per-connection prepared statement cache, and asyncpg's own
+        "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+    }
 )
+instrument_engine(engine, trace_statement)
+instrument_pool(engine, max_overflow=settings.DB_MAX_OVERFLOW)
 
 AsyncSessionLocal = sessionmaker(
     bind=engine,
@@ -20,5 +33,12 @@ AsyncSessionLocal = sessionmaker(
 )
 
 async def get_db():
+    """Request-scoped session.
+
+    Creating the session is cheap: it checks out a connection at its first
+    statement and returns it at each commit, so a request that fails auth
+    (routes resolve the current user first) or never queries holds none.
+    Repositories commit after reads that precede slow work for the same reason.
+    """
     async with AsyncSessionLocal() as session:
         yield session
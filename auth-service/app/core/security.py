@@ -1,7 +1,13 @@
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from jose import jwt, JWTError
 from passlib.context import CryptContext
 from app.core.config import settings
+from app.core.metrics import TOKEN_CACHE_LOOKUPS
 
 # Use a pure-Python secure scheme to avoid bcrypt backend issues in some environments
 pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
@@ -12,6 +18,66 @@ def hash_password(password: str) -> str:
 def verify_password(password: str, password_hash: str) -> bool:
     return pwd_context.verify(password, password_hash)
 
+class HashQueueFull(Exception):
+    """Raised when the password hashing pool is saturated and its queue is full"""
+
+class PasswordHashPool:
+    """Runs password hashing on a bounded thread pool, off the event loop.
+
+    At most `workers` hashes run at once (hashlib releases the GIL while
+    deriving keys); up to `max_queue` more wait their turn and anything
+    beyond that is shed with HashQueueFull.
+    """
+
+    def __init__(self, workers: int, max_queue: int):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.in_flight = 0
+        self.queued = 0
+        self.completed_total = 0
+        self.rejected_total = 0
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pwhash")
+        self._slots = asyncio.Semaphore(workers)
+
+    async def run(self, fn, *args):
+        if self.in_flight + self.queued >= self.workers + self.max_queue:
+            self.rejected_total += 1
+            raise HashQueueFull("Password hashing queue is full")
+
+        self.queued += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.queued -= 1
+        self.in_flight += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self.in_flight -= 1
+            self.completed_total += 1
+            self._slots.release()
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queued,
+            "completed_total": self.completed_total,
+            "rejected_total": self.rejected_total,
+        }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+hash_pool = PasswordHashPool(settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_MAX_QUEUE)
+
+async def hash_password_async(password: str) -> str:
+    return await hash_pool.run(hash_password, password)
+
+async def verify_password_async(password: str, password_hash: str) -> bool:
+    return await hash_pool.run(verify_password, password, password_hash)
+
 def create_access_token(user_id: str) -> str:
     expire = datetime.utcnow() + timedelta(
         minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
@@ -33,3 +99,42 @@ def verify_token(token: str) -> str:
         return payload.get("sub")
     except JWTError:
         return None
+
+# Verified tokens keyed by hash -> (user_id, exp); entries are dropped at `exp`
+_verified_tokens: "OrderedDict[str, tuple[str, float]]" = OrderedDict()
+_cache_hits = TOKEN_CACHE_LOOKUPS.labels("hit")
+_cache_misses = TOKEN_CACHE_LOOKUPS.labels("miss")
+
+def verify_token_cached(token: str) -> tuple[str, float | None] | None:
+    """Verify a JWT and return (user_id, exp), skipping re-verification of recently seen tokens"""
+    key = hashlib.sha256(token.encode()).hexdigest()
+    now = time.time()
+    cached = _verified_tokens.get(key)
+    if cached is not None:
+        if cached[1] > now:
+            _verified_tokens.move_to_end(key)
+            _cache_hits.inc()
+            return cached
+        del _verified_tokens[key]
+
+    _cache_misses.inc()
+    try:
+        payload = jwt.decode(
+            token,
+            settings.JWT_SECRET,
+            algorithms=[settings.JWT_ALGORITHM]
+        )
+    except JWTError:
+        return None
+    user_id, exp = payload.get("sub"), payload.get("exp")
+    if not user_id:
+        return None
+    if exp is None:
+        # Never cache tokens that do not expire
+        return user_id, None
+
+    verified = (user_id, float(exp))
+    _verified_tokens[key] = verified
+    while len(_verified_tokens) > settings.TOKEN_CACHE_MAX_ENTRIES:
+        _verified_tokens.popitem(last=False)
+    return verified
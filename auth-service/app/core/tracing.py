@@ -0,0 +1,334 @@
+"""Lightweight distributed tracing with W3C Trace Context propagation.
+
+Spans follow the OpenTelemetry data model (trace and span ids, parent,
+kind, attributes, status). They travel between services in the standard
+`traceparent` header, so one request can be followed across services,
+Postgres and HTTP upstreams. Finished spans go to the exporter named by
+`TRACE_EXPORTER`:
+
+- `none` (default): tracing is off and adds no per-request work
+- `memory`: keeps the newest `TRACE_MEMORY_MAX_SPANS` spans, served at
+  `GET /debug/traces/{trace_id}`
+- `file`: appends one JSON object per span to `TRACE_FILE`
+
+`TRACE_SAMPLE_RATIO` is the share of new traces that are recorded. The
+decision is derived from the trace id, and an incoming `traceparent`
+decides for the whole trace, so every service keeps or drops the same
+traces.
+"""
+import json
+import random
+import re
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Mapping
+import httpx
+from app.core.config import settings
+
+# version-trace_id-parent_id-flags; only version 00 is defined
+TRACEPARENT = re.compile(r"00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})")
+INVALID_TRACE_ID = "0" * 32
+
+class Span:
+    __slots__ = (
+        "name", "kind", "trace_id", "span_id", "parent_id", "sampled",
+        "start_ns", "end_ns", "status", "attributes"
+    )
+
+    def __init__(
+        self,
+        name: str,
+        trace_id: str,
+        span_id: str,
+        parent_id: str | None,
+        sampled: bool,
+        kind: str = "internal",
+        attributes: Mapping[str, Any] | None = None
+    ):
+        self.name = name
+        self.kind = kind
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.sampled = sampled
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.status = "ok"
+        self.attributes: Dict[str, Any] = dict(attributes) if attributes and sampled else {}
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        if self.sampled:
+            self.attributes[key] = value
+
+    def record_exception(self, error: BaseException) -> None:
+        self.status = "error"
+        if self.sampled:
+            self.attributes["exception.type"] = type(error).__name__
+            self.attributes["exception.message"] = str(error)[:500]
+
+    def to_dict(self, service: str) -> dict:
+        return {
+            "service": service,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": (self.end_ns - self.start_ns) / 1e6,
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+# Handed out while tracing is off; never exported
+NOOP_SPAN = Span("noop", INVALID_TRACE_ID, "0" * 16, None, False)
+
+class Sampler:
+    """Parent-based ratio sampler.
+
+    Root spans are kept when the low 64 bits of the trace id fall under
+    `ratio`, so the decision is the same in every service; child spans
+    follow their parent's sampled flag.
+    """
+
+    def __init__(self, ratio: float):
+        self.bound = int(max(0.0, min(ratio, 1.0)) * (1 << 64))
+
+    def sample(self, trace_id: str) -> bool:
+        return int(trace_id[16:], 16) < self.bound
+
+class InMemoryExporter:
+    """Keeps the newest `max_spans` finished spans, for local runs and debugging"""
+
+    def __init__(self, max_spans: int):
+        self._spans: deque = deque(maxlen=max_spans)
+
+    def export(self, span: dict) -> None:
+        self._spans.append(span)
+
+    def spans(self, trace_id: str | None = None) -> List[dict]:
+        return [span for span in self._spans if trace_id is None or span["trace_id"] == trace_id]
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self._spans.clear()
+
+class FileExporter:
+    """Appends spans to `path` as JSON lines; writes are flushed whenever a request's root span ends.
+
+    Several local services may share one file to collect whole traces in one place.
+    """
+
+    def __init__(self, path: str):
+        self._file = open(path, "a", encoding="utf-8")
+
+    def export(self, span: dict) -> None:
+        self._file.write(json.dumps(span, default=str) + "\n")
+
+    def flush(self) -> None:
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+_current: ContextVar[Span | None] = ContextVar("current_span", default=None)
+
+def current_span() -> Span:
+    """The active span, or NOOP_SPAN outside any span"""
+    return _current.get() or NOOP_SPAN
+
+class Tracer:
+    def __init__(self, service: str, exporter=None, sampler: Sampler | None = None):
+        self.service = service
+        self.exporter = exporter
+        self.sampler = sampler or Sampler(1.0)
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+
+    def start_span(
+        self,
+        name: str,
+        kind: str = "internal",
+        attributes: Mapping[str, Any] | None = None,
+        traceparent: str | None = None
+    ) -> Span:
+        """A new span under the remote `traceparent` if one is given, else under the current span.
+
+        The span is not made current; `span()` does that.
+        """
+        parent = _current.get() if traceparent is None else None
+        if parent is not None:
+            return Span(name, parent.trace_id, _new_span_id(), parent.span_id, parent.sampled, kind, attributes)
+
+        match = TRACEPARENT.fullmatch(traceparent.strip()) if traceparent else None
+        if match and match.group(1) != INVALID_TRACE_ID:
+            trace_id, parent_id, flags = match.groups()
+            return Span(name, trace_id, _new_span_id(), parent_id, int(flags, 16) & 1 == 1, kind, attributes)
+
+        trace_id = f"{random.getrandbits(128):032x}"
+        return Span(name, trace_id, _new_span_id(), None, self.sampler.sample(trace_id), kind, attributes)
+
+    def end_span(self, span: Span, end_ns: int | None = None) -> None:
+        span.end_ns = end_ns or time.time_ns()
+        if span.sampled and self.exporter is not None:
+            self.exporter.export(span.to_dict(self.service))
+            if span.kind == "server":
+                self.exporter.flush()
+
+    @contextmanager
+    def span(
+        self, name: str, kind: str = "internal", attributes: Mapping[str, Any] | None = None
+    ) -> Iterator[Span]:
+        """Run the block in a child of the current span; exceptions mark the span as failed"""
+        if self.exporter is None:
+            yield NOOP_SPAN
+            return
+        span = self.start_span(name, kind, attributes)
+        token = _current.set(span)
+        try:
+            yield span
+        except Exception as e:
+            span.record_exception(e)
+            raise
+        finally:
+            _reset(token)
+            self.end_span(span)
+
+    def shutdown(self) -> None:
+        if self.exporter is not None:
+            self.exporter.flush()
+            self.exporter.close()
+
+def _new_span_id() -> str:
+    return f"{random.getrandbits(64):016x}"
+
+def _reset(token) -> None:
+    try:
+        _current.reset(token)
+    except ValueError:
+        pass  # ended from another context, e.g. an async generator closed by a different task
+
+def _build_tracer() -> Tracer:
+    exporter = None
+    if settings.TRACE_EXPORTER == "memory":
+        exporter = InMemoryExporter(settings.TRACE_MEMORY_MAX_SPANS)
+    elif settings.TRACE_EXPORTER == "file":
+        exporter = FileExporter(settings.TRACE_FILE)
+    return Tracer(settings.SERVICE_NAME, exporter, Sampler(settings.TRACE_SAMPLE_RATIO))
+
+tracer = _build_tracer()
+
+class TracingMiddleware:
+    """ASGI middleware opening a server span per request, continuing an incoming `traceparent`.
+
+    The span is named after the matched route template. Its trace id is
+    returned in an `X-Trace-Id` response header so a slow request can be
+    looked up afterwards.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not tracer.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        incoming = None
+        for key, value in scope["headers"]:
+            if key == b"traceparent":
+                incoming = value.decode("latin-1")
+                break
+        method = scope["method"]
+        span = tracer.start_span(
+            method, "server", {"http.method": method, "http.target": scope["path"]}, incoming
+        )
+        trace_header = (b"x-trace-id", span.trace_id.encode())
+
+        async def send_with_trace_id(message):
+            if message["type"] == "http.response.start":
+                span.set_attribute("http.status_code", message["status"])
+                if message["status"] >= 500:
+                    span.status = "error"
+                message = {**message, "headers": [*message.get("headers", ()), trace_header]}
+            await send(message)
+
+        token = _current.set(span)
+        try:
+            await self.app(scope, receive, send_with_trace_id)
+        except Exception as e:
+            span.record_exception(e)
+            raise
+        finally:
+            _reset(token)
+            route = scope.get("route")
+            span.name = f"{method} {getattr(route, 'path', None) or '<unmatched>'}"
+            tracer.end_span(span)
+
+class TracingTransport(httpx.AsyncBaseTransport):
+    """Wraps an httpx transport: a client span per request, with `traceparent` injected"""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        self._transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        attributes = {
+            "http.method": request.method,
+            "http.url": str(request.url.copy_with(query=None)),
+            "server.address": request.url.host,
+        }
+        with tracer.span(f"HTTP {request.method}", "client", attributes) as span:
+            request.headers["traceparent"] = span.traceparent
+            response = await self._transport.handle_async_request(request)
+            span.set_attribute("http.status_code", response.status_code)
+            if response.status_code >= 500:
+                span.status = "error"
+            return response
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+def instrument_client(client: httpx.AsyncClient) -> httpx.AsyncClient:
+    """Trace every request sent through `client` (a no-op while tracing is off).
+
+    Wraps the client's own transports in place, like the OpenTelemetry httpx
+    instrumentation does, so pool limits and proxy settings are untouched.
+    """
+    if tracer.enabled:
+        client._transport = TracingTransport(client._transport)
+        client._mounts = {
+            pattern: TracingTransport(transport) if transport is not None else None
+            for pattern, transport in client._mounts.items()
+        }
+    return client
+
+def trace_statement(statement: str, started: float, ended: float) -> None:
+    """Record an executed SQL statement (perf_counter times) as a span under the current one"""
+    parent = _current.get()
+    if parent is None or not parent.sampled:
+        return
+    now_ns, now = time.time_ns(), time.perf_counter()
+    head = statement[:16].split(None, 1)
+    operation = head[0].upper() if head else ""
+    span = Span(
+        f"db {operation}",
+        parent.trace_id,
+        _new_span_id(),
+        parent.span_id,
+        True,
+        "client",
+        {"db.system": "postgresql", "db.operation": operation, "db.statement": statement[:2000]}
+    )
+    span.start_ns = now_ns - int((now - started) * 1e9)
+    tracer.end_span(span, now_ns - int((now - ended) * 1e9))
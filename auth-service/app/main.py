@@ -1,8 +1,20 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from app.core.database import engine
+from app.core.metrics import MetricsMiddleware, metrics_response
+from app.core.tracing import InMemoryExporter, TracingMiddleware, tracer
+from app.core.security import hash_pool
 from app.routes.auth import router as auth_router
 
-app = FastAPI(title="Auth Service")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    hash_pool.shutdown()
+    await engine.dispose()
+    tracer.shutdown()
+
+app = FastAPI(title="Auth Service", lifespan=lifespan)
 
 # ✅ Explicit allowed origins
 origins = [
@@ -20,4 +32,20 @@ app.add_middleware(
     expose_headers=["*"],           # optional but helpful
 )
 
+# The last added runs outermost: tracing wraps metrics, and both wrap CORS,
+# so the recorded latency and the server span include CORS handling
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(TracingMiddleware)
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint"""
+    return metrics_response()
+
+if isinstance(tracer.exporter, InMemoryExporter):
+    @app.get("/debug/traces/{trace_id}", include_in_schema=False)
+    async def trace_spans(trace_id: str):
+        """This service's recorded spans of one trace (TRACE_EXPORTER=memory only)"""
+        return tracer.exporter.spans(trace_id)
+
 app.include_router(auth_router)
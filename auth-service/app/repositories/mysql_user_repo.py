@@ -26,6 +26,9 @@ class MySQLUserRepository:
             select(UserTable).where(UserTable.email == email)
         )
         row = result.scalar_one_or_none()
+        # End the read transaction: login and register hash the password next,
+        # and the connection should be back in the pool meanwhile
+        await self.db.commit()
         if not row:
             return None
         return User(
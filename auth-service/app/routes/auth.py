@@ -2,11 +2,20 @@ from fastapi import APIRouter, Depends, HTTPException, Header
 from app.schemas.user import RegisterRequest, LoginRequest
 from app.services.auth_service import AuthService
 from app.utils.dependencies import get_auth_service
-from app.core.security import verify_token
+from app.core.config import settings
+from app.core.security import HashQueueFull, hash_pool, verify_token_cached
 
 router = APIRouter(prefix="/auth", tags=["Auth"])
 
 
+def _busy(e: HashQueueFull) -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail=str(e),
+        headers={"Retry-After": str(settings.PASSWORD_HASH_RETRY_AFTER_SECONDS)}
+    )
+
+
 @router.post("/register")
 async def register(
     req: RegisterRequest,
@@ -17,6 +26,8 @@ async def register(
         return {"id": user.id, "email": user.email}
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except HashQueueFull as e:
+        raise _busy(e)
 
 
 @router.post("/login")
@@ -28,6 +39,8 @@ async def login(
         return await service.login(req.email, req.password)
     except ValueError as e:
         raise HTTPException(status_code=401, detail=str(e))
+    except HashQueueFull as e:
+        raise _busy(e)
 
 
 @router.get("/validate")
@@ -44,36 +57,16 @@ async def validate_token(authorization: str = Header(None)):
     except ValueError:
         raise HTTPException(status_code=401, detail="Invalid authorization header format")
     
-    # Verify token
-    user_id = verify_token(token)
-    if not user_id:
+    # Verify token locally (signature check results are cached until expiry)
+    verified = verify_token_cached(token)
+    if not verified:
         raise HTTPException(status_code=401, detail="Invalid or expired token")
     
-    return {"user_id": user_id, "valid": True}
-from fastapi import APIRouter, Depends, HTTPException
-from app.schemas.user import RegisterRequest, LoginRequest
-from app.services.auth_service import AuthService
-from app.utils.dependencies import get_auth_service
-
-router = APIRouter(prefix="/auth", tags=["Auth"])
+    user_id, exp = verified
+    return {"user_id": user_id, "valid": True, "exp": exp}
 
-@router.post("/register")
-async def register(
-    req: RegisterRequest,
-    service: AuthService = Depends(get_auth_service)
-):
-    try:
-        user = await service.register(req.email, req.password)
-        return {"id": user.id, "email": user.email}
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
 
-@router.post("/login")
-async def login(
-    req: LoginRequest,
-    service: AuthService = Depends(get_auth_service)
-):
-    try:
-        return await service.login(req.email, req.password)
-    except ValueError as e:
-        raise HTTPException(status_code=401, detail=str(e))
+@router.get("/metrics/hashing")
+async def hashing_metrics():
+    """Password hashing pool utilisation and queue depth"""
+    return hash_pool.stats()
@@ -1,5 +1,5 @@
 from app.repositories.user_repository import UserRepository
-from app.core.security import hash_password, verify_password, create_access_token
+from app.core.security import hash_password_async, verify_password_async, create_access_token
 
 class AuthService:
     def __init__(self, user_repo: UserRepository):
@@ -9,12 +9,12 @@ class AuthService:
         if await self.user_repo.get_by_email(email):
             raise ValueError("User already exists")
 
-        password_hash = hash_password(password)
+        password_hash = await hash_password_async(password)
         return await self.user_repo.create(email, password_hash)
 
     async def login(self, email: str, password: str):
         user = await self.user_repo.get_by_email(email)
-        if not user or not verify_password(password, user.password_hash):
+        if not user or not await verify_password_async(password, user.password_hash):
             raise ValueError("Invalid credentials")
 
         token = create_access_token(user.id)
@@ -0,0 +1,108 @@
+"""Micro-benchmark: list endpoint serialization, model path vs. streamed rows.
+
+Compares, for a page of message rows:
+
+- `model`:  rows -> Message dataclasses -> MessageResponse models -> FastAPI
+            response_model validation and JSON encoding (the default path)
+- `stream`: rows -> JSON chunks via `app.utils.json_stream` (`?stream=json`)
+- `ndjson`: the same, as NDJSON (`?stream=ndjson`)
+
+Both go through a real FastAPI app in-process, so routing and response
+handling are included; the database is not. Run from the repository root:
+
+    python benchmarks/list_serialization.py --rows 500 --repeat 50
+    python benchmarks/list_serialization.py --rows 500 --no-orjson
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "chat-service"))
+
+import httpx
+from fastapi import FastAPI
+from app.domain.chat import Message
+from app.schemas.chat import MessageResponse
+from app.utils import json_stream
+
+COLUMNS = ("id", "conversation_id", "role", "content", "created_at")
+
+def make_rows(count: int, content_size: int) -> list[tuple]:
+    conversation_id = uuid.uuid4()
+    start = datetime(2024, 1, 1)
+    body = ("lorem ipsum dolor sit amet " * (content_size // 27 + 1))[:content_size]
+    return [
+        (uuid.uuid4(), conversation_id, "user" if i % 2 else "assistant", f"{i} {body}", start + timedelta(seconds=i))
+        for i in range(count)
+    ]
+
+def build_app(rows: list[tuple]) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/model", response_model=list[MessageResponse])
+    async def model_path():
+        messages = [
+            Message(id=str(r[0]), conversation_id=str(r[1]), role=r[2], content=r[3], created_at=r[4])
+            for r in rows
+        ]
+        return [
+            MessageResponse(
+                id=m.id, conversation_id=m.conversation_id, role=m.role, content=m.content, created_at=m.created_at
+            )
+            for m in messages
+        ]
+
+    @app.get("/stream")
+    async def stream_path(fmt: json_stream.StreamFormat = "json"):
+        return json_stream.stream_rows(COLUMNS, rows, fmt)
+
+    return app
+
+async def measure(client: httpx.AsyncClient, url: str, repeat: int) -> tuple[float, float, int]:
+    """Median latency (ms), peak traced memory (KiB) and body size for `url`"""
+    await client.get(url)  # warm up
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = await client.get(url)
+        timings.append((time.perf_counter() - started) * 1000)
+    tracemalloc.start()
+    await client.get(url)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(timings), peak / 1024, len(response.content)
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=500)
+    parser.add_argument("--content-size", type=int, default=200, help="characters per message")
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--no-orjson", action="store_true", help="use the pydantic-core encoder")
+    args = parser.parse_args()
+    if args.no_orjson:
+        json_stream.orjson = None
+
+    app = build_app(make_rows(args.rows, args.content_size))
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        model = await client.get("/model")
+        streamed = await client.get("/stream")
+        assert model.json() == streamed.json(), "the two paths must return the same document"
+
+        encoder = "pydantic-core" if json_stream.orjson is None else "orjson"
+        print(f"{args.rows} rows x {args.content_size} chars, encoder={encoder}, median of {args.repeat}")
+        print(f"{'path':<8} {'ms':>9} {'peak KiB':>10} {'bytes':>10} {'speedup':>8}")
+        baseline = None
+        for name, url in (("model", "/model"), ("stream", "/stream?fmt=json"), ("ndjson", "/stream?fmt=ndjson")):
+            ms, peak, size = await measure(client, url, args.repeat)
+            baseline = baseline or ms
+            print(f"{name:<8} {ms:>9.2f} {peak:>10.0f} {size:>10} {baseline / ms:>7.1f}x")
+
+if __name__ == "__main__":
+    asyncio.run(main())
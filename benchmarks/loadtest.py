@@ -0,0 +1,421 @@
+"""Load test: drive the auth, project and chat services with a realistic request mix.
+
+With `--spawn`, starts the stub LLM (`benchmarks/stubs.py`), the three services
+(or the stub auth, with `--stub-auth`) as local processes against
+`--database-url`. Without it, targets services that are already running. Each
+virtual user registers and creates a project once, then loops over weighted
+actions until `--duration` is up:
+
+- `login`                POST /auth/login
+- `list_projects`        GET /projects
+- `create_conversation`  POST /conversations
+- `chat_turn`            POST /conversations/{id}/messages; the user's current
+                         conversation grows up to `--turns-per-conversation`
+- `chat_stream`          the same, streamed; `chat_stream.first_byte` is also
+                         reported
+- `list_messages`        GET /conversations/{id}/messages
+
+The report (RPS, p50/p95/p99 ms and errors per action) is written as JSON to
+`--output` (stdout by default) and summarized on stderr. `--baseline` compares
+it with an earlier report and exits with status 1 when an action's p95
+regressed by more than `--tolerance`:
+
+    createdb omnichat_bench
+    python benchmarks/loadtest.py --spawn --create-schema \\
+        --database-url postgresql://postgres@localhost/omnichat_bench \\
+        --users 20 --duration 60 --output results.json
+    python benchmarks/loadtest.py --spawn --database-url ... --baseline results.json
+
+Same `--seed`, same request sequence per user; the stub LLM's latencies
+come from `--llm-args` and its own `--seed`.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shlex
+import subprocess
+import sys
+import time
+import uuid
+from collections import Counter, defaultdict
+from pathlib import Path
+from urllib.parse import urlparse
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Service directory and the module holding its SQLAlchemy Base
+SERVICES = {
+    "auth": ("auth-service", "app.repositories.mysql_user_repo"),
+    "project": ("project-service", "app.repositories.postgres_project_repo"),
+    "chat": ("chat-service", "app.repositories.postgres_chat_repo"),
+}
+
+CREATE_SCHEMA = """
+import asyncio
+from app.core.database import engine
+from {module} import Base
+
+async def main():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    await engine.dispose()
+
+asyncio.run(main())
+"""
+
+DEFAULT_MIX = "login=1,list_projects=4,create_conversation=1,chat_turn=6,chat_stream=4,list_messages=3"
+
+class Recorder:
+    """Latencies and outcomes per action, ignoring everything before `measure_from`"""
+
+    def __init__(self, measure_from: float):
+        self.measure_from = measure_from
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: Counter = Counter()
+        self.statuses: dict[str, Counter] = defaultdict(Counter)
+
+    def record(self, action: str, started: float, seconds: float, status: int | str) -> None:
+        if started < self.measure_from:
+            return
+        self.latencies[action].append(seconds)
+        self.statuses[action][str(status)] += 1
+        if not isinstance(status, int) or status >= 400:
+            self.errors[action] += 1
+
+def percentile(ordered: list[float], q: float) -> float:
+    """Nearest-rank percentile of an ascending list"""
+    if not ordered:
+        return 0.0
+    rank = max(1, -(-len(ordered) * q // 100))  # ceil
+    return ordered[int(rank) - 1]
+
+def summarize(recorder: Recorder, elapsed: float, config: dict) -> dict:
+    actions = {}
+    total = errors = 0
+    for action in sorted(recorder.latencies):
+        ordered = sorted(recorder.latencies[action])
+        count = len(ordered)
+        failed = recorder.errors[action]
+        if not action.endswith(".first_byte"):  # a sub-measurement of its request
+            total += count
+            errors += failed
+        actions[action] = {
+            "count": count,
+            "rps": round(count / elapsed, 2),
+            "errors": failed,
+            "error_rate": round(failed / count, 4),
+            "mean_ms": round(sum(ordered) / count * 1000, 2),
+            "p50_ms": round(percentile(ordered, 50) * 1000, 2),
+            "p95_ms": round(percentile(ordered, 95) * 1000, 2),
+            "p99_ms": round(percentile(ordered, 99) * 1000, 2),
+            "max_ms": round(ordered[-1] * 1000, 2),
+            "statuses": dict(recorder.statuses[action]),
+        }
+    return {
+        "config": config,
+        "elapsed_seconds": round(elapsed, 2),
+        "total": {
+            "requests": total,
+            "rps": round(total / elapsed, 2) if elapsed else 0.0,
+            "errors": errors,
+        },
+        "actions": actions,
+    }
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Regressions of `report` against `baseline`: p95 beyond `tolerance`, or more errors"""
+    regressions = []
+    for action, current in report["actions"].items():
+        before = baseline.get("actions", {}).get(action)
+        if before is None:
+            continue
+        if before["p95_ms"] > 0 and current["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{action}: p95 {before['p95_ms']}ms -> {current['p95_ms']}ms")
+        if current["error_rate"] > before["error_rate"] + 0.01:
+            regressions.append(f"{action}: error rate {before['error_rate']:.2%} -> {current['error_rate']:.2%}")
+    return regressions
+
+class VirtualUser:
+    def __init__(self, index: int, client: httpx.AsyncClient, args: argparse.Namespace, recorder: Recorder):
+        self.client = client
+        self.args = args
+        self.recorder = recorder
+        self.rng = random.Random(f"{args.seed}-{index}")
+        self.email = f"load-{args.run_id}-{index}@example.com"
+        self.password = "load-test-password"
+        self.headers: dict[str, str] = {}
+        self.project_id: str | None = None
+        self.conversation_id: str | None = None
+        self.turns = 0
+
+    async def request(self, action: str, method: str, url: str, **kwargs) -> httpx.Response | None:
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, headers=self.headers, **kwargs)
+        except httpx.HTTPError as e:
+            self.recorder.record(action, started, time.perf_counter() - started, type(e).__name__)
+            return None
+        self.recorder.record(action, started, time.perf_counter() - started, response.status_code)
+        return response if response.status_code < 400 else None
+
+    async def setup(self) -> bool:
+        """Register, log in and create a project (not measured)"""
+        auth = self.args.auth_url
+        response = await self.client.post(
+            f"{auth}/auth/register", json={"email": self.email, "password": self.password}
+        )
+        if response.status_code >= 400:
+            print(f"register failed for {self.email}: {response.status_code} {response.text}", file=sys.stderr)
+            return False
+        if not await self.login(record=False):
+            return False
+        response = await self.client.post(
+            f"{self.args.project_url}/projects",
+            json={"name": f"load test {self.email}", "description": None},
+            headers=self.headers,
+        )
+        if response.status_code >= 400:
+            print(f"create project failed: {response.status_code} {response.text}", file=sys.stderr)
+            return False
+        self.project_id = response.json()["id"]
+        return await self.create_conversation(record=False)
+
+    async def login(self, record: bool = True) -> bool:
+        self.headers = {}
+        body = {"email": self.email, "password": self.password}
+        if record:
+            response = await self.request("login", "POST", f"{self.args.auth_url}/auth/login", json=body)
+        else:
+            response = await self.client.post(f"{self.args.auth_url}/auth/login", json=body)
+        if response is None or response.status_code >= 400:
+            return False
+        self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        return True
+
+    async def create_conversation(self, record: bool = True) -> bool:
+        url = f"{self.args.chat_url}/conversations"
+        params = {"project_id": self.project_id}
+        if record:
+            response = await self.request("create_conversation", "POST", url, params=params)
+        else:
+            response = await self.client.post(url, params=params, headers=self.headers)
+        if response is None or response.status_code >= 400:
+            return False
+        self.conversation_id = response.json()["id"]
+        self.turns = 0
+        return True
+
+    def _message(self) -> dict:
+        words = self.rng.randint(5, self.args.message_words)
+        return {"content": " ".join(self.rng.choice(("hello", "please", "explain", "why", "the", "data")) for _ in range(words))}
+
+    async def chat_turn(self) -> None:
+        url = f"{self.args.chat_url}/conversations/{self.conversation_id}/messages"
+        await self.request("chat_turn", "POST", url, json=self._message())
+        self.turns += 1
+
+    async def chat_stream(self) -> None:
+        url = f"{self.args.chat_url}/conversations/{self.conversation_id}/messages/stream"
+        started = time.perf_counter()
+        status: int | str
+        try:
+            async with self.client.stream("POST", url, json=self._message(), headers=self.headers) as response:
+                status = response.status_code
+                first = True
+                async for chunk in response.aiter_bytes():
+                    if first:
+                        first = False
+                        self.recorder.record("chat_stream.first_byte", started, time.perf_counter() - started, status)
+                    if b"event: error" in chunk:
+                        status = "stream_error"  # the turn failed after the 200 was sent
+        except httpx.HTTPError as e:
+            status = type(e).__name__
+        self.recorder.record("chat_stream", started, time.perf_counter() - started, status)
+        self.turns += 1
+
+    async def run(self, deadline: float, actions: list[str], weights: list[float]) -> None:
+        if not await self.setup():
+            return
+        while time.perf_counter() < deadline:
+            action = self.rng.choices(actions, weights)[0]
+            if action in ("chat_turn", "chat_stream") and self.turns >= self.args.turns_per_conversation:
+                action = "create_conversation"  # start the next multi-turn conversation
+            if action == "login":
+                await self.login()
+            elif action == "list_projects":
+                await self.request("list_projects", "GET", f"{self.args.project_url}/projects")
+            elif action == "create_conversation":
+                await self.create_conversation()
+            elif action == "chat_turn":
+                await self.chat_turn()
+            elif action == "chat_stream":
+                await self.chat_stream()
+            elif action == "list_messages":
+                await self.request(
+                    "list_messages", "GET", f"{self.args.chat_url}/conversations/{self.conversation_id}/messages"
+                )
+            if self.args.think_ms > 0:
+                await asyncio.sleep(self.rng.expovariate(1000 / self.args.think_ms))
+
+def parse_mix(mix: str) -> tuple[list[str], list[float]]:
+    pairs = [item.split("=") for item in mix.split(",") if item.strip()]
+    return [name.strip() for name, _ in pairs], [float(weight) for _, weight in pairs]
+
+def _port(url: str) -> str:
+    return str(urlparse(url).port)
+
+def spawn(args: argparse.Namespace) -> list[subprocess.Popen]:
+    """Start the stub LLM and the services as child processes"""
+    env = {
+        **os.environ,
+        "DATABASE_URL": args.database_url,
+        "JWT_SECRET": args.jwt_secret,
+        "AUTH_SERVICE_URL": args.auth_url,
+        "PROJECT_SERVICE_URL": args.project_url,
+        "LLM_PROVIDER": "openai",
+        "LLM_PROVIDERS": "",
+        "OPENAI_API_KEY": "stub",
+        "OPENAI_BASE_URL": f"{args.llm_url}/v1",
+    }
+    if args.create_schema:
+        for name, (directory, module) in SERVICES.items():
+            if name == "auth" and args.stub_auth:
+                continue
+            subprocess.run(
+                [sys.executable, "-c", CREATE_SCHEMA.format(module=module)],
+                cwd=ROOT / directory, env=env, check=True
+            )
+
+    stubs = str(ROOT / "benchmarks" / "stubs.py")
+    processes = [subprocess.Popen(
+        [sys.executable, stubs, "llm", "--port", _port(args.llm_url), "--seed", str(args.seed),
+         *shlex.split(args.llm_args)],
+        env=env
+    )]
+    for name, (directory, _) in SERVICES.items():
+        url = getattr(args, f"{name}_url")
+        if name == "auth" and args.stub_auth:
+            command = [sys.executable, stubs, "auth", "--port", _port(url), "--jwt-secret", args.jwt_secret]
+        else:
+            command = [
+                sys.executable, "-m", "uvicorn", "app.main:app", "--port", _port(url),
+                "--workers", str(args.workers), "--log-level", "warning"
+            ]
+        processes.append(subprocess.Popen(command, cwd=ROOT / directory, env=env))
+    return processes
+
+async def wait_ready(client: httpx.AsyncClient, urls: list[str], timeout: float) -> None:
+    deadline = time.perf_counter() + timeout
+    for url in urls:
+        while True:
+            try:
+                # Any HTTP response means the server is up
+                await client.get(url)
+                break
+            except httpx.TransportError:
+                if time.perf_counter() > deadline:
+                    raise RuntimeError(f"{url} did not start within {timeout}s")
+                await asyncio.sleep(0.2)
+
+async def run(args: argparse.Namespace) -> dict:
+    actions, weights = parse_mix(args.mix)
+    limits = httpx.Limits(max_connections=args.users * 2, max_keepalive_connections=args.users * 2)
+    async with httpx.AsyncClient(limits=limits, timeout=args.timeout) as client:
+        if args.spawn:
+            await wait_ready(
+                client, [f"{args.llm_url}/stats", args.auth_url, args.project_url, args.chat_url], args.startup_timeout
+            )
+        started = time.perf_counter()
+        recorder = Recorder(measure_from=started + args.warmup)
+        deadline = started + args.warmup + args.duration
+        users = [VirtualUser(index, client, args, recorder) for index in range(args.users)]
+        await asyncio.gather(*(user.run(deadline, actions, weights) for user in users))
+        elapsed = time.perf_counter() - recorder.measure_from
+
+    config = {
+        key: getattr(args, key)
+        for key in ("users", "duration", "warmup", "mix", "turns_per_conversation", "think_ms", "seed",
+                    "workers", "stub_auth", "llm_args")
+    }
+    return summarize(recorder, max(elapsed, 1e-9), config)
+
+def print_summary(report: dict) -> None:
+    total = report["total"]
+    print(
+        f"{total['requests']} requests in {report['elapsed_seconds']}s: "
+        f"{total['rps']} req/s, {total['errors']} errors",
+        file=sys.stderr
+    )
+    print(f"{'action':<24} {'count':>7} {'rps':>8} {'err%':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}", file=sys.stderr)
+    for action, stats in report["actions"].items():
+        print(
+            f"{action:<24} {stats['count']:>7} {stats['rps']:>8} {stats['error_rate']:>6.1%} "
+            f"{stats['p50_ms']:>9} {stats['p95_ms']:>9} {stats['p99_ms']:>9}",
+            file=sys.stderr
+        )
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=10, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30.0, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=5.0, help="seconds run before measuring")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="action=weight pairs")
+    parser.add_argument("--turns-per-conversation", type=int, default=8)
+    parser.add_argument("--message-words", type=int, default=40, help="longest user message, in words")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="mean pause between a user's actions")
+    parser.add_argument("--timeout", type=float, default=60.0, help="per-request timeout, seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--run-id", default=uuid.uuid4().hex[:8], help="makes test accounts unique per run")
+    parser.add_argument("--auth-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--project-url", default="http://127.0.0.1:8001")
+    parser.add_argument("--chat-url", default="http://127.0.0.1:8002")
+    parser.add_argument("--llm-url", default="http://127.0.0.1:9100", help="stub LLM (with --spawn)")
+    parser.add_argument("--spawn", action="store_true", help="start the stub LLM and services locally")
+    parser.add_argument("--stub-auth", action="store_true", help="with --spawn, run the stub auth service")
+    parser.add_argument("--create-schema", action="store_true", help="with --spawn, create missing tables first")
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL", ""))
+    parser.add_argument("--jwt-secret", default=os.getenv("JWT_SECRET", "load-test-secret"))
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers per spawned service")
+    parser.add_argument("--llm-args", default="", help='extra stub LLM options, e.g. "--ttft-ms 500 --error-rate 0.02"')
+    parser.add_argument("--startup-timeout", type=float, default=30.0)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--baseline", help="earlier JSON report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p95 regression vs. the baseline")
+    args = parser.parse_args()
+    if args.spawn and not args.database_url:
+        parser.error("--spawn needs --database-url (or DATABASE_URL)")
+    return args
+
+def main() -> int:
+    args = parse_args()
+    processes = spawn(args) if args.spawn else []
+    try:
+        report = asyncio.run(run(args))
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    print_summary(report)
+    body = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(body + "\n")
+    else:
+        print(body)
+
+    if args.baseline:
+        regressions = compare(report, json.loads(Path(args.baseline).read_text()), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+"""Micro-benchmark: cost of the Prometheus instrumentation in `app.core.metrics`.
+
+Measures, with and without instrumentation:
+
+- `record`:  one histogram observation / counter increment through `labels()`
+- `request`: a request through a FastAPI app in-process, with and without
+             `MetricsMiddleware` (routing and response handling included)
+- `query`:   a `SELECT 1` on an in-memory SQLite engine, with and without
+             the `instrument_engine` execute hooks
+- `scrape`:  rendering `/metrics` for the series recorded above
+
+The request and query baselines are deliberately trivial, so the overhead
+shown is an upper bound of what a real request or query would see. Run from
+the repository root:
+
+    python benchmarks/metrics_overhead.py --requests 2000 --queries 20000
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "chat-service"))
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import create_engine, text
+from app.core import metrics
+
+def per_call_ns(fn, calls: int) -> float:
+    started = time.perf_counter_ns()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter_ns() - started) / calls
+
+def bench_record(calls: int) -> None:
+    histogram = metrics.Histogram("bench_seconds", "bench", ("method", "route", "status"), registry=None)
+    counter = metrics.Counter("bench_total", "bench", ("result",), registry=None)
+    hit = counter.labels("hit")
+    print(f"{'record':<28} {'ns/op':>9}")
+    for name, fn in (
+        ("histogram.labels().observe", lambda: histogram.labels("GET", "/items/{item_id}", "200").observe(0.0123)),
+        ("counter child .inc", hit.inc),
+        ("time.perf_counter (ref)", time.perf_counter),
+    ):
+        print(f"{name:<28} {per_call_ns(fn, calls):>9.0f}")
+
+def build_app(instrumented: bool) -> FastAPI:
+    app = FastAPI()
+    if instrumented:
+        app.add_middleware(metrics.MetricsMiddleware)
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: int):
+        return {"id": item_id}
+
+    return app
+
+async def request_us(apps: list[FastAPI], requests: int, rounds: int) -> list[float]:
+    """Best per-request time (us) for each app, alternating between them every round"""
+    clients = [
+        httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") for app in apps
+    ]
+    best = [float("inf")] * len(apps)
+    per_round = requests // rounds
+    for client in clients:
+        await client.get("/items/1")  # warm up
+    for _ in range(rounds):
+        for index, client in enumerate(clients):
+            started = time.perf_counter()
+            for i in range(per_round):
+                await client.get(f"/items/{i}")
+            best[index] = min(best[index], (time.perf_counter() - started) / per_round * 1e6)
+    for client in clients:
+        await client.aclose()
+    return best
+
+def query_us(queries: int, rounds: int) -> list[float]:
+    """Best per-query time (us) on a plain and an instrumented engine, alternating every round"""
+    engines = [create_engine("sqlite://"), create_engine("sqlite://")]
+    metrics.instrument_engine(engines[1])
+    connections = [engine.connect() for engine in engines]
+    statement = text("SELECT 1")
+    best = [float("inf")] * len(engines)
+    per_round = queries // rounds
+    for conn in connections:
+        conn.execute(statement)  # warm up
+    for _ in range(rounds):
+        for index, conn in enumerate(connections):
+            started = time.perf_counter()
+            for _ in range(per_round):
+                conn.execute(statement).scalar()
+            best[index] = min(best[index], (time.perf_counter() - started) / per_round * 1e6)
+    for conn, engine in zip(connections, engines):
+        conn.close()
+        engine.dispose()
+    return best
+
+def report(name: str, plain: float, instrumented: float) -> None:
+    overhead = instrumented - plain
+    print(f"{name:<8} {plain:>10.1f} {instrumented:>10.1f} {overhead:>+10.1f} {overhead / plain:>+8.1%}")
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=200_000, help="recordings for the record benchmark")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=20_000)
+    parser.add_argument("--rounds", type=int, default=10, help="the best of this many rounds is reported")
+    args = parser.parse_args()
+
+    bench_record(args.calls)
+    print()
+    print(f"{'path':<8} {'plain us':>10} {'metrics us':>10} {'overhead':>10} {'':>8}")
+    report("request", *await request_us([build_app(False), build_app(True)], args.requests, args.rounds))
+    report("query", *query_us(args.queries, args.rounds))
+
+    started = time.perf_counter()
+    body = metrics.REGISTRY.render()
+    print(f"\nscrape   {(time.perf_counter() - started) * 1000:.2f} ms for {len(body.splitlines())} lines")
+
+if __name__ == "__main__":
+    asyncio.run(main())
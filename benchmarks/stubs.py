@@ -0,0 +1,222 @@
+"""Stub upstreams for load tests: an OpenAI-compatible LLM and a minimal auth service.
+
+    python benchmarks/stubs.py llm --port 9100 --ttft-ms 300 --tokens-per-second 60 --error-rate 0.01
+    python benchmarks/stubs.py auth --port 9000 --jwt-secret dev-secret
+
+`llm` serves `POST /v1/chat/completions`, plain or streamed (`stream: true`):
+
+- time to first token is log-normal around `--ttft-ms` (spread `--ttft-sigma`)
+- a completion is `--completion-tokens` tokens (normal, stddev `--completion-jitter`),
+  emitted at `--tokens-per-second` (log-normal spread `--rate-sigma`)
+- faults, drawn per request: `--error-rate` (500), `--rate-limit-rate` (429 with
+  `Retry-After`), `--hang-rate` (nothing for `--hang-seconds`, then 504) and
+  `--disconnect-rate` (a stream cut off halfway)
+- `usage` is reported like the real API, including the final stream chunk
+  when `stream_options.include_usage` is set; prompt tokens are chars / 4
+- `GET /stats` counts requests per outcome
+
+`auth` replaces the auth service so chat and project services can be measured
+alone. Register and login issue tokens with no password hashing and no DB,
+and validate checks the JWT. Tokens are signed with `--jwt-secret`, which the
+other services must share.
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+from fastapi import FastAPI, Header, HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from jose import JWTError, jwt
+
+WORDS = ("lorem", "ipsum", "dolor", "sit", "amet", "consectetur", "adipiscing", "elit")
+
+# Streamed tokens are sent in batches at most this often, to keep the stub cheap at high rates
+STREAM_TICK_SECONDS = 0.01
+
+class LLMStub:
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.stats: Counter = Counter()
+
+    def _fault(self) -> str | None:
+        draw = self.rng.random()
+        for name in ("error", "rate_limit", "hang", "disconnect"):
+            rate = getattr(self.args, f"{name}_rate")
+            if draw < rate:
+                return name
+            draw -= rate
+        return None
+
+    def _lognormal(self, median: float, sigma: float) -> float:
+        if median <= 0:
+            return 0.0
+        return self.rng.lognormvariate(math.log(median), sigma)
+
+    def _plan(self, messages: list) -> tuple[float, int, float, int]:
+        """Time to first token (s), completion tokens, tokens per second, prompt tokens"""
+        ttft = self._lognormal(self.args.ttft_ms / 1000, self.args.ttft_sigma)
+        tokens = max(1, round(self.rng.gauss(self.args.completion_tokens, self.args.completion_jitter)))
+        rate = max(self._lognormal(self.args.tokens_per_second, self.args.rate_sigma), 1e-3)
+        prompt_tokens = sum(len(str(message.get("content", ""))) for message in messages) // 4
+        return ttft, tokens, rate, prompt_tokens
+
+    def _words(self, count: int) -> list[str]:
+        return [self.rng.choice(WORDS) + " " for _ in range(count)]
+
+    async def completions(self, request: Request):
+        body = await request.json()
+        model = body.get("model", "stub")
+        fault = self._fault()
+        self.stats[fault or "ok"] += 1
+        if fault == "error":
+            return JSONResponse({"error": {"message": "stub upstream error"}}, status_code=500)
+        if fault == "rate_limit":
+            return JSONResponse(
+                {"error": {"message": "stub rate limit"}}, status_code=429, headers={"Retry-After": "1"}
+            )
+        if fault == "hang":
+            await asyncio.sleep(self.args.hang_seconds)
+            return JSONResponse({"error": {"message": "stub upstream timeout"}}, status_code=504)
+
+        ttft, tokens, rate, prompt_tokens = self._plan(body.get("messages") or [])
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": tokens, "total_tokens": prompt_tokens + tokens}
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+
+        if not body.get("stream"):
+            await asyncio.sleep(ttft + tokens / rate)
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": "".join(self._words(tokens)).rstrip()},
+                    "finish_reason": "stop",
+                }],
+                "usage": usage,
+            }
+
+        include_usage = bool((body.get("stream_options") or {}).get("include_usage"))
+        words = self._words(tokens)
+        cut_at = tokens // 2 if fault == "disconnect" else None
+
+        def chunk(delta: dict, finish_reason: str | None = None) -> str:
+            data = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            return f"data: {json.dumps(data)}\n\n"
+
+        async def events():
+            await asyncio.sleep(ttft)
+            yield chunk({"role": "assistant", "content": ""})
+            per_tick = max(1, round(rate * STREAM_TICK_SECONDS))
+            for start in range(0, tokens, per_tick):
+                if cut_at is not None and start >= cut_at:
+                    raise ConnectionAbortedError("stub disconnect")  # uvicorn logs it and drops the connection
+                yield "".join(chunk({"content": word}) for word in words[start:start + per_tick])
+                await asyncio.sleep(min(per_tick, tokens - start) / rate)
+            yield chunk({}, "stop")
+            if include_usage:
+                final = {"id": completion_id, "object": "chat.completion.chunk", "created": created,
+                         "model": model, "choices": [], "usage": usage}
+                yield f"data: {json.dumps(final)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+def build_llm_app(args: argparse.Namespace) -> FastAPI:
+    stub = LLMStub(args)
+    app = FastAPI(title="Stub LLM")
+    app.add_api_route("/v1/chat/completions", stub.completions, methods=["POST"])
+
+    @app.get("/stats")
+    async def stats():
+        return dict(stub.stats)
+
+    return app
+
+def build_auth_app(args: argparse.Namespace) -> FastAPI:
+    users: dict[str, tuple[str, str]] = {}  # email -> (user_id, password)
+    app = FastAPI(title="Stub Auth")
+
+    def issue(user_id: str) -> str:
+        expire = datetime.utcnow() + timedelta(minutes=args.expire_minutes)
+        return jwt.encode({"sub": user_id, "exp": expire}, args.jwt_secret, algorithm=args.jwt_algorithm)
+
+    @app.post("/auth/register")
+    async def register(request: Request):
+        body = await request.json()
+        if body["email"] in users:
+            raise HTTPException(status_code=400, detail="User already exists")
+        user_id = str(uuid.uuid4())
+        users[body["email"]] = (user_id, body["password"])
+        return {"id": user_id, "email": body["email"]}
+
+    @app.post("/auth/login")
+    async def login(request: Request):
+        body = await request.json()
+        user = users.get(body["email"])
+        if user is None or user[1] != body["password"]:
+            raise HTTPException(status_code=401, detail="Invalid credentials")
+        return {"access_token": issue(user[0]), "token_type": "bearer"}
+
+    @app.get("/auth/validate")
+    async def validate(authorization: str = Header(None)):
+        try:
+            _, token = (authorization or "").split()
+            payload = jwt.decode(token, args.jwt_secret, algorithms=[args.jwt_algorithm])
+        except (ValueError, JWTError):
+            raise HTTPException(status_code=401, detail="Invalid or expired token")
+        return {"user_id": payload["sub"], "valid": True, "exp": payload.get("exp")}
+
+    return app
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    llm = commands.add_parser("llm", help="OpenAI-compatible chat completions stub")
+    llm.add_argument("--host", default="127.0.0.1")
+    llm.add_argument("--port", type=int, default=9100)
+    llm.add_argument("--seed", type=int, default=0)
+    llm.add_argument("--ttft-ms", type=float, default=300.0, help="median time to first token")
+    llm.add_argument("--ttft-sigma", type=float, default=0.5, help="log-normal spread of the time to first token")
+    llm.add_argument("--tokens-per-second", type=float, default=60.0, help="median generation rate")
+    llm.add_argument("--rate-sigma", type=float, default=0.3, help="log-normal spread of the generation rate")
+    llm.add_argument("--completion-tokens", type=int, default=120)
+    llm.add_argument("--completion-jitter", type=float, default=40.0, help="stddev of the completion length")
+    llm.add_argument("--error-rate", type=float, default=0.0)
+    llm.add_argument("--rate-limit-rate", type=float, default=0.0)
+    llm.add_argument("--hang-rate", type=float, default=0.0)
+    llm.add_argument("--hang-seconds", type=float, default=30.0)
+    llm.add_argument("--disconnect-rate", type=float, default=0.0)
+
+    auth = commands.add_parser("auth", help="auth service stub (no hashing, no DB)")
+    auth.add_argument("--host", default="127.0.0.1")
+    auth.add_argument("--port", type=int, default=9000)
+    auth.add_argument("--jwt-secret", required=True)
+    auth.add_argument("--jwt-algorithm", default="HS256")
+    auth.add_argument("--expire-minutes", type=int, default=60)
+    return parser.parse_args(argv)
+
+def main() -> None:
+    import uvicorn
+
+    args = parse_args()
+    app = build_llm_app(args) if args.command == "llm" else build_auth_app(args)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
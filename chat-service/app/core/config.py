@@ -4,11 +4,127 @@ class Settings(BaseSettings):
     DATABASE_URL: str
     JWT_SECRET: str
     JWT_ALGORITHM: str = "HS256"
+    TOKEN_CACHE_MAX_ENTRIES: int = 10000
+    TOKEN_CACHE_TTL_SECONDS: float = 60.0
+    AUTH_HTTP_TIMEOUT: float = 5.0
+    PROJECT_SERVICE_URL: str = "http://localhost:8001"  # renders stored prompts for new conversations
+    PROJECT_SERVICE_TIMEOUT_SECONDS: float = 5.0
     OPENROUTER_API_KEY: str = ""
     OPENAI_API_KEY: str = ""
+    OPENROUTER_BASE_URL: str = "https://openrouter.ai/api/v1"
+    OPENAI_BASE_URL: str = "https://api.openai.com/v1"  # point at benchmarks/stubs.py for load tests
     LLM_PROVIDER: str = "openrouter"  # openrouter or openai
     LLM_MODEL: str = "openai/gpt-3.5-turbo"
 
+    # Multi-provider routing: comma-separated backends, e.g. "openrouter,openai"
+    LLM_PROVIDERS: str = ""
+    # Model id per backend, JSON, e.g. {"openrouter": "openai/gpt-4o", "openai": "gpt-4o"}. Backends
+    # without an entry use LLM_MODEL; the openai backend drops its "openai/" prefix
+    LLM_MODELS: dict[str, str] = {}
+    LLM_ROUTER_WINDOW: int = 100  # recent calls per backend used for health scoring
+    LLM_HEDGE_ENABLED: bool = False
+    LLM_HEDGE_PERCENTILE: float = 0.95
+    LLM_HEDGE_MIN_DELAY_SECONDS: float = 1.0
+
+    # Upstream resilience: per-request deadline, retries with jitter, circuit breaker
+    LLM_REQUEST_DEADLINE_SECONDS: float = 60.0
+    LLM_RETRY_MAX_ATTEMPTS: int = 3
+    LLM_RETRY_BASE_DELAY_SECONDS: float = 0.5
+    LLM_RETRY_MAX_DELAY_SECONDS: float = 8.0
+    LLM_BREAKER_FAILURE_THRESHOLD: int = 5
+    LLM_BREAKER_RESET_SECONDS: float = 30.0
+    LLM_BREAKER_HALF_OPEN_MAX_CALLS: int = 1
+
+    # Shared HTTP client used for LLM upstream calls
+    LLM_HTTP2: bool = True
+    LLM_HTTP_MAX_CONNECTIONS: int = 100
+    LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    LLM_HTTP_KEEPALIVE_EXPIRY: float = 30.0
+    LLM_HTTP_CONNECT_TIMEOUT: float = 5.0
+    LLM_HTTP_READ_TIMEOUT: float = 60.0
+    LLM_HTTP_POOL_TIMEOUT: float = 5.0
+
+    # Context window assembly
+    SYSTEM_PROMPT: str = ""
+    CONTEXT_TOKEN_BUDGET: int = 3000
+    CONTEXT_MODEL_TOKEN_BUDGETS: dict[str, int] = {}  # JSON, e.g. {"openai/gpt-4o": 100000}
+    CONTEXT_MAX_MESSAGES: int = 50  # history tail fetched from the DB per turn
+
+    # LLM response cache, opt-in per project: comma-separated project ids or "*"
+    RESPONSE_CACHE_PROJECTS: str = ""
+    RESPONSE_CACHE_BACKEND: str = "memory"  # memory or redis
+    RESPONSE_CACHE_REDIS_URL: str = "redis://localhost:6379/0"
+    RESPONSE_CACHE_TTL_SECONDS: float = 3600.0
+    RESPONSE_CACHE_MAX_ENTRIES: int = 10000
+    RESPONSE_CACHE_MAX_BYTES: int = 64 * 1024 * 1024  # in-memory backend only
+    RESPONSE_CACHE_SEMANTIC: bool = False  # also match near-duplicate prompts
+    RESPONSE_CACHE_SEMANTIC_THRESHOLD: float = 0.95  # cosine similarity
+    RESPONSE_CACHE_SEMANTIC_MAX_ENTRIES: int = 2000
+
+    # Admission control for chat turns; a rate or limit of 0 disables that check
+    ADMISSION_BACKEND: str = "memory"  # memory (per worker) or redis (shared)
+    ADMISSION_REDIS_URL: str = "redis://localhost:6379/1"
+    ADMISSION_RETRY_AFTER_SECONDS: float = 1.0  # sent when a concurrency limit or the queue is full
+    RATE_LIMIT_USER_PER_MINUTE: float = 0
+    RATE_LIMIT_USER_BURST: int = 10
+    RATE_LIMIT_PROJECT_PER_MINUTE: float = 0
+    RATE_LIMIT_PROJECT_BURST: int = 30
+    RATE_LIMIT_MODEL_PER_MINUTE: float = 0  # keep below the upstream's own rate limit
+    RATE_LIMIT_MODEL_BURST: int = 60
+    MAX_CONCURRENT_TURNS_PER_USER: int = 0
+    MAX_CONCURRENT_TURNS_PER_PROJECT: int = 0
+    LLM_MAX_IN_FLIGHT: int = 0  # upstream calls per worker; excess calls queue fairly per user
+    LLM_QUEUE_MAX: int = 100
+
+    # Background compaction of long conversations into a rolling summary
+    COMPACTION_ENABLED: bool = False
+    COMPACTION_WORKERS: int = 2  # concurrent compaction passes per process
+    COMPACTION_QUEUE_MAX: int = 1000
+    COMPACTION_MIN_MESSAGES: int = 20  # fold at least this many messages per pass
+    COMPACTION_KEEP_RECENT: int = 10  # newest messages always kept verbatim
+    COMPACTION_BATCH_MESSAGES: int = 40  # keep <= CONTEXT_MAX_MESSAGES - COMPACTION_KEEP_RECENT
+
+    # Async chat jobs: POST .../jobs returns 202 and a worker pool runs the turn
+    JOBS_ENABLED: bool = False
+    JOB_WORKERS: int = 4
+    JOB_QUEUE_BACKEND: str = "memory"  # memory or redis
+    JOB_QUEUE_REDIS_URL: str = "redis://localhost:6379/2"
+    JOB_MAX_ATTEMPTS: int = 3
+    JOB_SWEEP_INTERVAL_SECONDS: float = 30.0  # also the delay before a failed attempt is retried
+    JOB_STALE_SECONDS: float = 300.0  # running this long without finishing: worker presumed dead
+    WEBHOOK_SECRET: str = ""  # HMAC-SHA256 key for signing job callbacks; required to use them
+    WEBHOOK_TIMEOUT_SECONDS: float = 10.0
+    WEBHOOK_MAX_ATTEMPTS: int = 3
+    WEBHOOK_ALLOWED_HOSTS: list[str] = []  # JSON list; if set, callbacks only go to these hosts and their subdomains
+
+    # Batch completions (POST /conversations/batch)
+    BATCH_MAX_ITEMS: int = 1000
+    BATCH_MAX_CONCURRENCY: int = 16  # upstream calls in flight per batch
+    BATCH_FLUSH_SIZE: int = 100  # results saved per bulk insert
+
+    # Database connection pool, per worker process. Keep workers x (DB_POOL_SIZE + DB_MAX_OVERFLOW),
+    # summed over all services, under the Postgres connection limit
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 5
+    DB_POOL_TIMEOUT_SECONDS: float = 10.0  # wait for a free connection, then fail the request
+    DB_POOL_RECYCLE_SECONDS: int = 1800  # reopen older connections before server or proxy idle limits drop them
+    DB_POOL_PRE_PING: bool = False  # test connections at checkout, at one round trip per checkout
+    DB_STATEMENT_CACHE_SIZE: int = 100  # prepared statements per connection; 0 behind pgbouncer in transaction mode
+
+    # Optional read replica for list and get queries. Reads fall back to the primary while
+    # it is down or lagging, and after the request has written
+    DATABASE_READ_URL: str = ""
+    DB_REPLICA_MAX_LAG_SECONDS: float = 5.0
+    DB_REPLICA_CHECK_INTERVAL_SECONDS: float = 5.0  # lag and health re-checked this often, while reads come in
+    DB_REPLICA_CONNECT_TIMEOUT_SECONDS: float = 2.0
+
+    # Tracing (W3C traceparent); TRACE_EXPORTER is none, memory or file
+    SERVICE_NAME: str = "chat-service"
+    TRACE_EXPORTER: str = "none"
+    TRACE_SAMPLE_RATIO: float = 1.0  # share of new traces recorded; incoming traceparents decide for theirs
+    TRACE_FILE: str = "traces.jsonl"
+    TRACE_MEMORY_MAX_SPANS: int = 10000
+
     class Config:
         env_file = ".env"
 
@@ -0,0 +1,88 @@
+import httpx
+from app.core.config import settings
+from app.core.tracing import instrument_client
+
+_llm_client: httpx.AsyncClient | None = None
+_auth_client: httpx.AsyncClient | None = None
+_webhook_client: httpx.AsyncClient | None = None
+_project_client: httpx.AsyncClient | None = None
+
+def _build_llm_client() -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=settings.LLM_HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.LLM_HTTP_KEEPALIVE_EXPIRY,
+    )
+    timeout = httpx.Timeout(
+        settings.LLM_HTTP_READ_TIMEOUT,
+        connect=settings.LLM_HTTP_CONNECT_TIMEOUT,
+        pool=settings.LLM_HTTP_POOL_TIMEOUT,
+    )
+    return instrument_client(httpx.AsyncClient(
+        limits=limits,
+        timeout=timeout,
+        http2=settings.LLM_HTTP2,
+    ))
+
+def _build_auth_client() -> httpx.AsyncClient:
+    return instrument_client(httpx.AsyncClient(timeout=settings.AUTH_HTTP_TIMEOUT))
+
+def _build_webhook_client() -> httpx.AsyncClient:
+    # Callbacks go to arbitrary client URLs: never follow redirects, and send no trace context
+    return httpx.AsyncClient(timeout=settings.WEBHOOK_TIMEOUT_SECONDS, follow_redirects=False)
+
+def _build_project_client() -> httpx.AsyncClient:
+    return instrument_client(httpx.AsyncClient(timeout=settings.PROJECT_SERVICE_TIMEOUT_SECONDS))
+
+async def init_http_clients() -> None:
+    """Create the process-wide HTTP clients (called on app startup)"""
+    global _llm_client, _auth_client
+    if _llm_client is None:
+        _llm_client = _build_llm_client()
+    if _auth_client is None:
+        _auth_client = _build_auth_client()
+
+async def close_http_clients() -> None:
+    """Close the process-wide HTTP clients (called on app shutdown)"""
+    global _llm_client, _auth_client, _webhook_client, _project_client
+    if _llm_client is not None:
+        await _llm_client.aclose()
+        _llm_client = None
+    if _auth_client is not None:
+        await _auth_client.aclose()
+        _auth_client = None
+    if _webhook_client is not None:
+        await _webhook_client.aclose()
+        _webhook_client = None
+    if _project_client is not None:
+        await _project_client.aclose()
+        _project_client = None
+
+def get_llm_http_client() -> httpx.AsyncClient:
+    """Return the shared, connection-pooled client used for LLM upstream calls"""
+    global _llm_client
+    if _llm_client is None:
+        # Lazily created when used outside the app lifespan (scripts, workers)
+        _llm_client = _build_llm_client()
+    return _llm_client
+
+def get_auth_http_client() -> httpx.AsyncClient:
+    """Return the shared client used to call the auth service"""
+    global _auth_client
+    if _auth_client is None:
+        _auth_client = _build_auth_client()
+    return _auth_client
+
+def get_webhook_http_client() -> httpx.AsyncClient:
+    """Return the shared client used to deliver job completion webhooks"""
+    global _webhook_client
+    if _webhook_client is None:
+        _webhook_client = _build_webhook_client()
+    return _webhook_client
+
+def get_project_http_client() -> httpx.AsyncClient:
+    """Return the shared client used to call the project service"""
+    global _project_client
+    if _project_client is None:
+        _project_client = _build_project_client()
+    return _project_client
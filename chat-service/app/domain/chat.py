@@ -1,6 +1,6 @@
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Literal
+from typing import List, Literal, Sequence, Tuple
 
 @dataclass
 class Conversation:
@@ -8,6 +8,7 @@ class Conversation:
     project_id: str
     created_at: datetime
     updated_at: datetime
+    system_prompt: str | None = None  # rendered from a stored prompt; replaces the default SYSTEM_PROMPT
 
 @dataclass
 class Message:
@@ -16,3 +17,65 @@ class Message:
     role: Literal["user", "assistant"]
     content: str
     created_at: datetime
+
+@dataclass
+class MessagePage:
+    messages: List[Message]  # oldest first
+    has_more: bool  # more messages exist beyond this page in the paging direction
+
+@dataclass
+class ConversationPage:
+    conversations: List[Conversation]  # ordered by (created_at, id)
+    has_more: bool
+
+@dataclass
+class RowPage:
+    """A listing page as plain DB rows, for encoding straight to JSON without domain objects"""
+    columns: Tuple[str, ...]  # names of the values in each row; also the JSON keys
+    rows: Sequence[tuple]
+    has_more: bool
+
+@dataclass
+class ConversationSummary:
+    conversation_id: str
+    content: str
+    covered_until: tuple[datetime, str]  # (created_at, id) of the last message folded in
+    updated_at: datetime
+
+@dataclass
+class Turn:
+    project_id: str  # owner of the conversation the turn was saved to
+    history: List[Message]  # oldest first, ending with the new user message; excludes summarized messages
+    summary: ConversationSummary | None = None
+    system_prompt: str | None = None  # the conversation's own system prompt, if it has one
+
+@dataclass
+class ChatJob:
+    id: str
+    conversation_id: str
+    user_id: str
+    message_id: str  # the saved user message this job replies to
+    status: Literal["queued", "running", "succeeded", "failed"]
+    attempts: int
+    created_at: datetime
+    updated_at: datetime
+    callback_url: str | None = None
+    response: str | None = None
+    reply_message_id: str | None = None
+    error: str | None = None
+    completed_at: datetime | None = None
+
+@dataclass
+class BatchItem:
+    prompt: str  # system prompt
+    input: str  # user message
+    ref: str | None = None  # client reference, echoed back
+
+@dataclass
+class BatchResult:
+    index: int  # position of the item in the request
+    ref: str | None
+    status: Literal["ok", "error"]
+    response: str | None = None
+    error: str | None = None
+    conversation_id: str | None = None  # where the exchange was saved
@@ -1,8 +1,38 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from app.core.database import close_engines
+from app.core.metrics import MetricsMiddleware, metrics_response
+from app.core.tracing import InMemoryExporter, TracingMiddleware, tracer
+from app.core.http_client import init_http_clients, close_http_clients
 from app.routes.chat import router as chat_router
+from app.services.admission import get_admission_controller, upstream_limiter
+from app.services.compaction import get_compaction_worker
+from app.services.jobs import get_job_worker
+from app.services.llm_provider import breakers, get_llm_provider
+from app.services.response_cache import get_response_cache
 
-app = FastAPI(title="Chat Service")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One pooled keep-alive HTTP client per process for upstream calls
+    await init_http_clients()
+    get_llm_provider()  # fail at startup on a bad LLM_PROVIDERS
+    compactor = get_compaction_worker()
+    if compactor is not None:
+        await compactor.start()
+    jobs = get_job_worker()
+    if jobs is not None:
+        await jobs.start()
+    yield
+    if jobs is not None:
+        await jobs.stop()
+    if compactor is not None:
+        await compactor.stop()
+    await close_http_clients()
+    await close_engines()
+    tracer.shutdown()
+
+app = FastAPI(title="Chat Service", lifespan=lifespan)
 
 origins = [
     "https://omnirouter-j94q.onrender.com",  # production frontend
@@ -19,5 +49,38 @@ app.add_middleware(
     expose_headers=["*"],           # optional but helpful
 )
 
+# The last added runs outermost: tracing wraps metrics, and both wrap CORS,
+# so the recorded latency and the server span include CORS handling
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(TracingMiddleware)
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint"""
+    return metrics_response()
+
+if isinstance(tracer.exporter, InMemoryExporter):
+    @app.get("/debug/traces/{trace_id}", include_in_schema=False)
+    async def trace_spans(trace_id: str):
+        """This service's recorded spans of one trace (TRACE_EXPORTER=memory only)"""
+        return tracer.exporter.spans(trace_id)
+
+
+@app.get("/metrics/llm")
+async def llm_metrics():
+    """Breaker states, routing health, cache hits, admission/queue, compaction and job counters"""
+    provider = get_llm_provider()
+    cache = get_response_cache()
+    compactor = get_compaction_worker()
+    jobs = get_job_worker()
+    return {
+        "breakers": [breaker.snapshot() for breaker in breakers.values()],
+        "routing": provider.backend_stats() if hasattr(provider, "backend_stats") else [],
+        "response_cache": cache.stats() if cache is not None else None,
+        "admission": get_admission_controller().stats(),
+        "upstream_queue": upstream_limiter.stats(),
+        "compaction": compactor.stats() if compactor is not None else None,
+        "jobs": jobs.stats() if jobs is not None else None,
+    }
 
 app.include_router(chat_router)
@@ -1,14 +1,79 @@
 from typing import Protocol, List
-from app.domain.chat import Conversation, Message
+from datetime import datetime
+import uuid
+from app.domain.chat import (
+    ChatJob, Conversation, ConversationPage, ConversationSummary, Message, MessagePage, RowPage, Turn
+)
 
 class ConversationRepository(Protocol):
-    async def create(self, project_id: str) -> Conversation: ...
+    async def create(self, project_id: str, system_prompt: str | None = None) -> Conversation: ...
     async def get_by_id(self, conversation_id: str) -> Conversation | None: ...
-    async def list_by_project(self, project_id: str) -> List[Conversation]: ...
+    async def list_by_project(
+        self,
+        project_id: str,
+        limit: int,
+        after: tuple[datetime, uuid.UUID] | None = None
+    ) -> ConversationPage: ...
+    async def list_rows_by_project(
+        self,
+        project_id: str,
+        limit: int,
+        after: tuple[datetime, uuid.UUID] | None = None
+    ) -> RowPage: ...
+    async def bulk_create_with_messages(
+        self,
+        project_id: str,
+        exchanges: List[tuple[str, str, str]]
+    ) -> None: ...
     async def delete(self, conversation_id: str) -> bool: ...
 
 class MessageRepository(Protocol):
     async def create(self, conversation_id: str, role: str, content: str) -> Message: ...
     async def get_by_id(self, message_id: str) -> Message | None: ...
     async def list_by_conversation(self, conversation_id: str) -> List[Message]: ...
+    async def list_page(
+        self,
+        conversation_id: str,
+        limit: int,
+        before: tuple[datetime, uuid.UUID] | None = None,
+        after: tuple[datetime, uuid.UUID] | None = None
+    ) -> MessagePage: ...
+    async def list_page_rows(
+        self,
+        conversation_id: str,
+        limit: int,
+        before: tuple[datetime, uuid.UUID] | None = None,
+        after: tuple[datetime, uuid.UUID] | None = None
+    ) -> RowPage: ...
+    async def list_since(
+        self,
+        conversation_id: str,
+        after: tuple[datetime, uuid.UUID] | None,
+        limit: int
+    ) -> List[Message]: ...
+    async def begin_turn(self, conversation_id: str, content: str, history_limit: int) -> Turn: ...
+    async def turn_until(self, conversation_id: str, message_id: str, history_limit: int) -> Turn | None: ...
+    async def append_reply(self, conversation_id: str, role: str, content: str) -> Message: ...
     async def delete(self, message_id: str) -> bool: ...
+
+class SummaryRepository(Protocol):
+    async def get(self, conversation_id: str) -> ConversationSummary | None: ...
+    async def save(
+        self,
+        conversation_id: str,
+        content: str,
+        covered_until: tuple[datetime, uuid.UUID],
+        previous: tuple[datetime, uuid.UUID] | None
+    ) -> bool: ...
+
+class JobRepository(Protocol):
+    async def create(
+        self, conversation_id: str, user_id: str, content: str, callback_url: str | None
+    ) -> ChatJob | None: ...
+    async def get(self, job_id: str) -> ChatJob | None: ...
+    async def claim(self, job_id: str) -> ChatJob | None: ...
+    async def complete(self, job_id: str, conversation_id: str, response: str) -> ChatJob | None: ...
+    async def fail(self, job_id: str, error: str, retry_at: datetime | None) -> ChatJob | None: ...
+    async def requeue(
+        self, stale_before: datetime, lost_before: datetime, max_attempts: int
+    ) -> tuple[List[str], List[ChatJob]]: ...
@@ -1,12 +1,19 @@
 import uuid
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import List
-from sqlalchemy import Column, String, DateTime, ForeignKey, Enum
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import (
+    Column, String, Text, DateTime, Integer, ForeignKey, Enum, Index,
+    and_, exists, insert, literal, or_, tuple_, update, union_all
+)
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects.postgresql import UUID, insert as pg_insert
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.future import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.domain.chat import Conversation, Message
+from app.core.database import ReadRouter
+from app.domain.chat import (
+    ChatJob, Conversation, ConversationPage, ConversationSummary, Message, MessagePage, RowPage, Turn
+)
 
 Base = declarative_base()
 
@@ -15,8 +22,13 @@ class ConversationTable(Base):
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     project_id = Column(UUID(as_uuid=True), nullable=False)
+    system_prompt = Column(Text, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        Index("ix_conversations_project_created_id", "project_id", "created_at", "id"),
+    )
 
 class MessageTable(Base):
     __tablename__ = "messages"
@@ -26,13 +38,59 @@ class MessageTable(Base):
     role = Column(String(50), nullable=False)  # user or assistant
     content = Column(String(10000), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        # Backs keyset pagination and history-tail reads on (created_at, id)
+        Index("ix_messages_conversation_created_id", "conversation_id", "created_at", "id"),
+    )
+
+class ConversationSummaryTable(Base):
+    __tablename__ = "conversation_summaries"
+    
+    conversation_id = Column(
+        UUID(as_uuid=True), ForeignKey("conversations.id", ondelete="CASCADE"), primary_key=True
+    )
+    content = Column(Text, nullable=False)
+    # Position of the last message folded into the summary
+    covered_until_created_at = Column(DateTime, nullable=False)
+    covered_until_id = Column(UUID(as_uuid=True), nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+class ChatJobTable(Base):
+    __tablename__ = "chat_jobs"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    conversation_id = Column(
+        UUID(as_uuid=True), ForeignKey("conversations.id", ondelete="CASCADE"), nullable=False
+    )
+    user_id = Column(String(255), nullable=False)
+    message_id = Column(UUID(as_uuid=True), nullable=False)  # user message being answered
+    status = Column(String(20), nullable=False)  # queued, running, succeeded or failed
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=True)  # queued for a retry, due at this time; NULL while in a queue
+    callback_url = Column(String(2048), nullable=True)
+    response = Column(Text, nullable=True)
+    reply_message_id = Column(UUID(as_uuid=True), nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    completed_at = Column(DateTime, nullable=True)
+    
+    __table_args__ = (
+        # Backs the recovery sweep over unfinished jobs
+        Index("ix_chat_jobs_status_updated", "status", "updated_at"),
+    )
+
+def _row_page(rows: list, has_more: bool) -> RowPage:
+    return RowPage(columns=tuple(rows[0]._fields) if rows else (), rows=rows, has_more=has_more)
 
 class PostgresConversationRepository:
     def __init__(self, db: AsyncSession):
         self.db = db
+        self.reads = ReadRouter(db)
     
-    async def create(self, project_id: str) -> Conversation:
-        conversation = ConversationTable(project_id=uuid.UUID(project_id))
+    async def create(self, project_id: str, system_prompt: str | None = None) -> Conversation:
+        conversation = ConversationTable(project_id=uuid.UUID(project_id), system_prompt=system_prompt)
         self.db.add(conversation)
         await self.db.commit()
         await self.db.refresh(conversation)
@@ -40,12 +98,14 @@ class PostgresConversationRepository:
             id=str(conversation.id),
             project_id=str(conversation.project_id),
             created_at=conversation.created_at,
-            updated_at=conversation.updated_at
+            updated_at=conversation.updated_at,
+            system_prompt=conversation.system_prompt
         )
     
     async def get_by_id(self, conversation_id: str) -> Conversation | None:
-        result = await self.db.execute(
-            select(ConversationTable).where(ConversationTable.id == uuid.UUID(conversation_id))
+        result = await self.reads.execute(
+            select(ConversationTable).where(ConversationTable.id == uuid.UUID(conversation_id)),
+            must_exist=True
         )
         row = result.scalar_one_or_none()
         if not row:
@@ -54,23 +114,90 @@ class PostgresConversationRepository:
             id=str(row.id),
             project_id=str(row.project_id),
             created_at=row.created_at,
-            updated_at=row.updated_at
+            updated_at=row.updated_at,
+            system_prompt=row.system_prompt
         )
     
-    async def list_by_project(self, project_id: str) -> List[Conversation]:
-        result = await self.db.execute(
-            select(ConversationTable).where(ConversationTable.project_id == uuid.UUID(project_id))
+    async def _project_page(
+        self, project_id: str, limit: int, after: tuple[datetime, uuid.UUID] | None
+    ) -> tuple[list, bool]:
+        stmt = select(
+            ConversationTable.id,
+            ConversationTable.project_id,
+            ConversationTable.created_at,
+            ConversationTable.updated_at,
+            ConversationTable.system_prompt
+        ).where(ConversationTable.project_id == uuid.UUID(project_id))
+        if after is not None:
+            stmt = stmt.where(tuple_(ConversationTable.created_at, ConversationTable.id) > tuple_(*after))
+        result = await self.reads.execute(
+            stmt.order_by(ConversationTable.created_at, ConversationTable.id).limit(limit + 1)
         )
-        rows = result.scalars().all()
-        return [
-            Conversation(
-                id=str(row.id),
-                project_id=str(row.project_id),
-                created_at=row.created_at,
-                updated_at=row.updated_at
-            )
-            for row in rows
-        ]
+        rows = result.all()
+        return rows[:limit], len(rows) > limit
+    
+    async def list_by_project(
+        self,
+        project_id: str,
+        limit: int,
+        after: tuple[datetime, uuid.UUID] | None = None
+    ) -> ConversationPage:
+        """Keyset page of a project's conversations ordered by (created_at, id)"""
+        rows, has_more = await self._project_page(project_id, limit, after)
+        return ConversationPage(
+            conversations=[
+                Conversation(
+                    id=str(row.id),
+                    project_id=str(row.project_id),
+                    created_at=row.created_at,
+                    updated_at=row.updated_at,
+                    system_prompt=row.system_prompt
+                )
+                for row in rows
+            ],
+            has_more=has_more
+        )
+    
+    async def list_rows_by_project(
+        self,
+        project_id: str,
+        limit: int,
+        after: tuple[datetime, uuid.UUID] | None = None
+    ) -> RowPage:
+        """Same page as `list_by_project`, as plain rows for direct JSON encoding"""
+        rows, has_more = await self._project_page(project_id, limit, after)
+        return _row_page(rows, has_more)
+    
+    async def bulk_create_with_messages(
+        self,
+        project_id: str,
+        exchanges: List[tuple[str, str, str]]
+    ) -> None:
+        """Insert one conversation per (conversation_id, user content, assistant reply), in one statement"""
+        if not exchanges:
+            return
+        pid = uuid.UUID(project_id)
+        now = datetime.utcnow()
+        replied = now + timedelta(microseconds=1)  # keeps the reply after the input on (created_at, id)
+        conversations = (
+            insert(ConversationTable)
+            .values([
+                dict(id=uuid.UUID(cid), project_id=pid, created_at=now, updated_at=replied)
+                for cid, _, _ in exchanges
+            ])
+            .returning(ConversationTable.id)
+            .cte("conversations_inserted")
+        )
+        messages = []
+        for cid, content, reply in exchanges:
+            messages.append(dict(id=uuid.uuid4(), conversation_id=uuid.UUID(cid), role="user", content=content, created_at=now))
+            messages.append(dict(id=uuid.uuid4(), conversation_id=uuid.UUID(cid), role="assistant", content=reply, created_at=replied))
+        try:
+            await self.db.execute(insert(MessageTable).values(messages).add_cte(conversations))
+            await self.db.commit()
+        except Exception:
+            await self.db.rollback()
+            raise
     
     async def delete(self, conversation_id: str) -> bool:
         result = await self.db.execute(
@@ -85,8 +212,17 @@ class PostgresConversationRepository:
         return True
 
 class PostgresMessageRepository:
-    def __init__(self, db: AsyncSession):
+    """Messages of a conversation.
+
+    With `summaries=True` (compaction enabled) turns also read the
+    conversation's rolling summary; otherwise `conversation_summaries`
+    is never queried and the table need not exist.
+    """
+
+    def __init__(self, db: AsyncSession, summaries: bool = False):
         self.db = db
+        self.reads = ReadRouter(db)
+        self.summaries = summaries
     
     async def create(self, conversation_id: str, role: str, content: str) -> Message:
         message = MessageTable(
@@ -105,9 +241,172 @@ class PostgresMessageRepository:
             created_at=message.created_at
         )
     
-    async def get_by_id(self, message_id: str) -> Message | None:
+    @staticmethod
+    def _message_columns(source):
+        return (source.c.id, source.c.conversation_id, source.c.role, source.c.content, source.c.created_at)
+    
+    def _insert_and_touch(self, message_id: uuid.UUID, conversation_id: uuid.UUID, role: str, content: str, now: datetime):
+        """CTEs inserting a message and bumping its conversation's updated_at"""
+        inserted = (
+            insert(MessageTable)
+            .values(id=message_id, conversation_id=conversation_id, role=role, content=content, created_at=now)
+            .returning(*self._message_columns(MessageTable.__table__))
+            .cte("inserted")
+        )
+        touched = (
+            update(ConversationTable)
+            .where(ConversationTable.id == conversation_id)
+            .values(updated_at=now)
+            .returning(ConversationTable.id, ConversationTable.project_id, ConversationTable.system_prompt)
+            .cte("touched")
+        )
+        return inserted, touched
+    
+    async def begin_turn(self, conversation_id: str, content: str, history_limit: int) -> Turn:
+        """Save the user message and return the history tail ending with it, oldest first.
+
+        The insert, the conversation `updated_at` bump and the tail read run as a
+        single statement; all CTEs share one snapshot, so the tail read sees the
+        history as it was before this message. The conversation's project_id
+        comes back from the `updated_at` bump, and with `summaries` its rolling
+        summary (if any) is read in the same statement; messages it covers are dropped from the tail.
+        The conversation's own system prompt comes back from the bump as well.
+        """
+        cid = uuid.UUID(conversation_id)
+        message_id = uuid.uuid4()
+        inserted, touched = self._insert_and_touch(message_id, cid, "user", content, datetime.utcnow())
+        tail = (
+            select(*self._message_columns(MessageTable.__table__))
+            .where(MessageTable.conversation_id == cid)
+            .order_by(MessageTable.created_at.desc(), MessageTable.id.desc())
+            .limit(max(history_limit - 1, 0))
+            .subquery("tail")
+        )
+        conversation = [
+            select(touched.c.project_id).scalar_subquery().label("project_id"),
+            select(touched.c.system_prompt).scalar_subquery().label("system_prompt"),
+        ]
+        summary = self._summary_columns(cid)
+        stmt = union_all(
+            select(*self._message_columns(inserted), *conversation, *summary),
+            select(*self._message_columns(tail), *conversation, *summary),
+        ).add_cte(touched)
+        result = await self.db.execute(stmt)
+        rows = result.all()
+        await self.db.commit()
+        return self._to_turn(rows, conversation_id, message_id)
+    
+    async def turn_until(self, conversation_id: str, message_id: str, history_limit: int) -> Turn | None:
+        """Rebuild the turn ending with an already saved message, as `begin_turn` returned it.
+
+        Reads the history tail up to and including the message, the
+        conversation's project_id, system prompt and (with `summaries`) summary in one statement, then ends
+        the transaction so no connection is held during the upstream call.
+        """
+        cid = uuid.UUID(conversation_id)
+        mid = uuid.UUID(message_id)
+        messages = MessageTable.__table__
+        anchor = messages.alias("anchor")
+        tail = (
+            select(*self._message_columns(messages))
+            .select_from(messages.join(anchor, anchor.c.id == mid))
+            .where(
+                messages.c.conversation_id == cid,
+                anchor.c.conversation_id == cid,
+                tuple_(messages.c.created_at, messages.c.id) <= tuple_(anchor.c.created_at, anchor.c.id)
+            )
+            .order_by(messages.c.created_at.desc(), messages.c.id.desc())
+            .limit(max(history_limit, 1))
+            .subquery("tail")
+        )
+        conversation = [
+            select(column).where(ConversationTable.id == cid).scalar_subquery().label(column.key)
+            for column in (ConversationTable.project_id, ConversationTable.system_prompt)
+        ]
         result = await self.db.execute(
-            select(MessageTable).where(MessageTable.id == uuid.UUID(message_id))
+            select(*self._message_columns(tail), *conversation, *self._summary_columns(cid))
+        )
+        rows = result.all()
+        await self.db.commit()
+        if not rows:
+            return None
+        return self._to_turn(rows, conversation_id, mid)
+    
+    def _summary_columns(self, conversation_id: uuid.UUID):
+        """Scalar subqueries reading the conversation's summary alongside each row; none without `summaries`"""
+        if not self.summaries:
+            return []
+        return [
+            select(column)
+            .where(ConversationSummaryTable.conversation_id == conversation_id)
+            .scalar_subquery()
+            .label(label)
+            for column, label in (
+                (ConversationSummaryTable.content, "summary_content"),
+                (ConversationSummaryTable.covered_until_created_at, "summary_created_at"),
+                (ConversationSummaryTable.covered_until_id, "summary_id"),
+                (ConversationSummaryTable.updated_at, "summary_updated_at"),
+            )
+        ]
+    
+    def _to_turn(self, rows, conversation_id: str, message_id: uuid.UUID) -> Turn:
+        """History oldest first ending with `message_id`, minus messages the summary covers"""
+        # UNION ALL gives no ordering guarantee; the turn's own message always goes last
+        new_rows = [row for row in rows if row.id == message_id]
+        first = new_rows[0]
+        summary = None
+        if self.summaries and first.summary_content is not None:
+            covered = (first.summary_created_at, first.summary_id)
+            summary = ConversationSummary(
+                conversation_id=conversation_id,
+                content=first.summary_content,
+                covered_until=(first.summary_created_at, str(first.summary_id)),
+                updated_at=first.summary_updated_at
+            )
+            rows = [row for row in rows if (row.created_at, row.id) > covered or row.id == message_id]
+        tail_rows = sorted(
+            (row for row in rows if row.id != message_id),
+            key=lambda row: (row.created_at, row.id)
+        )
+        history = [
+            Message(
+                id=str(row.id),
+                conversation_id=str(row.conversation_id),
+                role=row.role,
+                content=row.content,
+                created_at=row.created_at
+            )
+            for row in tail_rows + new_rows
+        ]
+        return Turn(
+            project_id=str(first.project_id),
+            history=history,
+            summary=summary,
+            system_prompt=first.system_prompt
+        )
+    
+    async def append_reply(self, conversation_id: str, role: str, content: str) -> Message:
+        """Insert a message with RETURNING and bump the conversation in one statement"""
+        inserted, touched = self._insert_and_touch(
+            uuid.uuid4(), uuid.UUID(conversation_id), role, content, datetime.utcnow()
+        )
+        result = await self.db.execute(
+            select(*self._message_columns(inserted)).add_cte(touched)
+        )
+        row = result.one()
+        await self.db.commit()
+        return Message(
+            id=str(row.id),
+            conversation_id=str(row.conversation_id),
+            role=row.role,
+            content=row.content,
+            created_at=row.created_at
+        )
+    
+    async def get_by_id(self, message_id: str) -> Message | None:
+        result = await self.reads.execute(
+            select(MessageTable).where(MessageTable.id == uuid.UUID(message_id)),
+            must_exist=True
         )
         row = result.scalar_one_or_none()
         if not row:
@@ -121,7 +420,7 @@ class PostgresMessageRepository:
         )
     
     async def list_by_conversation(self, conversation_id: str) -> List[Message]:
-        result = await self.db.execute(
+        result = await self.reads.execute(
             select(MessageTable)
             .where(MessageTable.conversation_id == uuid.UUID(conversation_id))
             .order_by(MessageTable.created_at)
@@ -138,6 +437,99 @@ class PostgresMessageRepository:
             for row in rows
         ]
     
+    async def _message_page(
+        self,
+        conversation_id: str,
+        limit: int,
+        before: tuple[datetime, uuid.UUID] | None,
+        after: tuple[datetime, uuid.UUID] | None
+    ) -> tuple[list, bool]:
+        position = tuple_(MessageTable.created_at, MessageTable.id)
+        stmt = select(*self._message_columns(MessageTable.__table__)).where(
+            MessageTable.conversation_id == uuid.UUID(conversation_id)
+        )
+        if after is not None:
+            stmt = stmt.where(position > tuple_(*after)).order_by(
+                MessageTable.created_at, MessageTable.id
+            )
+        else:
+            if before is not None:
+                stmt = stmt.where(position < tuple_(*before))
+            stmt = stmt.order_by(MessageTable.created_at.desc(), MessageTable.id.desc())
+        
+        # Fetch one extra row to learn whether another page exists
+        result = await self.reads.execute(stmt.limit(limit + 1))
+        rows = result.all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if after is None:
+            rows.reverse()
+        return rows, has_more
+    
+    async def list_page(
+        self,
+        conversation_id: str,
+        limit: int,
+        before: tuple[datetime, uuid.UUID] | None = None,
+        after: tuple[datetime, uuid.UUID] | None = None
+    ) -> MessagePage:
+        """Keyset page of messages on (created_at, id), returned oldest first.
+
+        Without `after` the page walks backwards from `before` (or from the
+        newest message), so the first request returns the latest messages.
+        """
+        rows, has_more = await self._message_page(conversation_id, limit, before, after)
+        return MessagePage(
+            messages=[
+                Message(
+                    id=str(row.id),
+                    conversation_id=str(row.conversation_id),
+                    role=row.role,
+                    content=row.content,
+                    created_at=row.created_at
+                )
+                for row in rows
+            ],
+            has_more=has_more
+        )
+    
+    async def list_page_rows(
+        self,
+        conversation_id: str,
+        limit: int,
+        before: tuple[datetime, uuid.UUID] | None = None,
+        after: tuple[datetime, uuid.UUID] | None = None
+    ) -> RowPage:
+        """Same page as `list_page`, as plain rows for direct JSON encoding"""
+        rows, has_more = await self._message_page(conversation_id, limit, before, after)
+        return _row_page(rows, has_more)
+    
+    async def list_since(
+        self,
+        conversation_id: str,
+        after: tuple[datetime, uuid.UUID] | None,
+        limit: int
+    ) -> List[Message]:
+        """Return up to `limit` messages positioned after `after` (or from the start), oldest first"""
+        stmt = select(*self._message_columns(MessageTable.__table__)).where(
+            MessageTable.conversation_id == uuid.UUID(conversation_id)
+        )
+        if after is not None:
+            stmt = stmt.where(tuple_(MessageTable.created_at, MessageTable.id) > tuple_(*after))
+        result = await self.db.execute(
+            stmt.order_by(MessageTable.created_at, MessageTable.id).limit(limit)
+        )
+        return [
+            Message(
+                id=str(row.id),
+                conversation_id=str(row.conversation_id),
+                role=row.role,
+                content=row.content,
+                created_at=row.created_at
+            )
+            for row in result.all()
+        ]
+    
     async def delete(self, message_id: str) -> bool:
         result = await self.db.execute(
             select(MessageTable).where(MessageTable.id == uuid.UUID(message_id))
@@ -149,3 +541,244 @@ class PostgresMessageRepository:
         await self.db.delete(row)
         await self.db.commit()
         return True
+
+class PostgresSummaryRepository:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+    
+    async def get(self, conversation_id: str) -> ConversationSummary | None:
+        result = await self.db.execute(
+            select(ConversationSummaryTable)
+            .where(ConversationSummaryTable.conversation_id == uuid.UUID(conversation_id))
+        )
+        row = result.scalar_one_or_none()
+        if not row:
+            return None
+        return ConversationSummary(
+            conversation_id=str(row.conversation_id),
+            content=row.content,
+            covered_until=(row.covered_until_created_at, str(row.covered_until_id)),
+            updated_at=row.updated_at
+        )
+    
+    async def save(
+        self,
+        conversation_id: str,
+        content: str,
+        covered_until: tuple[datetime, uuid.UUID],
+        previous: tuple[datetime, uuid.UUID] | None
+    ) -> bool:
+        """Advance the summary only if it still covers exactly `previous` (compare-and-set).
+
+        Returns False when another run got there first, which makes a repeated
+        or concurrent compaction of the same messages a no-op.
+        """
+        values = dict(
+            conversation_id=uuid.UUID(conversation_id),
+            content=content,
+            covered_until_created_at=covered_until[0],
+            covered_until_id=covered_until[1],
+            updated_at=datetime.utcnow()
+        )
+        stmt = pg_insert(ConversationSummaryTable).values(**values)
+        if previous is None:
+            stmt = stmt.on_conflict_do_nothing(index_elements=[ConversationSummaryTable.conversation_id])
+        else:
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[ConversationSummaryTable.conversation_id],
+                set_={key: value for key, value in values.items() if key != "conversation_id"},
+                where=tuple_(
+                    ConversationSummaryTable.covered_until_created_at,
+                    ConversationSummaryTable.covered_until_id
+                ) == tuple_(*previous)
+            )
+        result = await self.db.execute(stmt.returning(ConversationSummaryTable.conversation_id))
+        saved = result.first() is not None
+        await self.db.commit()
+        return saved
+
+class PostgresJobRepository:
+    """Durable chat job state; every transition is a single guarded UPDATE"""
+    
+    def __init__(self, db: AsyncSession):
+        self.db = db
+    
+    @staticmethod
+    def _to_job(row) -> ChatJob:
+        return ChatJob(
+            id=str(row.id),
+            conversation_id=str(row.conversation_id),
+            user_id=row.user_id,
+            message_id=str(row.message_id),
+            status=row.status,
+            attempts=row.attempts,
+            created_at=row.created_at,
+            updated_at=row.updated_at,
+            callback_url=row.callback_url,
+            response=row.response,
+            reply_message_id=str(row.reply_message_id) if row.reply_message_id else None,
+            error=row.error,
+            completed_at=row.completed_at
+        )
+    
+    async def create(
+        self, conversation_id: str, user_id: str, content: str, callback_url: str | None
+    ) -> ChatJob | None:
+        """Save the user message and queue a job answering it in one statement.
+
+        Returns None if the conversation does not exist.
+        """
+        cid = uuid.UUID(conversation_id)
+        message_id = uuid.uuid4()
+        now = datetime.utcnow()
+        inserted, touched = PostgresMessageRepository(self.db)._insert_and_touch(
+            message_id, cid, "user", content, now
+        )
+        stmt = (
+            insert(ChatJobTable)
+            .values(
+                id=uuid.uuid4(),
+                conversation_id=cid,
+                user_id=user_id,
+                message_id=message_id,
+                status="queued",
+                attempts=0,
+                callback_url=callback_url,
+                created_at=now,
+                updated_at=now
+            )
+            .returning(*ChatJobTable.__table__.c)
+            .add_cte(inserted)
+            .add_cte(touched)
+        )
+        try:
+            result = await self.db.execute(stmt)
+        except IntegrityError:
+            await self.db.rollback()
+            return None
+        row = result.one()
+        await self.db.commit()
+        return self._to_job(row)
+    
+    async def get(self, job_id: str) -> ChatJob | None:
+        result = await self.db.execute(
+            select(*ChatJobTable.__table__.c).where(ChatJobTable.id == uuid.UUID(job_id))
+        )
+        row = result.first()
+        return self._to_job(row) if row else None
+    
+    async def _transition(self, job_id: str, from_status: str, **values) -> ChatJob | None:
+        result = await self.db.execute(
+            update(ChatJobTable)
+            .where(ChatJobTable.id == uuid.UUID(job_id), ChatJobTable.status == from_status)
+            .values(updated_at=datetime.utcnow(), **values)
+            .returning(*ChatJobTable.__table__.c)
+        )
+        row = result.first()
+        await self.db.commit()
+        return self._to_job(row) if row else None
+    
+    async def claim(self, job_id: str) -> ChatJob | None:
+        """Move a queued job to running; None if another worker got it or it already finished"""
+        return await self._transition(job_id, "queued", status="running", attempts=ChatJobTable.attempts + 1)
+    
+    async def complete(self, job_id: str, conversation_id: str, response: str) -> ChatJob | None:
+        """Mark a running job succeeded and save its reply, atomically.
+
+        The reply is only inserted if the job was still running, so a job
+        finished twice (e.g. after a recovery requeue) saves one reply.
+        """
+        cid = uuid.UUID(conversation_id)
+        reply_id = uuid.uuid4()
+        now = datetime.utcnow()
+        finished = (
+            update(ChatJobTable)
+            .where(ChatJobTable.id == uuid.UUID(job_id), ChatJobTable.status == "running")
+            .values(
+                status="succeeded",
+                response=response,
+                reply_message_id=reply_id,
+                error=None,
+                updated_at=now,
+                completed_at=now
+            )
+            .returning(*ChatJobTable.__table__.c)
+            .cte("finished")
+        )
+        was_running = exists(select(finished.c.id))
+        inserted = (
+            insert(MessageTable)
+            .from_select(
+                ["id", "conversation_id", "role", "content", "created_at"],
+                select(
+                    literal(reply_id, UUID(as_uuid=True)),
+                    literal(cid, UUID(as_uuid=True)),
+                    literal("assistant"),
+                    literal(response, Text),
+                    literal(now, DateTime)
+                ).where(was_running)
+            )
+            .returning(MessageTable.id)
+            .cte("inserted")
+        )
+        touched = (
+            update(ConversationTable)
+            .where(ConversationTable.id == cid, was_running)
+            .values(updated_at=now)
+            .returning(ConversationTable.id)
+            .cte("touched")
+        )
+        result = await self.db.execute(
+            select(*finished.c).add_cte(inserted).add_cte(touched)
+        )
+        row = result.first()
+        await self.db.commit()
+        return self._to_job(row) if row else None
+    
+    async def fail(self, job_id: str, error: str, retry_at: datetime | None) -> ChatJob | None:
+        """Record a failed attempt: queued again, due at `retry_at`, or terminally failed if it is None"""
+        if retry_at is not None:
+            return await self._transition(job_id, "running", status="queued", error=error, next_attempt_at=retry_at)
+        return await self._transition(
+            job_id, "running", status="failed", error=error, completed_at=datetime.utcnow()
+        )
+    
+    async def requeue(
+        self, stale_before: datetime, lost_before: datetime, max_attempts: int
+    ) -> tuple[List[str], List[ChatJob]]:
+        """Recover unfinished jobs; returns the ids to put back in the queue, and the jobs given up on.
+
+        Requeued are queued jobs whose retry is due, queued jobs put in a queue
+        before `lost_before` (presumed lost with it), and running jobs not
+        updated since `stale_before` (their worker is presumed dead). Their
+        `updated_at` is stamped, so a job still waiting in a queue is not
+        listed again until it has been there `lost_before` long once more.
+        Stale running jobs that have had `max_attempts` are failed instead.
+        """
+        now = datetime.utcnow()
+        stale = and_(ChatJobTable.status == "running", ChatJobTable.updated_at < stale_before)
+        requeued = await self.db.execute(
+            update(ChatJobTable)
+            .where(or_(
+                and_(
+                    ChatJobTable.status == "queued",
+                    or_(
+                        ChatJobTable.next_attempt_at <= now,
+                        and_(ChatJobTable.next_attempt_at.is_(None), ChatJobTable.updated_at < lost_before)
+                    )
+                ),
+                and_(stale, ChatJobTable.attempts < max_attempts)
+            ))
+            .values(status="queued", next_attempt_at=None, updated_at=now)
+            .returning(ChatJobTable.id)
+        )
+        job_ids = [str(row.id) for row in requeued.all()]
+        abandoned = await self.db.execute(
+            update(ChatJobTable)
+            .where(stale, ChatJobTable.attempts >= max_attempts)
+            .values(status="failed", error="Job did not finish", updated_at=now, completed_at=now)
+            .returning(*ChatJobTable.__table__.c)
+        )
+        failed = [self._to_job(row) for row in abandoned.all()]
+        await self.db.commit()
+        return job_ids, failed
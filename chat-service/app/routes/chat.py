@@ -1,28 +1,107 @@
-from fastapi import APIRouter, Depends, HTTPException
+import json
+import uuid
+from datetime import datetime
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from app.schemas.chat import (
     ConversationCreate, ConversationResponse, 
     SendMessageRequest, SendMessageResponse,
-    MessageResponse
+    MessageResponse, SubmitJobRequest, ChatJobResponse, BatchRequest
 )
+from app.core.config import settings
+from app.services.admission import Admission, AdmissionController, AdmissionRejected
+from app.domain.chat import BatchItem, ChatJob
+from app.services.batch import BatchService
 from app.services.chat_service import ConversationService, MessageService
-from app.utils.dependencies import get_current_user, get_conversation_service, get_message_service
+from app.services.jobs import CallbackRejected, ChatJobService, resolve_callback
+from app.services.prompts import PromptNotFoundError, PromptServiceUnavailable
+from app.services.resilience import CircuitOpenError, DeadlineExceeded, request_deadline
+from app.utils.dependencies import (
+    get_admission, get_batch_service, get_chat_job_service, get_current_user,
+    get_conversation_service, get_message_service
+)
+from app.utils.json_stream import StreamFormat, stream_rows
+from app.utils.pagination import encode_cursor, decode_cursor
 
 router = APIRouter(prefix="/conversations", tags=["Chat"])
 
 @router.post("", response_model=ConversationResponse)
 async def create_conversation(
     project_id: str,
+    req: ConversationCreate | None = None,
+    authorization: str = Header(None),
     current_user: str = Depends(get_current_user),
     service: ConversationService = Depends(get_conversation_service)
 ):
-    conversation = await service.create_conversation(project_id)
+    """Create a conversation, optionally starting from a stored prompt rendered by the project service"""
+    if req is not None and req.prompt_id:
+        try:
+            conversation = await service.create_from_prompt(
+                project_id, req.prompt_id, req.variables, authorization
+            )
+        except PromptNotFoundError:
+            raise HTTPException(status_code=404, detail="Prompt not found")
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except PromptServiceUnavailable:
+            raise HTTPException(status_code=502, detail="Project service unavailable")
+    else:
+        conversation = await service.create_conversation(project_id)
     return ConversationResponse(
         id=conversation.id,
         project_id=conversation.project_id,
         created_at=conversation.created_at,
-        updated_at=conversation.updated_at
+        updated_at=conversation.updated_at,
+        system_prompt=conversation.system_prompt
     )
 
+@router.post("/batch")
+async def run_batch(
+    req: BatchRequest,
+    current_user: str = Depends(get_current_user),
+    service: BatchService = Depends(get_batch_service)
+):
+    """Run independent prompt/input pairs and stream results as NDJSON as they finish.
+
+    Each line is one item's result, carrying its `index` in the request and
+    `ref`. Successful items are saved as conversations in bulk. A final
+    line carries the `summary` counts. Items are admitted one by one (see
+    BatchService), so the batch pays the rate limits per item.
+    """
+    try:
+        uuid.UUID(req.project_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid project_id")
+    if not req.items:
+        raise HTTPException(status_code=400, detail="Batch has no items")
+    if len(req.items) > settings.BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Batch is limited to {settings.BATCH_MAX_ITEMS} items")
+    concurrency = min(req.concurrency or settings.BATCH_MAX_CONCURRENCY, settings.BATCH_MAX_CONCURRENCY)
+    if concurrency < 1:
+        raise HTTPException(status_code=400, detail="concurrency must be at least 1")
+    items = [BatchItem(prompt=item.prompt, input=item.input, ref=item.ref) for item in req.items]
+
+    async def results():
+        # An item whose save fails is reported again as an error; the last report wins
+        outcomes: dict[int, str] = {}
+        async for result in service.run(req.project_id, current_user, items, concurrency):
+            outcomes[result.index] = result.status
+            yield json.dumps({
+                "index": result.index,
+                "ref": result.ref,
+                "status": result.status,
+                "response": result.response,
+                "error": result.error,
+                "conversation_id": result.conversation_id,
+            }) + "\n"
+        succeeded = sum(1 for status in outcomes.values() if status == "ok")
+        yield json.dumps({
+            "summary": {"items": len(items), "succeeded": succeeded, "failed": len(items) - succeeded}
+        }) + "\n"
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
 @router.get("/{conversation_id}", response_model=ConversationResponse)
 async def get_conversation(
     conversation_id: str,
@@ -36,16 +115,53 @@ async def get_conversation(
         id=conversation.id,
         project_id=conversation.project_id,
         created_at=conversation.created_at,
-        updated_at=conversation.updated_at
+        updated_at=conversation.updated_at,
+        system_prompt=conversation.system_prompt
     )
 
 @router.get("/{conversation_id}/messages", response_model=list[MessageResponse])
 async def get_conversation_messages(
     conversation_id: str,
+    response: Response,
+    limit: int = Query(50, ge=1, le=200),
+    before: str | None = Query(None, description="Cursor: return messages older than this position"),
+    after: str | None = Query(None, description="Cursor: return messages newer than this position"),
+    stream: StreamFormat | None = Query(
+        None, description="Stream rows straight from the DB as a JSON array ('json') or NDJSON ('ndjson')"
+    ),
     current_user: str = Depends(get_current_user),
     service: MessageService = Depends(get_message_service)
 ):
-    messages = await service.list_messages(conversation_id)
+    """Page through a conversation's messages, newest page first.
+
+    Each page is returned oldest first. `X-Before-Cursor` / `X-After-Cursor`
+    headers carry the cursors for the adjacent pages and `X-Has-More` tells
+    whether the walk in the requested direction can continue. With `stream`
+    the same page is encoded straight from the DB rows.
+    """
+    if before and after:
+        raise HTTPException(status_code=400, detail="Use either 'before' or 'after', not both")
+    try:
+        before_pos = decode_cursor(before) if before else None
+        after_pos = decode_cursor(after) if after else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if stream is not None:
+        rows = await service.list_message_rows(conversation_id, limit, before_pos, after_pos)
+        headers = {"X-Has-More": "true" if rows.has_more else "false"}
+        if rows.rows:
+            first, last = rows.rows[0], rows.rows[-1]
+            headers["X-Before-Cursor"] = encode_cursor(first.created_at, first.id)
+            headers["X-After-Cursor"] = encode_cursor(last.created_at, last.id)
+        return stream_rows(rows.columns, rows.rows, stream, headers)
+    
+    page = await service.list_messages_page(conversation_id, limit, before_pos, after_pos)
+    if page.messages:
+        first, last = page.messages[0], page.messages[-1]
+        response.headers["X-Before-Cursor"] = encode_cursor(first.created_at, first.id)
+        response.headers["X-After-Cursor"] = encode_cursor(last.created_at, last.id)
+    response.headers["X-Has-More"] = "true" if page.has_more else "false"
     return [
         MessageResponse(
             id=msg.id,
@@ -54,43 +170,224 @@ async def get_conversation_messages(
             content=msg.content,
             created_at=msg.created_at
         )
-        for msg in messages
+        for msg in page.messages
     ]
 
+def _too_many_requests(e: AdmissionRejected) -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail=str(e),
+        headers={"Retry-After": str(max(int(e.retry_after + 0.999), 1))}
+    )
+
+async def _admit(
+    conversation_id: str,
+    user_id: str,
+    admission: AdmissionController,
+    conversations: ConversationService
+) -> Admission:
+    """Admit a chat turn or raise 429; the project is only looked up if project limits are set"""
+    project_id = None
+    if admission.needs_project:
+        conversation = await conversations.get_conversation(conversation_id)
+        if not conversation:
+            raise HTTPException(status_code=404, detail="Conversation not found")
+        project_id = conversation.project_id
+    try:
+        return await admission.acquire(user_id, project_id, settings.LLM_MODEL)
+    except AdmissionRejected as e:
+        raise _too_many_requests(e)
+
 @router.post("/{conversation_id}/messages", response_model=SendMessageResponse)
 async def send_message(
     conversation_id: str,
     req: SendMessageRequest,
     current_user: str = Depends(get_current_user),
-    service: MessageService = Depends(get_message_service)
+    service: MessageService = Depends(get_message_service),
+    conversations: ConversationService = Depends(get_conversation_service),
+    admission: AdmissionController = Depends(get_admission)
 ):
+    admitted = await _admit(conversation_id, current_user, admission, conversations)
     try:
-        response = await service.send_message_and_get_response(conversation_id, req.content)
+        async with admitted:
+            with request_deadline(settings.LLM_REQUEST_DEADLINE_SECONDS):
+                response = await service.send_message_and_get_response(conversation_id, req.content)
         return SendMessageResponse(
             message_id=conversation_id,
             response=response,
             created_at=__import__('datetime').datetime.utcnow()
         )
+    except AdmissionRejected as e:
+        raise _too_many_requests(e)
+    except CircuitOpenError as e:
+        raise HTTPException(
+            status_code=503,
+            detail="LLM service temporarily unavailable",
+            headers={"Retry-After": str(max(int(e.retry_after), 1))}
+        )
+    except DeadlineExceeded:
+        raise HTTPException(status_code=504, detail="LLM service did not respond in time")
     except ValueError as e:
         raise HTTPException(status_code=500, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail="Error communicating with LLM service")
 
+def _sse(data: dict, event: str | None = None) -> str:
+    """Format one Server-Sent Events frame"""
+    frame = f"event: {event}\n" if event else ""
+    return frame + f"data: {json.dumps(data)}\n\n"
+
+@router.post("/{conversation_id}/messages/stream")
+async def stream_message(
+    conversation_id: str,
+    req: SendMessageRequest,
+    current_user: str = Depends(get_current_user),
+    service: MessageService = Depends(get_message_service),
+    conversations: ConversationService = Depends(get_conversation_service),
+    admission: AdmissionController = Depends(get_admission)
+):
+    """Send a message and stream the LLM response back as Server-Sent Events"""
+    # Admit before the stream starts so rejections are a plain 429
+    admitted = await _admit(conversation_id, current_user, admission, conversations)
+
+    async def event_stream():
+        try:
+            async with admitted:
+                with request_deadline(settings.LLM_REQUEST_DEADLINE_SECONDS):
+                    async for delta in service.stream_message_and_get_response(conversation_id, req.content):
+                        yield _sse({"delta": delta})
+        except AdmissionRejected as e:
+            yield _sse({"detail": str(e), "retry_after": e.retry_after}, event="error")
+            return
+        except CircuitOpenError:
+            yield _sse({"detail": "LLM service temporarily unavailable"}, event="error")
+            return
+        except DeadlineExceeded:
+            yield _sse({"detail": "LLM service did not respond in time"}, event="error")
+            return
+        except ValueError as e:
+            yield _sse({"detail": str(e)}, event="error")
+            return
+        except Exception:
+            yield _sse({"detail": "Error communicating with LLM service"}, event="error")
+            return
+        yield _sse(
+            {"message_id": conversation_id, "created_at": datetime.utcnow().isoformat()},
+            event="done"
+        )
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # Frees the admission's slots even if the client disconnects before streaming starts
+        background=BackgroundTask(admitted.release),
+    )
+
+def _job_response(job: ChatJob) -> ChatJobResponse:
+    return ChatJobResponse(
+        job_id=job.id,
+        conversation_id=job.conversation_id,
+        status=job.status,
+        attempts=job.attempts,
+        created_at=job.created_at,
+        updated_at=job.updated_at,
+        completed_at=job.completed_at,
+        response=job.response,
+        reply_message_id=job.reply_message_id,
+        error=job.error
+    )
+
+@router.post("/{conversation_id}/jobs", response_model=ChatJobResponse, status_code=202)
+async def submit_message_job(
+    conversation_id: str,
+    req: SubmitJobRequest,
+    response: Response,
+    current_user: str = Depends(get_current_user),
+    service: ChatJobService | None = Depends(get_chat_job_service),
+    conversations: ConversationService = Depends(get_conversation_service),
+    admission: AdmissionController = Depends(get_admission)
+):
+    """Save a message and generate the reply in the background.
+
+    Returns 202 with a job to poll at the `Location` header; if
+    `callback_url` is given, the result is also POSTed there, signed.
+    """
+    if service is None:
+        raise HTTPException(status_code=503, detail="Async jobs are not enabled")
+    if req.callback_url is not None:
+        if not settings.WEBHOOK_SECRET:
+            raise HTTPException(status_code=400, detail="Webhook callbacks are not enabled")
+        # Checked again at delivery, since DNS can change in between
+        try:
+            await resolve_callback(req.callback_url, settings.WEBHOOK_ALLOWED_HOSTS)
+        except CallbackRejected as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except OSError:
+            raise HTTPException(status_code=400, detail="callback_url host does not resolve")
+    
+    # Jobs pay the rate limits but hold no concurrency slot; the worker pool bounds them
+    admitted = await _admit(conversation_id, current_user, admission, conversations)
+    await admitted.release()
+    
+    job = await service.submit(conversation_id, current_user, req.content, req.callback_url)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    response.headers["Location"] = f"/conversations/{conversation_id}/jobs/{job.id}"
+    return _job_response(job)
+
+@router.get("/{conversation_id}/jobs/{job_id}", response_model=ChatJobResponse)
+async def get_message_job(
+    conversation_id: str,
+    job_id: str,
+    current_user: str = Depends(get_current_user),
+    service: ChatJobService | None = Depends(get_chat_job_service)
+):
+    if service is None:
+        raise HTTPException(status_code=503, detail="Async jobs are not enabled")
+    job = await service.get_job(job_id, current_user)
+    if not job or job.conversation_id != conversation_id:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return _job_response(job)
+
 @router.get("/project/{project_id}", response_model=list[ConversationResponse])
 async def list_project_conversations(
     project_id: str,
+    response: Response,
+    limit: int = Query(100, ge=1, le=500),
+    after: str | None = Query(None, description="Cursor from the previous page's X-Next-Cursor header"),
+    stream: StreamFormat | None = Query(
+        None, description="Stream rows straight from the DB as a JSON array ('json') or NDJSON ('ndjson')"
+    ),
     current_user: str = Depends(get_current_user),
     service: ConversationService = Depends(get_conversation_service)
 ):
-    conversations = await service.list_conversations(project_id)
+    try:
+        after_pos = decode_cursor(after) if after else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if stream is not None:
+        rows = await service.list_conversation_rows(project_id, limit, after_pos)
+        headers = {}
+        if rows.has_more:
+            last = rows.rows[-1]
+            headers["X-Next-Cursor"] = encode_cursor(last.created_at, last.id)
+        return stream_rows(rows.columns, rows.rows, stream, headers)
+    
+    page = await service.list_conversations(project_id, limit, after_pos)
+    if page.has_more:
+        last = page.conversations[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor(last.created_at, last.id)
     return [
         ConversationResponse(
             id=c.id,
             project_id=c.project_id,
             created_at=c.created_at,
-            updated_at=c.updated_at
+            updated_at=c.updated_at,
+            system_prompt=c.system_prompt
         )
-        for c in conversations
+        for c in page.conversations
     ]
 
 @router.delete("/{conversation_id}")
@@ -1,15 +1,17 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional, Literal
+from typing import Dict, List, Optional, Literal
 
 class ConversationCreate(BaseModel):
-    pass
+    prompt_id: Optional[str] = None  # start from a stored prompt, rendered as the system prompt
+    variables: Dict[str, str] = {}  # values for the prompt's declared variables
 
 class ConversationResponse(BaseModel):
     id: str
     project_id: str
     created_at: datetime
     updated_at: datetime
+    system_prompt: Optional[str] = None
 
 class MessageCreate(BaseModel):
     content: str
@@ -28,3 +30,29 @@ class SendMessageResponse(BaseModel):
     message_id: str
     response: str
     created_at: datetime
+
+class SubmitJobRequest(BaseModel):
+    content: str
+    callback_url: Optional[str] = None  # POSTed a signed result when the job finishes
+
+class ChatJobResponse(BaseModel):
+    job_id: str
+    conversation_id: str
+    status: Literal["queued", "running", "succeeded", "failed"]
+    attempts: int
+    created_at: datetime
+    updated_at: datetime
+    completed_at: Optional[datetime] = None
+    response: Optional[str] = None
+    reply_message_id: Optional[str] = None
+    error: Optional[str] = None
+
+class BatchItemRequest(BaseModel):
+    prompt: str = ""  # system prompt, e.g. a project prompt's content
+    input: str
+    ref: Optional[str] = None  # echoed back to match results to items
+
+class BatchRequest(BaseModel):
+    project_id: str
+    items: List[BatchItemRequest]
+    concurrency: Optional[int] = None  # capped at BATCH_MAX_CONCURRENCY
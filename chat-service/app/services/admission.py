@@ -0,0 +1,365 @@
+import asyncio
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, List, Protocol
+from app.core.config import settings
+from app.services.llm_provider import LLMProvider, LLMMessage
+from app.services.resilience import DeadlineExceeded, remaining_time
+
+# Tenant (user) on whose behalf upstream calls in the current request are made
+_tenant: ContextVar[str] = ContextVar("llm_tenant", default="")
+
+@contextmanager
+def upstream_tenant(tenant: str):
+    """Attribute upstream calls made inside the block to `tenant` for fair queueing"""
+    token = _tenant.set(tenant)
+    try:
+        yield
+    finally:
+        _tenant.reset(token)
+
+class AdmissionRejected(Exception):
+    """A chat turn was refused by rate limiting, concurrency limits or a full queue"""
+
+    def __init__(self, detail: str, retry_after: float):
+        super().__init__(detail)
+        self.retry_after = retry_after
+
+class AdmissionBackend(Protocol):
+    async def take(self, key: str, rate: float, burst: float, cost: float = 1.0) -> float:
+        """Take `cost` tokens from a bucket; return 0 if admitted, else seconds until they would be"""
+        ...
+    async def acquire_slot(self, key: str, limit: int, ttl: float) -> bool: ...
+    async def release_slot(self, key: str) -> None: ...
+
+class InMemoryAdmissionBackend:
+    """Per-process token buckets and in-flight counters"""
+
+    def __init__(self, max_buckets: int = 100000):
+        self.max_buckets = max_buckets
+        self._buckets: "OrderedDict[str, tuple[float, float]]" = OrderedDict()  # key -> (tokens, updated)
+        self._slots: dict[str, int] = {}
+
+    async def take(self, key: str, rate: float, burst: float, cost: float = 1.0) -> float:
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(key, (burst, now))
+        tokens = min(burst, tokens + (now - updated) * rate)
+        wait = 0.0
+        if tokens >= cost:
+            tokens = min(burst, tokens - cost)
+        else:
+            wait = (cost - tokens) / rate
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_buckets:
+            # The least recently used bucket has long since refilled
+            self._buckets.popitem(last=False)
+        return wait
+
+    async def acquire_slot(self, key: str, limit: int, ttl: float) -> bool:
+        in_flight = self._slots.get(key, 0)
+        if in_flight >= limit:
+            return False
+        self._slots[key] = in_flight + 1
+        return True
+
+    async def release_slot(self, key: str) -> None:
+        in_flight = self._slots.get(key, 0) - 1
+        if in_flight > 0:
+            self._slots[key] = in_flight
+        else:
+            self._slots.pop(key, None)
+
+_TAKE_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(bucket[1]) or burst
+local updated = tonumber(bucket[2]) or now
+tokens = math.min(burst, tokens + (now - updated) * rate)
+local wait = 0
+if tokens >= cost then
+    tokens = math.min(burst, tokens - cost)
+else
+    wait = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000) + 1000)
+return tostring(wait)
+"""
+
+_ACQUIRE_SLOT_SCRIPT = """
+local in_flight = redis.call('INCR', KEYS[1])
+if in_flight > tonumber(ARGV[1]) then
+    redis.call('DECR', KEYS[1])
+    return 0
+end
+redis.call('PEXPIRE', KEYS[1], ARGV[2])
+return 1
+"""
+
+_RELEASE_SLOT_SCRIPT = """
+if redis.call('DECR', KEYS[1]) <= 0 then
+    redis.call('DEL', KEYS[1])
+end
+return 1
+"""
+
+class RedisAdmissionBackend:
+    """Token buckets and in-flight counters shared by all workers (requires the `redis` package).
+
+    Each operation is a single Lua script, so it is atomic across workers.
+    In-flight counters expire after `ttl` so a crashed worker cannot leak slots.
+    """
+
+    def __init__(self, url: str, prefix: str = "omnirouter:admission:"):
+        try:
+            from redis import asyncio as redis_asyncio
+        except ImportError as e:
+            raise RuntimeError("ADMISSION_BACKEND=redis requires the 'redis' package") from e
+        self._redis = redis_asyncio.from_url(url, decode_responses=True)
+        self.prefix = prefix
+        self._take = self._redis.register_script(_TAKE_SCRIPT)
+        self._acquire = self._redis.register_script(_ACQUIRE_SLOT_SCRIPT)
+        self._release = self._redis.register_script(_RELEASE_SLOT_SCRIPT)
+
+    async def take(self, key: str, rate: float, burst: float, cost: float = 1.0) -> float:
+        return float(await self._take(keys=[self.prefix + key], args=[rate, burst, cost]))
+
+    async def acquire_slot(self, key: str, limit: int, ttl: float) -> bool:
+        return bool(await self._acquire(keys=[self.prefix + key], args=[limit, int(ttl * 1000)]))
+
+    async def release_slot(self, key: str) -> None:
+        await self._release(keys=[self.prefix + key])
+
+class Admission:
+    """Concurrency slots held by one admitted chat turn; release is idempotent"""
+
+    def __init__(self, backend: AdmissionBackend, slots: List[str], tenant: str):
+        self.backend = backend
+        self.slots = slots
+        self.tenant = tenant
+        self._released = False
+        self._token = None
+
+    async def release(self) -> None:
+        if self._released:
+            return
+        self._released = True
+        for key in self.slots:
+            await self.backend.release_slot(key)
+
+    async def __aenter__(self) -> "Admission":
+        self._token = _tenant.set(self.tenant)
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        try:
+            _tenant.reset(self._token)
+        except ValueError:
+            pass  # exited from another context (e.g. an abandoned stream being closed)
+        await self.release()
+
+class AdmissionController:
+    """Admits chat turns against per-user/project/model token buckets and concurrency limits.
+
+    `rates` maps a scope ("user", "project" or "model") to (tokens per second,
+    burst); `concurrency` maps a scope to its maximum number of turns in flight.
+    """
+
+    def __init__(
+        self,
+        backend: AdmissionBackend,
+        rates: dict[str, tuple[float, float]],
+        concurrency: dict[str, int],
+        retry_after: float = 1.0,
+        slot_ttl: float = 120.0,
+    ):
+        self.backend = backend
+        self.rates = rates
+        self.concurrency = concurrency
+        self.retry_after = retry_after
+        self.slot_ttl = slot_ttl
+        self.admitted = 0
+        self.rejected = 0
+
+    @property
+    def needs_project(self) -> bool:
+        return "project" in self.rates or "project" in self.concurrency
+
+    async def acquire(self, user_id: str, project_id: str | None, model: str) -> Admission:
+        """Admit one turn or raise AdmissionRejected; tokens taken before a rejection are refunded"""
+        scopes = {"user": user_id, "project": project_id, "model": model}
+        taken: List[tuple[str, float, float]] = []
+        slots: List[str] = []
+        try:
+            for scope, (rate, burst) in self.rates.items():
+                if scopes[scope] is None:
+                    continue
+                key = f"rate:{scope}:{scopes[scope]}"
+                wait = await self.backend.take(key, rate, burst)
+                if wait > 0:
+                    raise AdmissionRejected(f"Rate limit exceeded for this {scope}", wait)
+                taken.append((key, rate, burst))
+            for scope, limit in self.concurrency.items():
+                if scopes[scope] is None:
+                    continue
+                key = f"inflight:{scope}:{scopes[scope]}"
+                if not await self.backend.acquire_slot(key, limit, self.slot_ttl):
+                    raise AdmissionRejected(f"Too many concurrent requests for this {scope}", self.retry_after)
+                slots.append(key)
+        except AdmissionRejected:
+            self.rejected += 1
+            for key, rate, burst in taken:
+                await self.backend.take(key, rate, burst, cost=-1.0)
+            for key in slots:
+                await self.backend.release_slot(key)
+            raise
+        self.admitted += 1
+        return Admission(self.backend, slots, user_id)
+
+    def stats(self) -> dict:
+        return {"admitted": self.admitted, "rejected": self.rejected}
+
+class FairQueueLimiter:
+    """Bounds in-flight upstream calls, queueing excess calls fairly across tenants.
+
+    Waiters are kept in one FIFO per tenant and freed slots are handed out
+    round-robin over tenants, so one tenant's burst cannot starve the others.
+    Once `max_queue` calls are waiting, further calls are rejected.
+    """
+
+    def __init__(self, max_in_flight: int, max_queue: int, retry_after: float = 1.0):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self.in_flight = 0
+        self.queued = 0
+        self.rejected_total = 0
+        self._waiters: "OrderedDict[str, deque[asyncio.Future]]" = OrderedDict()
+
+    async def acquire(self, tenant: str) -> None:
+        if self.in_flight < self.max_in_flight and not self.queued:
+            self.in_flight += 1
+            return
+        if self.queued >= self.max_queue:
+            self.rejected_total += 1
+            raise AdmissionRejected("LLM request queue is full", self.retry_after)
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(tenant, deque()).append(future)
+        self.queued += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout=remaining_time())
+        except (asyncio.CancelledError, asyncio.TimeoutError) as e:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just as we gave up: pass it on
+                self.release()
+            else:
+                future.cancel()
+                self._discard(tenant, future)
+            if isinstance(e, asyncio.TimeoutError):
+                raise DeadlineExceeded("LLM request deadline exceeded while queued") from e
+            raise
+
+    def _discard(self, tenant: str, future: asyncio.Future) -> None:
+        waiters = self._waiters.get(tenant)
+        if waiters is not None and future in waiters:
+            waiters.remove(future)
+            self.queued -= 1
+            if not waiters:
+                del self._waiters[tenant]
+
+    def release(self) -> None:
+        """Hand the slot to the next tenant in round-robin order, or free it"""
+        while self._waiters:
+            tenant, waiters = next(iter(self._waiters.items()))
+            future = waiters.popleft()
+            self.queued -= 1
+            if waiters:
+                self._waiters.move_to_end(tenant)
+            else:
+                del self._waiters[tenant]
+            if not future.done():
+                future.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def stats(self) -> dict:
+        return {
+            "max_in_flight": self.max_in_flight,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queued,
+            "queued_tenants": len(self._waiters),
+            "rejected_total": self.rejected_total,
+        }
+
+class QueuedProvider(LLMProvider):
+    """Runs every upstream call under a FairQueueLimiter slot for the current tenant"""
+
+    def __init__(self, backend: LLMProvider, limiter: FairQueueLimiter):
+        self.backend = backend
+        self.limiter = limiter
+
+    async def send_message(self, messages: List[LLMMessage]) -> str:
+        await self.limiter.acquire(_tenant.get())
+        try:
+            return await self.backend.send_message(messages)
+        finally:
+            self.limiter.release()
+
+    async def stream_message(self, messages: List[LLMMessage]) -> AsyncIterator[str]:
+        await self.limiter.acquire(_tenant.get())
+        try:
+            async for delta in self.backend.stream_message(messages):
+                yield delta
+        finally:
+            self.limiter.release()
+
+    def backend_stats(self) -> list[dict]:
+        return self.backend.backend_stats() if hasattr(self.backend, "backend_stats") else []
+
+def _rate(per_minute: float, burst: float) -> tuple[float, float]:
+    return per_minute / 60.0, max(burst, 1.0)
+
+_controller: AdmissionController | None = None
+
+def get_admission_controller() -> AdmissionController:
+    global _controller
+    if _controller is None:
+        if settings.ADMISSION_BACKEND == "redis":
+            backend = RedisAdmissionBackend(settings.ADMISSION_REDIS_URL)
+        else:
+            backend = InMemoryAdmissionBackend()
+        rates = {}
+        if settings.RATE_LIMIT_USER_PER_MINUTE > 0:
+            rates["user"] = _rate(settings.RATE_LIMIT_USER_PER_MINUTE, settings.RATE_LIMIT_USER_BURST)
+        if settings.RATE_LIMIT_PROJECT_PER_MINUTE > 0:
+            rates["project"] = _rate(settings.RATE_LIMIT_PROJECT_PER_MINUTE, settings.RATE_LIMIT_PROJECT_BURST)
+        if settings.RATE_LIMIT_MODEL_PER_MINUTE > 0:
+            rates["model"] = _rate(settings.RATE_LIMIT_MODEL_PER_MINUTE, settings.RATE_LIMIT_MODEL_BURST)
+        concurrency = {}
+        if settings.MAX_CONCURRENT_TURNS_PER_USER > 0:
+            concurrency["user"] = settings.MAX_CONCURRENT_TURNS_PER_USER
+        if settings.MAX_CONCURRENT_TURNS_PER_PROJECT > 0:
+            concurrency["project"] = settings.MAX_CONCURRENT_TURNS_PER_PROJECT
+        _controller = AdmissionController(
+            backend,
+            rates,
+            concurrency,
+            retry_after=settings.ADMISSION_RETRY_AFTER_SECONDS,
+            # A lease outlives any turn, so only a crashed worker's slots ever expire
+            slot_ttl=settings.LLM_REQUEST_DEADLINE_SECONDS * 2,
+        )
+    return _controller
+
+upstream_limiter = FairQueueLimiter(
+    settings.LLM_MAX_IN_FLIGHT,
+    settings.LLM_QUEUE_MAX,
+    retry_after=settings.ADMISSION_RETRY_AFTER_SECONDS,
+)
@@ -0,0 +1,145 @@
+import asyncio
+import logging
+import uuid
+from typing import AsyncIterator, List
+from app.domain.chat import BatchItem, BatchResult
+from app.repositories.chat_repository import ConversationRepository
+from app.services.admission import Admission, AdmissionController, AdmissionRejected, upstream_tenant
+from app.services.chat_service import public_error_message
+from app.services.llm_provider import LLMProvider, LLMMessage
+from app.services.resilience import request_deadline
+from app.services.response_cache import ResponseCache
+
+logger = logging.getLogger(__name__)
+
+class BatchService:
+    """Runs independent prompt/input pairs against the LLM with bounded concurrency.
+
+    Results are yielded as each item finishes (not in request order). Each
+    successful item is saved as its own conversation; saves are buffered and
+    written `flush_size` at a time in one statement. A failing item is
+    reported and does not abort the batch.
+
+    Each item is admitted like a chat turn: it takes its own rate limit
+    tokens and holds a concurrency slot only while it runs. A rejected item
+    waits and retries, so a batch is paced by the limits, and fails once it
+    would wait past `item_deadline`.
+    """
+
+    def __init__(
+        self,
+        conversation_repo: ConversationRepository,
+        llm_provider: LLMProvider,
+        model: str = "",
+        response_cache: ResponseCache | None = None,
+        flush_size: int = 100,
+        item_deadline: float = 60.0,
+        admission: AdmissionController | None = None,
+    ):
+        self.conversation_repo = conversation_repo
+        self.llm_provider = llm_provider
+        self.model = model
+        self.response_cache = response_cache
+        self.flush_size = flush_size
+        self.item_deadline = item_deadline
+        self.admission = admission
+
+    async def _admit(self, user_id: str, project_id: str) -> Admission | None:
+        if self.admission is None:
+            return None
+        waited = 0.0
+        while True:
+            try:
+                return await self.admission.acquire(user_id, project_id, self.model)
+            except AdmissionRejected as e:
+                if waited + e.retry_after > self.item_deadline:
+                    raise
+                await asyncio.sleep(e.retry_after)
+                waited += e.retry_after
+
+    async def _complete(self, messages: List[LLMMessage], cache: ResponseCache | None) -> str:
+        if cache is not None:
+            cached = await cache.get(self.model, {}, messages)
+            if cached is not None:
+                return cached
+        with request_deadline(self.item_deadline):
+            response = await self.llm_provider.send_message(messages)
+        if cache is not None:
+            await cache.set(self.model, {}, messages, response)
+        return response
+
+    async def _run_item(
+        self, index: int, item: BatchItem, cache: ResponseCache | None, user_id: str, project_id: str
+    ) -> BatchResult:
+        messages = [LLMMessage("user", item.input)]
+        if item.prompt:
+            messages.insert(0, LLMMessage("system", item.prompt))
+        try:
+            admitted = await self._admit(user_id, project_id)
+            try:
+                response = await self._complete(messages, cache)
+            finally:
+                if admitted is not None:
+                    await admitted.release()
+        except Exception as e:
+            return BatchResult(index=index, ref=item.ref, status="error", error=public_error_message(e))
+        return BatchResult(
+            index=index, ref=item.ref, status="ok", response=response, conversation_id=str(uuid.uuid4())
+        )
+
+    async def run(
+        self, project_id: str, user_id: str, items: List[BatchItem], concurrency: int
+    ) -> AsyncIterator[BatchResult]:
+        cache = self.response_cache
+        if cache is not None and not cache.enabled_for(project_id):
+            cache = None
+
+        results: asyncio.Queue = asyncio.Queue()
+        next_index = iter(range(len(items)))
+
+        async def worker():
+            with upstream_tenant(user_id):
+                for index in next_index:
+                    await results.put(await self._run_item(index, items[index], cache, user_id, project_id))
+
+        workers = [asyncio.create_task(worker()) for _ in range(min(concurrency, len(items)))]
+        pending: List[BatchResult] = []
+        try:
+            for _ in range(len(items)):
+                result = await results.get()
+                # Yielded before its flush, so a failed save is reported after it and wins
+                yield result
+                if result.status == "ok":
+                    pending.append(result)
+                    if len(pending) >= self.flush_size:
+                        unsaved, pending = await self._flush(project_id, items, pending), []
+                        for failed in unsaved:
+                            yield failed
+            unsaved, pending = await self._flush(project_id, items, pending), []
+            for failed in unsaved:
+                yield failed
+        finally:
+            for task in workers:
+                task.cancel()
+            if pending:
+                # The client went away: still keep what already finished
+                await asyncio.shield(self._flush(project_id, items, pending))
+
+    async def _flush(
+        self, project_id: str, items: List[BatchItem], results: List[BatchResult]
+    ) -> List[BatchResult]:
+        """Save finished items in bulk; returns them re-reported as errors if saving failed"""
+        if not results:
+            return []
+        try:
+            await self.conversation_repo.bulk_create_with_messages(
+                project_id,
+                [(r.conversation_id, items[r.index].input, r.response) for r in results]
+            )
+        except Exception:
+            logger.exception("Failed to save %d batch results", len(results))
+            return [
+                BatchResult(index=r.index, ref=r.ref, status="error", error="Failed to save result")
+                for r in results
+            ]
+        return []
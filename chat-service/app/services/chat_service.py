@@ -1,28 +1,82 @@
-from typing import List
-from app.domain.chat import Conversation, Message
+import uuid
+from datetime import datetime
+from typing import AsyncIterator, List
+from app.core.tracing import tracer
+from app.domain.chat import Conversation, ConversationPage, Message, MessagePage, RowPage, Turn
 from app.repositories.chat_repository import ConversationRepository, MessageRepository
+from app.services.compaction import CompactionWorker
+from app.services.context_builder import ContextBuilder
 from app.services.llm_provider import LLMProvider, LLMMessage
+from app.services.prompts import PromptClient
+from app.services.admission import AdmissionRejected
+from app.services.resilience import CircuitOpenError, DeadlineExceeded
+from app.services.response_cache import ResponseCache
+
+def public_error_message(error: Exception) -> str:
+    """Client-facing description of a failed LLM turn, worded like the synchronous endpoints"""
+    if isinstance(error, CircuitOpenError):
+        return "LLM service temporarily unavailable"
+    if isinstance(error, DeadlineExceeded):
+        return "LLM service did not respond in time"
+    if isinstance(error, (AdmissionRejected, ValueError)):
+        return str(error)
+    return "Error communicating with LLM service"
 
 class ConversationService:
-    def __init__(self, conversation_repo: ConversationRepository):
+    def __init__(self, conversation_repo: ConversationRepository, prompts: PromptClient | None = None):
         self.conversation_repo = conversation_repo
+        self.prompts = prompts
     
     async def create_conversation(self, project_id: str) -> Conversation:
         return await self.conversation_repo.create(project_id)
     
+    async def create_from_prompt(
+        self, project_id: str, prompt_id: str, variables: dict[str, str], authorization: str
+    ) -> Conversation:
+        """Start a conversation whose system prompt is a stored prompt rendered once, now"""
+        system_prompt = await self.prompts.render(project_id, prompt_id, variables, authorization)
+        return await self.conversation_repo.create(project_id, system_prompt)
+    
     async def get_conversation(self, conversation_id: str) -> Conversation | None:
         return await self.conversation_repo.get_by_id(conversation_id)
     
-    async def list_conversations(self, project_id: str) -> List[Conversation]:
-        return await self.conversation_repo.list_by_project(project_id)
+    async def list_conversations(
+        self,
+        project_id: str,
+        limit: int,
+        after: tuple[datetime, uuid.UUID] | None = None
+    ) -> ConversationPage:
+        return await self.conversation_repo.list_by_project(project_id, limit, after)
+    
+    async def list_conversation_rows(
+        self,
+        project_id: str,
+        limit: int,
+        after: tuple[datetime, uuid.UUID] | None = None
+    ) -> RowPage:
+        return await self.conversation_repo.list_rows_by_project(project_id, limit, after)
     
     async def delete_conversation(self, conversation_id: str) -> bool:
         return await self.conversation_repo.delete(conversation_id)
 
 class MessageService:
-    def __init__(self, message_repo: MessageRepository, llm_provider: LLMProvider):
+    def __init__(
+        self,
+        message_repo: MessageRepository,
+        llm_provider: LLMProvider,
+        context_builder: ContextBuilder,
+        model: str = "",
+        response_cache: ResponseCache | None = None,
+        compactor: CompactionWorker | None = None
+    ):
         self.message_repo = message_repo
         self.llm_provider = llm_provider
+        self.context_builder = context_builder
+        self.model = model
+        self.response_cache = response_cache
+        self.compactor = compactor
+        # Sampling parameters sent upstream; part of the response cache key
+        self.llm_params: dict = {}
     
     async def add_message(self, conversation_id: str, role: str, content: str) -> Message:
         return await self.message_repo.create(conversation_id, role, content)
@@ -33,27 +87,121 @@ class MessageService:
     async def list_messages(self, conversation_id: str) -> List[Message]:
         return await self.message_repo.list_by_conversation(conversation_id)
     
+    async def list_messages_page(
+        self,
+        conversation_id: str,
+        limit: int,
+        before: tuple[datetime, uuid.UUID] | None = None,
+        after: tuple[datetime, uuid.UUID] | None = None
+    ) -> MessagePage:
+        return await self.message_repo.list_page(conversation_id, limit, before, after)
+    
+    async def list_message_rows(
+        self,
+        conversation_id: str,
+        limit: int,
+        before: tuple[datetime, uuid.UUID] | None = None,
+        after: tuple[datetime, uuid.UUID] | None = None
+    ) -> RowPage:
+        return await self.message_repo.list_page_rows(conversation_id, limit, before, after)
+    
+    async def _begin_turn(
+        self, conversation_id: str, user_message: str
+    ) -> tuple[List[LLMMessage], ResponseCache | None]:
+        """Save the user message and build the context window in one DB round trip.
+
+        Also returns the response cache if the conversation's project opted in,
+        and queues the conversation for background compaction once enough
+        unsummarized history has built up.
+        """
+        with tracer.span("chat.begin_turn"):
+            turn = await self.message_repo.begin_turn(
+                conversation_id, user_message, self.context_builder.max_messages
+            )
+        return self._prepare(conversation_id, turn)
+    
+    def _prepare(self, conversation_id: str, turn: Turn) -> tuple[List[LLMMessage], ResponseCache | None]:
+        if self.compactor is not None and self.compactor.wants(len(turn.history)):
+            self.compactor.enqueue(conversation_id)
+        cache = self.response_cache
+        if cache is not None and not cache.enabled_for(turn.project_id):
+            cache = None
+        summary = turn.summary.content if turn.summary else None
+        with tracer.span("chat.build_context", attributes={"chat.history_messages": len(turn.history)}) as span:
+            llm_messages = self.context_builder.build(turn.history, summary, turn.system_prompt)
+            span.set_attribute("chat.context_messages", len(llm_messages))
+        return llm_messages, cache
+    
+    async def _save_reply(self, conversation_id: str, response: str) -> None:
+        with tracer.span("chat.save_reply"):
+            await self.message_repo.append_reply(conversation_id, "assistant", response)
+    
+    async def _complete(self, llm_messages: List[LLMMessage], cache: ResponseCache | None) -> str:
+        response = None
+        if cache is not None:
+            response = await cache.get(self.model, self.llm_params, llm_messages)
+        if response is None:
+            response = await self.llm_provider.send_message(llm_messages)
+            if cache is not None:
+                await cache.set(self.model, self.llm_params, llm_messages, response)
+        return response
+    
+    async def generate_reply(self, conversation_id: str, message_id: str) -> str | None:
+        """Generate the reply to an already saved user message without saving it.
+
+        Used by async jobs; returns None if the message no longer exists.
+        """
+        turn = await self.message_repo.turn_until(
+            conversation_id, message_id, self.context_builder.max_messages
+        )
+        if turn is None:
+            return None
+        llm_messages, cache = self._prepare(conversation_id, turn)
+        return await self._complete(llm_messages, cache)
+    
     async def send_message_and_get_response(
         self, 
         conversation_id: str, 
         user_message: str
     ) -> str:
         """Add user message and get LLM response"""
-        # Add user message
-        await self.add_message(conversation_id, "user", user_message)
-        
-        # Get conversation history
-        messages = await self.list_messages(conversation_id)
+        # Add user message and build the context window from the history tail
+        llm_messages, cache = await self._begin_turn(conversation_id, user_message)
         
-        # Prepare messages for LLM
-        llm_messages = [
-            LLMMessage(msg.role, msg.content) for msg in messages
-        ]
-        
-        # Get LLM response
-        response = await self.llm_provider.send_message(llm_messages)
+        # Get LLM response, from the project's response cache when possible
+        response = await self._complete(llm_messages, cache)
         
         # Save assistant response
-        await self.add_message(conversation_id, "assistant", response)
+        await self._save_reply(conversation_id, response)
         
         return response
+
+    async def stream_message_and_get_response(
+        self,
+        conversation_id: str,
+        user_message: str
+    ) -> AsyncIterator[str]:
+        """Add user message and yield the LLM response as it is generated.
+
+        The assembled assistant message is saved once the stream completes.
+        A response cache hit is yielded as a single delta.
+        """
+        llm_messages, cache = await self._begin_turn(conversation_id, user_message)
+        
+        cached = None
+        if cache is not None:
+            cached = await cache.get(self.model, self.llm_params, llm_messages)
+        if cached is not None:
+            yield cached
+            await self._save_reply(conversation_id, cached)
+            return
+        
+        parts: List[str] = []
+        async for delta in self.llm_provider.stream_message(llm_messages):
+            parts.append(delta)
+            yield delta
+        
+        response = "".join(parts)
+        if cache is not None:
+            await cache.set(self.model, self.llm_params, llm_messages, response)
+        await self._save_reply(conversation_id, response)
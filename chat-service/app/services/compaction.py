@@ -0,0 +1,155 @@
+import asyncio
+import logging
+import uuid
+from typing import Callable, List
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.domain.chat import Message
+from app.repositories.postgres_chat_repo import PostgresMessageRepository, PostgresSummaryRepository
+from app.services.llm_provider import LLMProvider, LLMMessage, get_llm_provider
+from app.services.resilience import request_deadline
+
+logger = logging.getLogger(__name__)
+
+SUMMARIZE_INSTRUCTIONS = (
+    "You maintain a running summary of a conversation between a user and an assistant. "
+    "Merge the new messages into the existing summary. Keep facts, decisions, open questions "
+    "and user preferences that later turns may rely on; drop small talk. "
+    "Reply with the updated summary only."
+)
+
+def summarize_prompt(summary: str | None, messages: List[Message]) -> List[LLMMessage]:
+    transcript = "\n".join(f"{msg.role}: {msg.content}" for msg in messages)
+    return [
+        LLMMessage("system", SUMMARIZE_INSTRUCTIONS),
+        LLMMessage("user", f"Existing summary:\n{summary or '(none)'}\n\nNew messages:\n{transcript}"),
+    ]
+
+class CompactionWorker:
+    """Folds older turns into each conversation's rolling summary, off the request path.
+
+    Conversations are queued by `enqueue` (deduplicated, dropped when the
+    queue is full; the next turn re-queues them) and compacted by a fixed
+    number of worker tasks, each with its own DB session. Each pass folds the
+    oldest unsummarized messages, leaving the newest `keep_recent` verbatim,
+    and advances the summary with a compare-and-set on its covered-until
+    position, so repeated or concurrent passes are idempotent.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession],
+        llm_provider: LLMProvider,
+        workers: int = 2,
+        max_queue: int = 1000,
+        min_messages: int = 20,
+        keep_recent: int = 10,
+        batch_messages: int = 40,
+    ):
+        self.session_factory = session_factory
+        self.llm_provider = llm_provider
+        self.workers = workers
+        self.min_messages = min_messages
+        self.keep_recent = keep_recent
+        self.batch_messages = batch_messages
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._pending: set[str] = set()
+        self._tasks: List[asyncio.Task] = []
+        self.compacted_total = 0
+        self.failed_total = 0
+
+    def wants(self, unsummarized: int) -> bool:
+        """Whether a conversation with this many unsummarized messages is worth a pass"""
+        return unsummarized >= self.min_messages + self.keep_recent
+
+    def enqueue(self, conversation_id: str) -> None:
+        if conversation_id in self._pending or not self._tasks:
+            return
+        try:
+            self._queue.put_nowait(conversation_id)
+        except asyncio.QueueFull:
+            return
+        self._pending.add(conversation_id)
+
+    async def start(self) -> None:
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._run()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _run(self) -> None:
+        while True:
+            conversation_id = await self._queue.get()
+            try:
+                while await self.compact(conversation_id):
+                    pass  # keep folding until the backlog is below one batch
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.failed_total += 1
+                logger.exception("Compaction failed for conversation %s", conversation_id)
+            finally:
+                self._pending.discard(conversation_id)
+                self._queue.task_done()
+
+    async def compact(self, conversation_id: str) -> bool:
+        """Run one compaction pass; returns True if a full batch was folded and more may remain"""
+        async with self.session_factory() as db:
+            summaries = PostgresSummaryRepository(db)
+            summary = await summaries.get(conversation_id)
+            previous = None
+            if summary is not None:
+                previous = (summary.covered_until[0], uuid.UUID(summary.covered_until[1]))
+
+            unsummarized = await PostgresMessageRepository(db).list_since(
+                conversation_id, previous, self.batch_messages + self.keep_recent
+            )
+            # End the DB transaction before the (slow) LLM call
+            await db.rollback()
+            batch = unsummarized[:max(len(unsummarized) - self.keep_recent, 0)]
+            if len(batch) < self.min_messages:
+                return False
+
+            with request_deadline(settings.LLM_REQUEST_DEADLINE_SECONDS):
+                content = await self.llm_provider.send_message(
+                    summarize_prompt(summary.content if summary else None, batch)
+                )
+            last = batch[-1]
+            saved = await summaries.save(
+                conversation_id, content, (last.created_at, uuid.UUID(last.id)), previous
+            )
+        if saved:
+            self.compacted_total += 1
+        return saved and len(batch) == self.batch_messages
+
+    def stats(self) -> dict:
+        return {
+            "workers": len(self._tasks),
+            "queue_depth": self._queue.qsize(),
+            "compacted_total": self.compacted_total,
+            "failed_total": self.failed_total,
+        }
+
+_worker: CompactionWorker | None = None
+
+def get_compaction_worker() -> CompactionWorker | None:
+    """Process-wide compaction worker, or None when compaction is disabled"""
+    global _worker
+    if not settings.COMPACTION_ENABLED:
+        return None
+    if _worker is None:
+        from app.core.database import AsyncSessionLocal
+        _worker = CompactionWorker(
+            AsyncSessionLocal,
+            get_llm_provider(),
+            workers=settings.COMPACTION_WORKERS,
+            max_queue=settings.COMPACTION_QUEUE_MAX,
+            min_messages=settings.COMPACTION_MIN_MESSAGES,
+            keep_recent=settings.COMPACTION_KEEP_RECENT,
+            batch_messages=settings.COMPACTION_BATCH_MESSAGES,
+        )
+    return _worker
@@ -0,0 +1,73 @@
+from math import ceil
+from typing import Callable, List, Sequence
+from app.core.config import settings
+from app.domain.chat import Message
+from app.services.llm_provider import LLMMessage
+
+# Fixed per-message cost of the chat format (role, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+
+def estimate_tokens(text: str) -> int:
+    """Cheap local token estimate (~4 characters per token for English text)"""
+    return ceil(len(text) / 4)
+
+class ContextBuilder:
+    """Assemble the LLM context window for a conversation under a token budget.
+
+    The system prompt (the conversation's own, else the default) and the
+    conversation's rolling summary (if any) are always pinned first; the most recent turns are then added newest-first
+    until the next one would exceed the budget. The latest message is always
+    kept, even if it alone is over budget.
+    """
+
+    def __init__(
+        self,
+        token_budget: int,
+        system_prompt: str = "",
+        max_messages: int = 50,
+        estimator: Callable[[str], int] = estimate_tokens,
+    ):
+        self.token_budget = token_budget
+        self.system_prompt = system_prompt
+        self.max_messages = max_messages
+        self.estimator = estimator
+
+    @classmethod
+    def for_model(cls, model: str) -> "ContextBuilder":
+        budget = settings.CONTEXT_MODEL_TOKEN_BUDGETS.get(model, settings.CONTEXT_TOKEN_BUDGET)
+        return cls(
+            token_budget=budget,
+            system_prompt=settings.SYSTEM_PROMPT,
+            max_messages=settings.CONTEXT_MAX_MESSAGES,
+        )
+
+    def message_tokens(self, content: str) -> int:
+        return self.estimator(content) + MESSAGE_OVERHEAD_TOKENS
+
+    def build(
+        self, history: Sequence[Message], summary: str | None = None, system_prompt: str | None = None
+    ) -> List[LLMMessage]:
+        """Select the turns to send from `history` (oldest first, after the summary)"""
+        pinned: List[LLMMessage] = []
+        remaining = self.token_budget
+        system_prompt = system_prompt or self.system_prompt
+        if system_prompt:
+            pinned.append(LLMMessage("system", system_prompt))
+            remaining -= self.message_tokens(system_prompt)
+        if summary:
+            summary = SUMMARY_PREFIX + summary
+            pinned.append(LLMMessage("system", summary))
+            remaining -= self.message_tokens(summary)
+
+        selected: List[LLMMessage] = []
+        for msg in reversed(history[-self.max_messages:]):
+            cost = self.message_tokens(msg.content)
+            if selected and cost > remaining:
+                break
+            selected.append(LLMMessage(msg.role, msg.content))
+            remaining -= cost
+
+        selected.reverse()
+        return pinned + selected
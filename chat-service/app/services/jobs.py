@@ -0,0 +1,349 @@
+import asyncio
+import hashlib
+import hmac
+import ipaddress
+import json
+import logging
+import socket
+import time
+from datetime import datetime, timedelta
+from typing import Callable, List, Protocol
+import httpx
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.http_client import get_webhook_http_client
+from app.domain.chat import ChatJob
+from app.repositories.chat_repository import JobRepository
+from app.repositories.postgres_chat_repo import PostgresJobRepository
+from app.services.admission import upstream_tenant
+from app.services.chat_service import MessageService, public_error_message
+from app.services.resilience import request_deadline
+
+logger = logging.getLogger(__name__)
+
+class JobQueue(Protocol):
+    async def put(self, job_id: str) -> None: ...
+    async def get(self) -> str: ...
+
+class InMemoryJobQueue:
+    """Per-process queue; jobs lost with the process are recovered from the DB by the sweep"""
+
+    def __init__(self):
+        self._queue: asyncio.Queue = asyncio.Queue()
+
+    async def put(self, job_id: str) -> None:
+        self._queue.put_nowait(job_id)
+
+    async def get(self) -> str:
+        return await self._queue.get()
+
+    def qsize(self) -> int:
+        return self._queue.qsize()
+
+class RedisJobQueue:
+    """Queue shared by all workers and processes (requires the `redis` package)"""
+
+    def __init__(self, url: str, key: str = "omnirouter:chat-jobs"):
+        try:
+            from redis import asyncio as redis_asyncio
+        except ImportError as e:
+            raise RuntimeError("JOB_QUEUE_BACKEND=redis requires the 'redis' package") from e
+        self._redis = redis_asyncio.from_url(url, decode_responses=True)
+        self.key = key
+
+    async def put(self, job_id: str) -> None:
+        await self._redis.lpush(self.key, job_id)
+
+    async def get(self) -> str:
+        while True:
+            item = await self._redis.brpop(self.key, timeout=5)
+            if item is not None:
+                return item[1]
+
+def sign_webhook(secret: str, timestamp: str, body: bytes) -> str:
+    """HMAC-SHA256 over "<timestamp>.<body>", hex encoded"""
+    return hmac.new(secret.encode(), timestamp.encode() + b"." + body, hashlib.sha256).hexdigest()
+
+class CallbackRejected(ValueError):
+    """The callback URL is not one webhooks may be sent to"""
+
+def _public_address(address: str) -> bool:
+    ip = ipaddress.ip_address(address.split("%", 1)[0])
+    if isinstance(ip, ipaddress.IPv6Address) and ip.ipv4_mapped is not None:
+        ip = ip.ipv4_mapped
+    # is_global excludes loopback, private, link-local, reserved, unspecified and shared ranges
+    return ip.is_global and not ip.is_multicast
+
+async def resolve_callback(url: str, allowed_hosts: List[str]) -> tuple[httpx.URL, str]:
+    """Check a callback URL and resolve its host.
+
+    Returns the URL with its host replaced by one of the checked addresses,
+    and the original host:port for the Host header, so the request goes to
+    the address that was checked even if DNS changes in between. Raises
+    CallbackRejected for non-http(s) URLs, hosts outside `allowed_hosts`
+    (when set) and hosts resolving to any non-public address, and OSError
+    when the host cannot be resolved.
+    """
+    try:
+        parsed = httpx.URL(url)
+    except httpx.InvalidURL as e:
+        raise CallbackRejected("callback_url is not a valid URL") from e
+    if parsed.scheme not in ("http", "https") or not parsed.host:
+        raise CallbackRejected("callback_url must be an http(s) URL")
+    host = parsed.host.rstrip(".").lower()
+    if allowed_hosts and not any(
+        host == allowed or host.endswith("." + allowed) for allowed in (h.lower() for h in allowed_hosts)
+    ):
+        raise CallbackRejected("callback_url host is not allowed")
+    port = parsed.port or (443 if parsed.scheme == "https" else 80)
+    infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    addresses = [info[4][0] for info in infos]
+    if not addresses or not all(_public_address(address) for address in addresses):
+        raise CallbackRejected("callback_url must resolve to public addresses")
+    return parsed.copy_with(host=addresses[0]), parsed.netloc.decode("ascii")
+
+class WebhookSender:
+    """Delivers signed job completion callbacks with bounded retries.
+
+    Receivers should recompute the signature from the `X-Webhook-Timestamp`
+    header and raw body, compare it in constant time with
+    `X-Webhook-Signature` (`sha256=<hex>`) and reject stale timestamps.
+    The callback host is resolved and checked again before each attempt
+    (see `resolve_callback`), and the request is sent to the checked address.
+    """
+
+    def __init__(self, secret: str, max_attempts: int = 3, allowed_hosts: List[str] | None = None):
+        self.secret = secret
+        self.max_attempts = max_attempts
+        self.allowed_hosts = allowed_hosts or []
+        self.delivered_total = 0
+        self.failed_total = 0
+
+    async def deliver(self, url: str, payload: dict) -> bool:
+        body = json.dumps(payload, separators=(",", ":")).encode()
+        for attempt in range(self.max_attempts):
+            timestamp = str(int(time.time()))
+            try:
+                target, host = await resolve_callback(url, self.allowed_hosts)
+            except CallbackRejected as e:
+                logger.warning("Webhook to %s not sent: %s", url, e)
+                break
+            except OSError:
+                logger.warning("Webhook host of %s did not resolve (attempt %d)", url, attempt + 1, exc_info=True)
+                await asyncio.sleep(min(2 ** attempt, 10))
+                continue
+            headers = {
+                "Host": host,
+                "Content-Type": "application/json",
+                "X-Webhook-Timestamp": timestamp,
+                "X-Webhook-Signature": "sha256=" + sign_webhook(self.secret, timestamp, body),
+            }
+            try:
+                # TLS still verifies the certificate against the original host name
+                response = await get_webhook_http_client().post(
+                    target, content=body, headers=headers,
+                    extensions={"sni_hostname": httpx.URL(url).host}
+                )
+                if response.status_code < 300:
+                    self.delivered_total += 1
+                    return True
+                if 400 <= response.status_code < 500 and response.status_code != 429:
+                    break  # the receiver rejected it; retrying will not help
+            except Exception:
+                logger.warning("Webhook delivery to %s failed (attempt %d)", url, attempt + 1, exc_info=True)
+            await asyncio.sleep(min(2 ** attempt, 10))
+        self.failed_total += 1
+        return False
+
+def job_payload(job: ChatJob) -> dict:
+    return {
+        "job_id": job.id,
+        "conversation_id": job.conversation_id,
+        "status": job.status,
+        "response": job.response,
+        "reply_message_id": job.reply_message_id,
+        "error": job.error,
+        "completed_at": job.completed_at.isoformat() if job.completed_at else None,
+    }
+
+class ChatJobService:
+    def __init__(self, job_repo: JobRepository, queue: JobQueue):
+        self.job_repo = job_repo
+        self.queue = queue
+
+    async def submit(
+        self, conversation_id: str, user_id: str, content: str, callback_url: str | None = None
+    ) -> ChatJob | None:
+        """Save the user message, record the job and queue it; None if the conversation is missing"""
+        job = await self.job_repo.create(conversation_id, user_id, content, callback_url)
+        if job is not None:
+            await self.queue.put(job.id)
+        return job
+
+    async def get_job(self, job_id: str, user_id: str) -> ChatJob | None:
+        job = await self.job_repo.get(job_id)
+        if job is None or job.user_id != user_id:
+            return None
+        return job
+
+class JobWorker:
+    """In-process pool running queued chat jobs.
+
+    Job state lives in the `chat_jobs` table and each transition is a
+    guarded UPDATE, so a job is only ever run by the worker that claimed it.
+    A periodic sweep (which also runs at startup) re-queues jobs due for a
+    retry, jobs whose worker died mid-turn and jobs presumed lost with their
+    queue, so a restart does not lose turns in flight. A job that keeps
+    taking its worker down fails once it has had `max_attempts`.
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        session_factory: Callable[[], AsyncSession],
+        service_factory: Callable[[AsyncSession], MessageService],
+        webhooks: WebhookSender | None = None,
+        workers: int = 4,
+        max_attempts: int = 3,
+        sweep_interval: float = 30.0,
+        stale_after: float = 300.0,
+    ):
+        self.queue = queue
+        self.session_factory = session_factory
+        self.service_factory = service_factory
+        self.webhooks = webhooks
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.sweep_interval = sweep_interval
+        self.stale_after = stale_after
+        self._tasks: List[asyncio.Task] = []
+        self.running = 0
+        self.succeeded_total = 0
+        self.failed_total = 0
+
+    async def start(self) -> None:
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._consume()) for _ in range(self.workers)]
+            self._tasks.append(asyncio.create_task(self._sweep()))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _consume(self) -> None:
+        while True:
+            job_id = await self.queue.get()
+            try:
+                await self.run(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Chat job %s crashed", job_id)
+
+    async def _sweep(self) -> None:
+        # At startup every queued job not waiting for a retry is presumed lost
+        # with the previous process's queue; a duplicate is skipped by `claim`
+        lost_after = 0.0
+        while True:
+            try:
+                now = datetime.utcnow()
+                async with self.session_factory() as db:
+                    job_ids, abandoned = await PostgresJobRepository(db).requeue(
+                        stale_before=now - timedelta(seconds=self.stale_after),
+                        lost_before=now - timedelta(seconds=lost_after),
+                        max_attempts=self.max_attempts,
+                    )
+                lost_after = self.stale_after
+                for job_id in job_ids:
+                    await self.queue.put(job_id)
+                for job in abandoned:
+                    await self._finished(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Chat job recovery sweep failed")
+            await asyncio.sleep(self.sweep_interval)
+
+    async def run(self, job_id: str) -> ChatJob | None:
+        """Claim and run one job; returns its final state, or None if it was not claimable"""
+        async with self.session_factory() as db:
+            jobs = PostgresJobRepository(db)
+            job = await jobs.claim(job_id)
+            if job is None:
+                return None  # already claimed by another worker, or finished
+
+            self.running += 1
+            try:
+                with upstream_tenant(job.user_id), request_deadline(settings.LLM_REQUEST_DEADLINE_SECONDS):
+                    response = await self.service_factory(db).generate_reply(job.conversation_id, job.message_id)
+            except asyncio.CancelledError:
+                # Left running; the sweep re-queues it once it goes stale
+                raise
+            except Exception as e:
+                # Configuration errors (ValueError) will not fix themselves; a retry waits for the sweep
+                retry = job.attempts < self.max_attempts and not isinstance(e, ValueError)
+                job = await jobs.fail(job.id, public_error_message(e), datetime.utcnow() if retry else None)
+            else:
+                if response is None:
+                    job = await jobs.fail(job.id, "Message not found", retry_at=None)
+                else:
+                    job = await jobs.complete(job.id, job.conversation_id, response)
+            finally:
+                self.running -= 1
+
+        if job is None or job.status == "queued":
+            return job
+        await self._finished(job)
+        return job
+
+    async def _finished(self, job: ChatJob) -> None:
+        if job.status == "succeeded":
+            self.succeeded_total += 1
+        else:
+            self.failed_total += 1
+        if job.callback_url and self.webhooks is not None:
+            await self.webhooks.deliver(job.callback_url, job_payload(job))
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers if self._tasks else 0,
+            "running": self.running,
+            "queue_depth": self.queue.qsize() if hasattr(self.queue, "qsize") else None,
+            "succeeded_total": self.succeeded_total,
+            "failed_total": self.failed_total,
+            "webhooks_delivered_total": self.webhooks.delivered_total if self.webhooks else 0,
+            "webhooks_failed_total": self.webhooks.failed_total if self.webhooks else 0,
+        }
+
+_worker: JobWorker | None = None
+
+def get_job_worker() -> JobWorker | None:
+    """Process-wide job worker pool, or None when async jobs are disabled"""
+    global _worker
+    if not settings.JOBS_ENABLED:
+        return None
+    if _worker is None:
+        from app.core.database import AsyncSessionLocal
+        from app.utils.dependencies import build_message_service
+        if settings.JOB_QUEUE_BACKEND == "redis":
+            queue = RedisJobQueue(settings.JOB_QUEUE_REDIS_URL)
+        else:
+            queue = InMemoryJobQueue()
+        webhooks = None
+        if settings.WEBHOOK_SECRET:
+            webhooks = WebhookSender(
+                settings.WEBHOOK_SECRET, settings.WEBHOOK_MAX_ATTEMPTS, settings.WEBHOOK_ALLOWED_HOSTS
+            )
+        _worker = JobWorker(
+            queue,
+            AsyncSessionLocal,
+            build_message_service,
+            webhooks=webhooks,
+            workers=settings.JOB_WORKERS,
+            max_attempts=settings.JOB_MAX_ATTEMPTS,
+            sweep_interval=settings.JOB_SWEEP_INTERVAL_SECONDS,
+            stale_after=settings.JOB_STALE_SECONDS,
+        )
+    return _worker
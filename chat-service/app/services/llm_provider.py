@@ -1,7 +1,34 @@
+import asyncio
+import json
+import time
 from abc import ABC, abstractmethod
-from typing import List
+from typing import AsyncIterator, List
 import httpx
 from app.core.config import settings
+from app.core.http_client import get_llm_http_client
+from app.core.metrics import Counter, Histogram
+from app.core.tracing import current_span, tracer
+
+# Upper bounds (seconds) for upstream call latency and time to first token
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+
+LLM_REQUEST_DURATION = Histogram(
+    "llm_request_duration_seconds",
+    "Upstream LLM call latency, until the full completion is received",
+    ("provider", "model", "outcome"),
+    LLM_BUCKETS
+)
+LLM_TIME_TO_FIRST_TOKEN = Histogram(
+    "llm_time_to_first_token_seconds",
+    "Time from sending a streamed request to its first content delta",
+    ("provider", "model"),
+    LLM_BUCKETS
+)
+LLM_TOKENS = Counter(
+    "llm_tokens_total",
+    "Tokens billed by the upstream, by kind (prompt or completion)",
+    ("provider", "model", "kind")
+)
 
 class LLMMessage:
     def __init__(self, role: str, content: str):
@@ -14,73 +41,216 @@ class LLMProvider(ABC):
         """Send messages to LLM and return response"""
         pass
 
-class OpenRouterProvider(LLMProvider):
-    def __init__(self):
-        self.api_key = settings.OPENROUTER_API_KEY
-        self.model = settings.LLM_MODEL
-        self.base_url = "https://openrouter.ai/api/v1"
-    
-    async def send_message(self, messages: List[LLMMessage]) -> str:
-        """Call OpenRouter API"""
+    async def stream_message(self, messages: List[LLMMessage]) -> AsyncIterator[str]:
+        """Send messages to LLM and yield the response as content deltas.
+
+        Providers without native streaming yield the full completion once.
+        """
+        yield await self.send_message(messages)
+
+def model_for(backend: str) -> str:
+    """The model id `backend` expects: LLM_MODELS[backend], else LLM_MODEL.
+
+    OpenRouter ids carry a vendor prefix ("openai/gpt-4o") that OpenAI's own
+    API rejects, so the openai backend drops it.
+    """
+    model = settings.LLM_MODELS.get(backend)
+    if model:
+        return model
+    if backend == "openai" and settings.LLM_MODEL.startswith("openai/"):
+        return settings.LLM_MODEL[len("openai/"):]
+    return settings.LLM_MODEL
+
+class OpenAICompatibleProvider(LLMProvider):
+    """Base for providers exposing the OpenAI `/chat/completions` API"""
+    name = "openai-compatible"
+    api_key_setting = "API_KEY"
+
+    def __init__(
+        self, api_key: str, base_url: str, client: httpx.AsyncClient | None = None, model: str | None = None
+    ):
+        self.api_key = api_key
+        self.model = model or model_for(self.name)
+        self.base_url = base_url
+        self._client = client
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        return self._client or get_llm_http_client()
+
+    def _headers(self) -> dict:
         if not self.api_key:
-            raise ValueError("OPENROUTER_API_KEY not configured")
-        
-        payload = {
-            "model": self.model,
-            "messages": [{"role": msg.role, "content": msg.content} for msg in messages],
-        }
-        
-        headers = {
+            raise ValueError(f"{self.api_key_setting} not configured")
+        return {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json",
         }
-        
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{self.base_url}/chat/completions",
-                json=payload,
-                headers=headers,
-                timeout=60.0
-            )
-            response.raise_for_status()
-            result = response.json()
-            return result["choices"][0]["message"]["content"]
-
-class OpenAIProvider(LLMProvider):
-    def __init__(self):
-        self.api_key = settings.OPENAI_API_KEY
-        self.model = settings.LLM_MODEL
-        self.base_url = "https://api.openai.com/v1"
-    
-    async def send_message(self, messages: List[LLMMessage]) -> str:
-        """Call OpenAI API"""
-        if not self.api_key:
-            raise ValueError("OPENAI_API_KEY not configured")
-        
-        payload = {
+
+    def _payload(self, messages: List[LLMMessage]) -> dict:
+        return {
             "model": self.model,
             "messages": [{"role": msg.role, "content": msg.content} for msg in messages],
         }
-        
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json",
-        }
-        
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{self.base_url}/chat/completions",
-                json=payload,
-                headers=headers,
-                timeout=60.0
-            )
-            response.raise_for_status()
-            result = response.json()
-            return result["choices"][0]["message"]["content"]
+
+    def _span(self, stream: bool):
+        return tracer.span(
+            "llm.chat_completion",
+            "client",
+            {"llm.provider": self.name, "llm.model": self.model, "llm.stream": stream}
+        )
+
+    def _observe(self, started: float, outcome: str, usage: dict | None = None) -> None:
+        LLM_REQUEST_DURATION.labels(self.name, self.model, outcome).observe(time.perf_counter() - started)
+        span = current_span()
+        span.set_attribute("llm.outcome", outcome)
+        if usage:
+            prompt_tokens = usage.get("prompt_tokens") or 0
+            completion_tokens = usage.get("completion_tokens") or 0
+            LLM_TOKENS.labels(self.name, self.model, "prompt").inc(prompt_tokens)
+            LLM_TOKENS.labels(self.name, self.model, "completion").inc(completion_tokens)
+            span.set_attribute("llm.prompt_tokens", prompt_tokens)
+            span.set_attribute("llm.completion_tokens", completion_tokens)
+
+    async def send_message(self, messages: List[LLMMessage]) -> str:
+        """Call the chat completions API over the shared connection pool"""
+        headers = self._headers()
+        with self._span(stream=False):
+            started = time.perf_counter()
+            try:
+                response = await self.client.post(
+                    f"{self.base_url}/chat/completions",
+                    json=self._payload(messages),
+                    headers=headers,
+                )
+                response.raise_for_status()
+                result = response.json()
+            except asyncio.CancelledError:
+                self._observe(started, "aborted")  # e.g. the losing side of a hedged request
+                raise
+            except Exception:
+                self._observe(started, "error")
+                raise
+            self._observe(started, "ok", result.get("usage"))
+        return result["choices"][0]["message"]["content"]
+
+    async def stream_message(self, messages: List[LLMMessage]) -> AsyncIterator[str]:
+        """Call the chat completions API with `stream: true` and yield content deltas"""
+        headers = self._headers()
+        payload = self._payload(messages)
+        payload["stream"] = True
+        # Ask for a final chunk carrying `usage`, so streamed tokens are counted too
+        payload["stream_options"] = {"include_usage": True}
+        with self._span(stream=True) as span:
+            started = time.perf_counter()
+            first_token = True
+            usage = None
+            outcome = "error"
+            try:
+                async with self.client.stream(
+                    "POST",
+                    f"{self.base_url}/chat/completions",
+                    json=payload,
+                    headers=headers,
+                ) as response:
+                    response.raise_for_status()
+                    async for line in response.aiter_lines():
+                        # Server-sent events: only `data:` lines carry chunks
+                        if not line.startswith("data:"):
+                            continue
+                        data = line[5:].strip()
+                        if data == "[DONE]":
+                            break
+                        chunk = json.loads(data)
+                        usage = chunk.get("usage") or usage
+                        choices = chunk.get("choices") or []
+                        if not choices:
+                            continue
+                        delta = choices[0].get("delta", {}).get("content")
+                        if delta:
+                            if first_token:
+                                first_token = False
+                                ttft = time.perf_counter() - started
+                                LLM_TIME_TO_FIRST_TOKEN.labels(self.name, self.model).observe(ttft)
+                                span.set_attribute("llm.time_to_first_token_ms", ttft * 1000)
+                            yield delta
+                outcome = "ok"
+            except (GeneratorExit, asyncio.CancelledError):
+                outcome = "aborted"  # the consumer stopped reading or the call was cancelled
+                raise
+            finally:
+                self._observe(started, outcome, usage)
+
+class OpenRouterProvider(OpenAICompatibleProvider):
+    name = "openrouter"
+    api_key_setting = "OPENROUTER_API_KEY"
+
+    def __init__(self, client: httpx.AsyncClient | None = None, model: str | None = None):
+        super().__init__(settings.OPENROUTER_API_KEY, settings.OPENROUTER_BASE_URL, client, model)
+
+class OpenAIProvider(OpenAICompatibleProvider):
+    name = "openai"
+    api_key_setting = "OPENAI_API_KEY"
+
+    def __init__(self, client: httpx.AsyncClient | None = None, model: str | None = None):
+        super().__init__(settings.OPENAI_API_KEY, settings.OPENAI_BASE_URL, client, model)
+
+PROVIDERS = {
+    "openrouter": OpenRouterProvider,
+    "openai": OpenAIProvider,
+}
+
+_provider: LLMProvider | None = None
+breakers: dict = {}  # backend name -> CircuitBreaker, for metrics
+
+def _resilient(name: str) -> LLMProvider:
+    from app.services.resilience import CircuitBreaker, ResilientProvider
+    breaker = CircuitBreaker(
+        name,
+        failure_threshold=settings.LLM_BREAKER_FAILURE_THRESHOLD,
+        reset_timeout=settings.LLM_BREAKER_RESET_SECONDS,
+        half_open_max_calls=settings.LLM_BREAKER_HALF_OPEN_MAX_CALLS,
+    )
+    breakers[name] = breaker
+    return ResilientProvider(
+        PROVIDERS[name](),
+        breaker,
+        max_attempts=settings.LLM_RETRY_MAX_ATTEMPTS,
+        base_delay=settings.LLM_RETRY_BASE_DELAY_SECONDS,
+        max_delay=settings.LLM_RETRY_MAX_DELAY_SECONDS,
+    )
+
+def _build_provider() -> LLMProvider:
+    names = [name.strip() for name in settings.LLM_PROVIDERS.split(",") if name.strip()]
+    unknown = [name for name in names if name not in PROVIDERS]
+    if unknown:
+        raise ValueError(
+            f"Unknown backend(s) in LLM_PROVIDERS: {', '.join(unknown)} (expected {', '.join(PROVIDERS)})"
+        )
+    if len(names) <= 1:
+        name = names[0] if names else settings.LLM_PROVIDER
+        return _resilient(name if name in PROVIDERS else "openrouter")
+    
+    from app.services.llm_router import RoutingProvider
+    return RoutingProvider(
+        [_resilient(name) for name in names],
+        window=settings.LLM_ROUTER_WINDOW,
+        hedge=settings.LLM_HEDGE_ENABLED,
+        hedge_percentile=settings.LLM_HEDGE_PERCENTILE,
+        hedge_min_delay=settings.LLM_HEDGE_MIN_DELAY_SECONDS,
+    )
 
 def get_llm_provider() -> LLMProvider:
-    """Factory function to get appropriate LLM provider"""
-    if settings.LLM_PROVIDER == "openai":
-        return OpenAIProvider()
-    else:
-        return OpenRouterProvider()
+    """Return the process-wide LLM provider (providers are stateless and share one HTTP pool).
+
+    Setting LLM_PROVIDERS to several backends (e.g. "openrouter,openai")
+    yields a RoutingProvider over them; otherwise LLM_PROVIDER picks one.
+    Every backend is wrapped in a ResilientProvider (retries + circuit breaker).
+    With LLM_MAX_IN_FLIGHT set, the whole stack runs behind a fair queue.
+    """
+    global _provider
+    if _provider is None:
+        _provider = _build_provider()
+        if settings.LLM_MAX_IN_FLIGHT > 0:
+            from app.services.admission import QueuedProvider, upstream_limiter
+            _provider = QueuedProvider(_provider, upstream_limiter)
+    return _provider
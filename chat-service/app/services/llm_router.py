@@ -0,0 +1,165 @@
+import asyncio
+import time
+from collections import deque
+from typing import AsyncIterator, List
+from app.services.llm_provider import LLMProvider, LLMMessage
+
+class BackendStats:
+    """Rolling latency and error-rate window for one backend"""
+
+    def __init__(self, window: int):
+        self._outcomes: deque = deque(maxlen=window)  # True for success, False for failure
+        self._latencies: deque = deque(maxlen=window)  # seconds, successful calls only
+
+    def record_success(self, latency: float) -> None:
+        self._outcomes.append(True)
+        self._latencies.append(latency)
+
+    def record_failure(self) -> None:
+        self._outcomes.append(False)
+
+    def record_abandoned(self, elapsed: float) -> None:
+        """A call cancelled after losing a hedge: it took at least `elapsed`"""
+        self._latencies.append(elapsed)
+
+    @property
+    def samples(self) -> int:
+        return len(self._outcomes)
+
+    def error_rate(self) -> float:
+        if not self._outcomes:
+            return 0.0
+        return self._outcomes.count(False) / len(self._outcomes)
+
+    def latency_percentile(self, q: float) -> float | None:
+        if not self._latencies:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+    def score(self) -> float:
+        """Lower is healthier: median latency inflated by the recent error rate"""
+        p50 = self.latency_percentile(0.5)
+        if p50 is None:
+            # Unmeasured backends go first so they get explored; backends that
+            # have only ever failed go last
+            return 0.0 if not self._outcomes else float("inf")
+        return p50 * (1 + 10 * self.error_rate())
+
+class RoutingProvider(LLMProvider):
+    """Routes each request to the healthiest backend, failing over on errors.
+
+    With hedging enabled, a second request is fired on the next-best backend
+    once the first has been outstanding longer than that backend's recent
+    latency percentile; the first successful response wins and the other
+    request is cancelled. Streams fail over only before the first delta.
+    """
+
+    def __init__(
+        self,
+        backends: List[LLMProvider],
+        window: int = 100,
+        hedge: bool = False,
+        hedge_percentile: float = 0.95,
+        hedge_min_delay: float = 1.0,
+    ):
+        if not backends:
+            raise ValueError("RoutingProvider needs at least one backend")
+        self.backends = backends
+        self.stats = {id(backend): BackendStats(window) for backend in backends}
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_delay = hedge_min_delay
+
+    def _ranked(self) -> List[LLMProvider]:
+        return sorted(self.backends, key=lambda backend: self.stats[id(backend)].score())
+
+    def _hedge_delay(self, backend: LLMProvider) -> float:
+        latency = self.stats[id(backend)].latency_percentile(self.hedge_percentile)
+        return max(latency or 0.0, self.hedge_min_delay)
+
+    async def _timed_call(self, backend: LLMProvider, messages: List[LLMMessage]) -> str:
+        stats = self.stats[id(backend)]
+        started = time.monotonic()
+        try:
+            response = await backend.send_message(messages)
+        except asyncio.CancelledError:
+            stats.record_abandoned(time.monotonic() - started)
+            raise
+        except Exception:
+            stats.record_failure()
+            raise
+        stats.record_success(time.monotonic() - started)
+        return response
+
+    async def send_message(self, messages: List[LLMMessage]) -> str:
+        candidates = self._ranked()
+        loop = asyncio.get_running_loop()
+        pending: dict = {}
+        last_error: Exception | None = None
+
+        def launch() -> LLMProvider:
+            backend = candidates.pop(0)
+            pending[asyncio.create_task(self._timed_call(backend, messages))] = backend
+            return backend
+
+        first = launch()
+        hedge_at = loop.time() + self._hedge_delay(first) if self.hedge and candidates else None
+        try:
+            while pending:
+                timeout = None if hedge_at is None else max(hedge_at - loop.time(), 0)
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # Primary is slower than its usual tail: hedge on the next backend
+                    hedge_at = None
+                    launch()
+                    continue
+                for task in done:
+                    pending.pop(task)
+                    if task.exception() is None:
+                        return task.result()
+                    last_error = task.exception()
+                if not pending and candidates:
+                    # Everything in flight failed: fail over to the next backend
+                    hedge_at = None
+                    launch()
+            raise last_error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def stream_message(self, messages: List[LLMMessage]) -> AsyncIterator[str]:
+        last_error: Exception | None = None
+        for backend in self._ranked():
+            stats = self.stats[id(backend)]
+            started = time.monotonic()
+            streamed = False
+            try:
+                async for delta in backend.stream_message(messages):
+                    if not streamed:
+                        streamed = True
+                        # Time-to-first-token is what routing optimises for streams
+                        stats.record_success(time.monotonic() - started)
+                    yield delta
+                if not streamed:
+                    stats.record_success(time.monotonic() - started)
+                return
+            except Exception as e:
+                stats.record_failure()
+                if streamed:
+                    # Part of the reply already reached the client; cannot fail over
+                    raise
+                last_error = e
+        raise last_error
+
+    def backend_stats(self) -> list[dict]:
+        return [
+            {
+                "backend": getattr(backend, "name", type(backend).__name__),
+                "samples": self.stats[id(backend)].samples,
+                "error_rate": self.stats[id(backend)].error_rate(),
+                "p50_seconds": self.stats[id(backend)].latency_percentile(0.5),
+                "p95_seconds": self.stats[id(backend)].latency_percentile(0.95),
+            }
+            for backend in self.backends
+        ]
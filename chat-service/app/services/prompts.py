@@ -0,0 +1,62 @@
+import uuid
+from typing import Mapping
+import httpx
+from app.core.config import settings
+from app.core.http_client import get_project_http_client
+
+class PromptNotFoundError(LookupError):
+    """The prompt or its project does not exist or is not owned by the caller"""
+
+class PromptServiceUnavailable(RuntimeError):
+    """The project service could not be reached or failed"""
+
+class PromptClient:
+    """Renders stored prompt templates through the project service.
+
+    Calls carry the end user's Authorization header, so the project service
+    applies its own ownership checks.
+    """
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url.rstrip("/")
+
+    async def render(
+        self, project_id: str, prompt_id: str, variables: Mapping[str, str], authorization: str
+    ) -> str:
+        """Return the prompt's current version rendered with `variables`.
+
+        Raises PromptNotFoundError, ValueError (bad variables, with the
+        project service's message, or malformed ids) or PromptServiceUnavailable.
+        """
+        try:
+            project_id, prompt_id = str(uuid.UUID(project_id)), str(uuid.UUID(prompt_id))
+        except ValueError:
+            raise ValueError("Invalid project_id or prompt_id")
+        try:
+            response = await get_project_http_client().post(
+                f"{self.base_url}/projects/{project_id}/prompts/{prompt_id}/render",
+                json={"variables": dict(variables)},
+                headers={"Authorization": authorization}
+            )
+        except httpx.RequestError as e:
+            raise PromptServiceUnavailable("Project service unavailable") from e
+
+        if response.status_code == 404:
+            raise PromptNotFoundError(prompt_id)
+        if response.status_code in (200, 400, 422):
+            # A proxy in between may answer with a non-JSON error page
+            try:
+                body = response.json()
+            except ValueError as e:
+                raise PromptServiceUnavailable("Project service returned an invalid response") from e
+            if response.status_code == 200:
+                content = body.get("content") if isinstance(body, dict) else None
+                if not isinstance(content, str):
+                    raise PromptServiceUnavailable("Project service returned an invalid response")
+                return content
+            detail = body.get("detail") if isinstance(body, dict) else None
+            raise ValueError(detail if isinstance(detail, str) else "Invalid prompt variables")
+        raise PromptServiceUnavailable(f"Project service returned {response.status_code}")
+
+def get_prompt_client() -> PromptClient:
+    return PromptClient(settings.PROJECT_SERVICE_URL)
@@ -0,0 +1,250 @@
+import asyncio
+import random
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import AsyncIterator, List
+import httpx
+from app.services.llm_provider import LLMProvider, LLMMessage
+
+# Absolute time.monotonic() by which the current request must finish
+_deadline: ContextVar[float | None] = ContextVar("llm_request_deadline", default=None)
+
+class CircuitOpenError(Exception):
+    """The backend's circuit breaker is open; the call was not attempted"""
+
+    def __init__(self, backend: str, retry_after: float):
+        super().__init__(f"Circuit open for LLM backend '{backend}'")
+        self.retry_after = retry_after
+
+class DeadlineExceeded(Exception):
+    """The request deadline passed before the LLM call could complete"""
+
+@contextmanager
+def request_deadline(seconds: float):
+    """Bound every LLM call made inside the block (including retries) to `seconds`"""
+    deadline = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(deadline if current is None else min(current, deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+def remaining_time() -> float | None:
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with half-open probing.
+
+    closed -> open after `failure_threshold` consecutive failures; open ->
+    half_open after `reset_timeout`, letting `half_open_max_calls` probes
+    through; a successful probe closes the circuit, a failed one reopens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float, half_open_max_calls: int = 1):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.state = self.CLOSED
+        self.transitions: Counter = Counter()
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+
+    def _transition(self, state: str) -> None:
+        if state != self.state:
+            self.transitions[f"{self.state}->{state}"] += 1
+            self.state = state
+
+    def before_call(self) -> None:
+        """Raise CircuitOpenError unless a call may go through right now"""
+        if self.state == self.OPEN:
+            waited = time.monotonic() - self._opened_at
+            if waited < self.reset_timeout:
+                raise CircuitOpenError(self.name, self.reset_timeout - waited)
+            self._transition(self.HALF_OPEN)
+            self._probes = 0
+        if self.state == self.HALF_OPEN:
+            if self._probes >= self.half_open_max_calls:
+                raise CircuitOpenError(self.name, self.reset_timeout)
+            self._probes += 1
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._transition(self.CLOSED)
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+            self._opened_at = time.monotonic()
+            self._transition(self.OPEN)
+
+    def release_probe(self) -> None:
+        """Give back a half-open probe slot for a call that reached no verdict"""
+        if self.state == self.HALF_OPEN and self._probes > 0:
+            self._probes -= 1
+
+    def snapshot(self) -> dict:
+        return {
+            "backend": self.name,
+            "state": self.state,
+            "consecutive_failures": self._failures,
+            "transitions": dict(self.transitions),
+        }
+
+def _retry_after_seconds(response: httpx.Response) -> float | None:
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max((when - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+        return status == 429 or status >= 500
+    return isinstance(error, (httpx.TransportError, asyncio.TimeoutError))
+
+def _counts_against_backend(error: Exception) -> bool:
+    # Rate limiting (429) and client errors say nothing about backend health
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code >= 500
+    return isinstance(error, (httpx.TransportError, asyncio.TimeoutError))
+
+class ResilientProvider(LLMProvider):
+    """Wraps a provider with bounded retries, a circuit breaker and the request deadline.
+
+    Retries 429/5xx and transport errors with exponential backoff and full
+    jitter, never sleeping less than the upstream's Retry-After nor past the
+    deadline. Streams are only retried before their first delta, and the
+    deadline also bounds the wait for each delta, so a stalled stream ends.
+    """
+
+    def __init__(
+        self,
+        backend: LLMProvider,
+        breaker: CircuitBreaker,
+        max_attempts: int = 3,
+        base_delay: float = 0.5,
+        max_delay: float = 8.0,
+    ):
+        self.backend = backend
+        self.name = getattr(backend, "name", type(backend).__name__)
+        self.breaker = breaker
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def _check_deadline(self) -> float | None:
+        remaining = remaining_time()
+        if remaining is not None and remaining <= 0:
+            raise DeadlineExceeded("LLM request deadline exceeded")
+        return remaining
+
+    async def _backoff(self, attempt: int, error: Exception) -> None:
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        if isinstance(error, httpx.HTTPStatusError):
+            retry_after = _retry_after_seconds(error.response)
+            if retry_after is not None:
+                delay = max(delay, retry_after)
+        remaining = remaining_time()
+        if remaining is not None and delay >= remaining:
+            raise error
+        await asyncio.sleep(delay)
+
+    def _record(self, error: Exception | None) -> None:
+        if error is None:
+            self.breaker.record_success()
+        elif _counts_against_backend(error):
+            self.breaker.record_failure()
+        else:
+            self.breaker.release_probe()
+
+    async def send_message(self, messages: List[LLMMessage]) -> str:
+        for attempt in range(self.max_attempts):
+            remaining = self._check_deadline()
+            self.breaker.before_call()
+            try:
+                response = await asyncio.wait_for(self.backend.send_message(messages), timeout=remaining)
+            except asyncio.CancelledError:
+                self.breaker.release_probe()
+                raise
+            except Exception as e:
+                self._record(e)
+                if isinstance(e, asyncio.TimeoutError) and remaining_time() is not None and remaining_time() <= 0:
+                    raise DeadlineExceeded("LLM request deadline exceeded") from e
+                if not _is_retryable(e) or attempt == self.max_attempts - 1:
+                    raise
+                await self._backoff(attempt, e)
+                continue
+            self._record(None)
+            return response
+
+    async def _next_delta(self, stream: AsyncIterator[str]) -> str:
+        """The stream's next delta, failing with DeadlineExceeded if none arrives in time"""
+        remaining = self._check_deadline()
+        if remaining is None:
+            return await stream.__anext__()
+        timeout = asyncio.timeout(remaining)
+        try:
+            async with timeout:
+                return await stream.__anext__()
+        except TimeoutError as e:
+            if timeout.expired():
+                raise DeadlineExceeded("LLM request deadline exceeded") from e
+            raise
+
+    async def stream_message(self, messages: List[LLMMessage]) -> AsyncIterator[str]:
+        for attempt in range(self.max_attempts):
+            self._check_deadline()
+            self.breaker.before_call()
+            streamed = False
+            settled = False  # the breaker has had this attempt's verdict
+            stream = self.backend.stream_message(messages)
+            try:
+                while True:
+                    try:
+                        delta = await self._next_delta(stream)
+                    except StopAsyncIteration:
+                        break
+                    if not streamed:
+                        streamed = settled = True
+                        self._record(None)
+                    yield delta
+                if not settled:
+                    settled = True
+                    self._record(None)
+                return
+            except Exception as e:
+                if not settled:
+                    settled = True
+                    # A stall before the first delta is the backend's timeout
+                    self._record(e.__cause__ if isinstance(e, DeadlineExceeded) and e.__cause__ else e)
+                if isinstance(e, DeadlineExceeded) or streamed or not _is_retryable(e):
+                    raise
+                if attempt == self.max_attempts - 1:
+                    raise
+                await self._backoff(attempt, e)
+            finally:
+                if not settled:
+                    self.breaker.release_probe()  # closed by a client disconnect mid-probe
+                await stream.aclose()
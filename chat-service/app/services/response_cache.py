@@ -0,0 +1,202 @@
+import hashlib
+import json
+import math
+import time
+from collections import OrderedDict
+from typing import List, Protocol, Sequence
+from app.core.config import settings
+from app.services.llm_provider import LLMMessage
+
+def cache_key(model: str, params: dict, messages: Sequence[LLMMessage]) -> str:
+    """Canonical hash of everything that determines a completion"""
+    canonical = json.dumps(
+        {
+            "model": model,
+            "params": params,
+            "messages": [[msg.role, msg.content] for msg in messages],
+        },
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+class CacheBackend(Protocol):
+    async def get(self, key: str) -> str | None: ...
+    async def set(self, key: str, value: str, ttl: float) -> None: ...
+
+class InMemoryCacheBackend:
+    """Per-process LRU with TTL, bounded by entry count and total value size"""
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, tuple[str, float, int]]" = OrderedDict()
+        self._bytes = 0
+
+    def _evict(self, key: str) -> None:
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    async def get(self, key: str) -> str | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= time.time():
+            self._evict(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    async def set(self, key: str, value: str, ttl: float) -> None:
+        size = len(value.encode())
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._evict(key)
+        self._entries[key] = (value, time.time() + ttl, size)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            self._evict(next(iter(self._entries)))
+
+class RedisCacheBackend:
+    """Shared backend so all workers see the same cache (requires the `redis` package)"""
+
+    def __init__(self, url: str, prefix: str = "omnirouter:llm-cache:"):
+        try:
+            from redis import asyncio as redis_asyncio
+        except ImportError as e:
+            raise RuntimeError("RESPONSE_CACHE_BACKEND=redis requires the 'redis' package") from e
+        self._redis = redis_asyncio.from_url(url, decode_responses=True)
+        self.prefix = prefix
+
+    async def get(self, key: str) -> str | None:
+        return await self._redis.get(self.prefix + key)
+
+    async def set(self, key: str, value: str, ttl: float) -> None:
+        await self._redis.set(self.prefix + key, value, px=int(ttl * 1000))
+
+def _embed(text: str, dims: int = 512) -> dict[int, float]:
+    """Local hashed character-trigram embedding, L2-normalised (sparse)"""
+    text = " ".join(text.lower().split())
+    vector: dict[int, float] = {}
+    for i in range(max(len(text) - 2, 1)):
+        bucket = int.from_bytes(hashlib.blake2b(text[i:i + 3].encode(), digest_size=4).digest(), "big") % dims
+        vector[bucket] = vector.get(bucket, 0.0) + 1.0
+    norm = math.sqrt(sum(v * v for v in vector.values())) or 1.0
+    return {bucket: v / norm for bucket, v in vector.items()}
+
+def _cosine(a: dict[int, float], b: dict[int, float]) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(v * b.get(bucket, 0.0) for bucket, v in a.items())
+
+class SemanticIndex:
+    """Maps near-duplicate prompts to the exact-match key of an earlier completion.
+
+    Only the final user message is embedded. Everything before it, plus
+    model and params, must match exactly (it is hashed into the partition),
+    because shared history or a shared system prompt would otherwise make
+    different questions look alike. Lookups are a linear scan over at most
+    `max_entries` vectors.
+    """
+
+    def __init__(self, threshold: float, max_entries: int):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple[str, dict[int, float]]]" = OrderedDict()
+
+    @staticmethod
+    def partition(model: str, params: dict, messages: Sequence[LLMMessage]) -> str | None:
+        """Exact-match key for everything but the final user message; None if there is none"""
+        if not messages or messages[-1].role != "user":
+            return None
+        return cache_key(model, params, messages[:-1])
+
+    def nearest(self, partition: str, messages: Sequence[LLMMessage]) -> str | None:
+        query = _embed(messages[-1].content)
+        best_key, best_score = None, self.threshold
+        for key, (entry_partition, vector) in self._entries.items():
+            if entry_partition != partition:
+                continue
+            score = _cosine(query, vector)
+            if score >= best_score:
+                best_key, best_score = key, score
+        return best_key
+
+    def add(self, partition: str, key: str, messages: Sequence[LLMMessage]) -> None:
+        self._entries[key] = (partition, _embed(messages[-1].content))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+class ResponseCache:
+    """Completion cache in front of the LLM provider, enabled per project"""
+
+    def __init__(
+        self,
+        backend: CacheBackend,
+        ttl: float,
+        projects: List[str],
+        semantic: SemanticIndex | None = None,
+    ):
+        self.backend = backend
+        self.ttl = ttl
+        self.projects = set(projects)
+        self.semantic = semantic
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    def enabled_for(self, project_id: str | None) -> bool:
+        return "*" in self.projects or (project_id is not None and project_id in self.projects)
+
+    async def get(self, model: str, params: dict, messages: Sequence[LLMMessage]) -> str | None:
+        value = await self.backend.get(cache_key(model, params, messages))
+        if value is not None:
+            self.hits += 1
+            return value
+        partition = self.semantic.partition(model, params, messages) if self.semantic is not None else None
+        if partition is not None:
+            similar = self.semantic.nearest(partition, messages)
+            if similar is not None:
+                value = await self.backend.get(similar)
+                if value is not None:
+                    self.semantic_hits += 1
+                    return value
+        self.misses += 1
+        return None
+
+    async def set(self, model: str, params: dict, messages: Sequence[LLMMessage], response: str) -> None:
+        key = cache_key(model, params, messages)
+        await self.backend.set(key, response, self.ttl)
+        partition = self.semantic.partition(model, params, messages) if self.semantic is not None else None
+        if partition is not None:
+            self.semantic.add(partition, key, messages)
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "semantic_hits": self.semantic_hits, "misses": self.misses}
+
+_response_cache: ResponseCache | None = None
+
+def get_response_cache() -> ResponseCache | None:
+    """Process-wide response cache, or None when no project has opted in"""
+    global _response_cache
+    projects = [p.strip() for p in settings.RESPONSE_CACHE_PROJECTS.split(",") if p.strip()]
+    if not projects:
+        return None
+    if _response_cache is None:
+        if settings.RESPONSE_CACHE_BACKEND == "redis":
+            backend = RedisCacheBackend(settings.RESPONSE_CACHE_REDIS_URL)
+        else:
+            backend = InMemoryCacheBackend(
+                settings.RESPONSE_CACHE_MAX_ENTRIES, settings.RESPONSE_CACHE_MAX_BYTES
+            )
+        semantic = None
+        if settings.RESPONSE_CACHE_SEMANTIC:
+            semantic = SemanticIndex(
+                settings.RESPONSE_CACHE_SEMANTIC_THRESHOLD,
+                settings.RESPONSE_CACHE_SEMANTIC_MAX_ENTRIES,
+            )
+        _response_cache = ResponseCache(backend, settings.RESPONSE_CACHE_TTL_SECONDS, projects, semantic)
+    return _response_cache
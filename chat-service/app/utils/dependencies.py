@@ -2,18 +2,58 @@ from fastapi import Depends, HTTPException, Header
 from sqlalchemy.ext.asyncio import AsyncSession
 import httpx
 import os
+from app.core.config import settings
 from app.core.database import get_db
+from app.core.http_client import get_auth_http_client
 from app.core.security import verify_token
-from app.repositories.postgres_chat_repo import PostgresConversationRepository, PostgresMessageRepository
+from app.core.token_cache import TokenCache
+from app.repositories.postgres_chat_repo import (
+    PostgresConversationRepository, PostgresJobRepository, PostgresMessageRepository
+)
+from app.services.admission import AdmissionController, get_admission_controller
+from app.services.batch import BatchService
 from app.services.chat_service import ConversationService, MessageService
+from app.services.compaction import get_compaction_worker
+from app.services.context_builder import ContextBuilder
+from app.services.jobs import ChatJobService, get_job_worker
 from app.services.llm_provider import get_llm_provider
+from app.services.prompts import get_prompt_client
+from app.services.response_cache import get_response_cache
 
 # Auth service URL from environment
 AUTH_SERVICE_URL = os.getenv("AUTH_SERVICE_URL", "https://omnirouter-auth1.onrender.com")
 USE_LOCAL_AUTH = os.getenv("USE_LOCAL_AUTH", "false").lower() == "true"
 
+token_cache = TokenCache(settings.TOKEN_CACHE_MAX_ENTRIES, settings.TOKEN_CACHE_TTL_SECONDS)
+
+def _verify_locally(token: str) -> str:
+    user_id = verify_token(token)
+    if not user_id:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    return user_id
+
+async def _validate_with_auth_service(authorization: str, token: str) -> tuple[str, float | None]:
+    """Call the auth service to validate a token, falling back to local verification"""
+    try:
+        response = await get_auth_http_client().get(
+            f"{AUTH_SERVICE_URL}/auth/validate",
+            headers={"Authorization": authorization}
+        )
+    except httpx.RequestError:
+        # Auth service unavailable, fallback to local validation
+        return _verify_locally(token), None
+    
+    if response.status_code == 200:
+        data = response.json()
+        return data["user_id"], data.get("exp")
+    elif response.status_code == 404:
+        # Auth service doesn't have validate endpoint yet, fallback to local
+        return _verify_locally(token), None
+    else:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
 async def get_current_user(authorization: str = Header(None)) -> str:
-    """Validate token by calling auth service, with local fallback."""
+    """Validate token by calling auth service (cached per token), with local fallback."""
     if not authorization:
         raise HTTPException(status_code=401, detail="Missing authorization header")
     
@@ -25,46 +65,56 @@ async def get_current_user(authorization: str = Header(None)) -> str:
     except ValueError:
         raise HTTPException(status_code=401, detail="Invalid authorization header format")
     
-    # Use local validation if configured or as fallback
+    # Use local validation if configured
     if USE_LOCAL_AUTH:
-        user_id = verify_token(token)
-        if not user_id:
-            raise HTTPException(status_code=401, detail="Invalid token")
-        return user_id
+        return _verify_locally(token)
     
-    # Call auth service to validate token
     try:
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            response = await client.get(
-                f"{AUTH_SERVICE_URL}/auth/validate",
-                headers={"Authorization": authorization}
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                return data["user_id"]
-            elif response.status_code == 404:
-                # Auth service doesn't have validate endpoint yet, fallback to local
-                user_id = verify_token(token)
-                if not user_id:
-                    raise HTTPException(status_code=401, detail="Invalid token")
-                return user_id
-            else:
-                raise HTTPException(status_code=401, detail="Invalid token")
-    except httpx.RequestError:
-        # Auth service unavailable, fallback to local validation
-        user_id = verify_token(token)
-        if not user_id:
-            raise HTTPException(status_code=401, detail="Invalid token")
-        return user_id
-    except Exception as e:
+        return await token_cache.get_or_validate(
+            token, lambda: _validate_with_auth_service(authorization, token)
+        )
+    except HTTPException:
+        raise
+    except Exception:
         raise HTTPException(status_code=401, detail="Token validation failed")
 
 def get_conversation_service(db: AsyncSession = Depends(get_db)) -> ConversationService:
     conversation_repo = PostgresConversationRepository(db)
-    return ConversationService(conversation_repo)
+    return ConversationService(conversation_repo, get_prompt_client())
 
-def get_message_service(db: AsyncSession = Depends(get_db)) -> MessageService:
-    message_repo = PostgresMessageRepository(db)
+def build_message_service(db: AsyncSession) -> MessageService:
+    """Wire a MessageService onto a session (also used by background job workers)"""
+    message_repo = PostgresMessageRepository(db, summaries=settings.COMPACTION_ENABLED)
     llm_provider = get_llm_provider()
-    return MessageService(message_repo, llm_provider)
+    context_builder = ContextBuilder.for_model(settings.LLM_MODEL)
+    return MessageService(
+        message_repo,
+        llm_provider,
+        context_builder,
+        model=settings.LLM_MODEL,
+        response_cache=get_response_cache(),
+        compactor=get_compaction_worker()
+    )
+
+def get_message_service(db: AsyncSession = Depends(get_db)) -> MessageService:
+    return build_message_service(db)
+
+def get_batch_service(db: AsyncSession = Depends(get_db)) -> BatchService:
+    return BatchService(
+        PostgresConversationRepository(db),
+        get_llm_provider(),
+        model=settings.LLM_MODEL,
+        response_cache=get_response_cache(),
+        flush_size=settings.BATCH_FLUSH_SIZE,
+        item_deadline=settings.LLM_REQUEST_DEADLINE_SECONDS,
+        admission=get_admission_controller()
+    )
+
+def get_chat_job_service(db: AsyncSession = Depends(get_db)) -> ChatJobService | None:
+    worker = get_job_worker()
+    if worker is None:
+        return None
+    return ChatJobService(PostgresJobRepository(db), worker.queue)
+
+def get_admission() -> AdmissionController:
+    return get_admission_controller()
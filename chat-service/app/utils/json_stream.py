@@ -0,0 +1,53 @@
+import uuid
+from typing import Iterator, Literal, Mapping, Sequence
+import pydantic_core
+from fastapi.responses import StreamingResponse
+
+try:
+    import orjson
+except ImportError:  # optional: pydantic-core's encoder is used instead
+    orjson = None
+
+StreamFormat = Literal["json", "ndjson"]
+
+# Rows encoded per chunk written to the response
+CHUNK_ROWS = 100
+
+def _default(value):
+    if isinstance(value, uuid.UUID):
+        return str(value)  # asyncpg returns its own UUID subclass, which orjson does not know
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+def dumps(value) -> bytes:
+    """Compact JSON; UUIDs and datetimes come out as the Pydantic response models encode them"""
+    if orjson is not None:
+        return orjson.dumps(value, default=_default)
+    return pydantic_core.to_json(value)
+
+def iter_json_array(columns: Sequence[str], rows: Sequence[tuple]) -> Iterator[bytes]:
+    """Encode rows as one JSON array of objects, `CHUNK_ROWS` rows per encoder call"""
+    if not rows:
+        yield b"[]"
+        return
+    for start in range(0, len(rows), CHUNK_ROWS):
+        chunk = dumps([dict(zip(columns, row)) for row in rows[start:start + CHUNK_ROWS]])
+        # Each chunk is encoded as an array; splice them into a single one
+        yield (b"[" if start == 0 else b",") + chunk[1:-1]
+    yield b"]"
+
+def iter_ndjson(columns: Sequence[str], rows: Sequence[tuple]) -> Iterator[bytes]:
+    """Encode rows as newline-delimited JSON objects, `CHUNK_ROWS` rows per chunk"""
+    for start in range(0, len(rows), CHUNK_ROWS):
+        yield b"".join(dumps(dict(zip(columns, row))) + b"\n" for row in rows[start:start + CHUNK_ROWS])
+
+def stream_rows(
+    columns: Sequence[str],
+    rows: Sequence[tuple],
+    fmt: StreamFormat,
+    headers: Mapping[str, str] | None = None
+) -> StreamingResponse:
+    """Stream DB rows straight to the client, bypassing response-model validation"""
+    if fmt == "ndjson":
+        body = iter_ndjson(columns, rows)
+        return StreamingResponse(body, media_type="application/x-ndjson", headers=headers)
+    return StreamingResponse(iter_json_array(columns, rows), media_type="application/json", headers=headers)
@@ -0,0 +1,4 @@
+-- Backs keyset-paginated conversation listing per project:
+-- WHERE project_id = ? ORDER BY created_at, id
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_conversations_project_created_id
+    ON conversations (project_id, created_at, id);
@@ -0,0 +1,3 @@
+-- Per-conversation system prompt, rendered from a stored project prompt when
+-- the conversation is created; NULL falls back to SYSTEM_PROMPT.
+ALTER TABLE conversations ADD COLUMN IF NOT EXISTS system_prompt TEXT;
@@ -0,0 +1,4 @@
+-- Composite index backing keyset pagination of message history and
+-- per-turn history-tail reads: WHERE conversation_id = ? ORDER BY created_at, id
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_messages_conversation_created_id
+    ON messages (conversation_id, created_at, id);
@@ -0,0 +1,25 @@
+-- Durable state for async chat turns (POST /conversations/{id}/jobs).
+-- Workers claim and finish jobs with guarded UPDATEs; the recovery sweep
+-- scans unfinished jobs by (status, updated_at). next_attempt_at is set while
+-- a failed job waits for its retry, and NULL while a job is in a queue.
+CREATE TABLE IF NOT EXISTS chat_jobs (
+    id UUID PRIMARY KEY,
+    conversation_id UUID NOT NULL REFERENCES conversations (id) ON DELETE CASCADE,
+    user_id VARCHAR(255) NOT NULL,
+    message_id UUID NOT NULL,
+    status VARCHAR(20) NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at TIMESTAMP,
+    callback_url VARCHAR(2048),
+    response TEXT,
+    reply_message_id UUID,
+    error TEXT,
+    created_at TIMESTAMP NOT NULL DEFAULT now(),
+    updated_at TIMESTAMP NOT NULL DEFAULT now(),
+    completed_at TIMESTAMP
+);
+
+-- Tables created before next_attempt_at existed
+ALTER TABLE chat_jobs ADD COLUMN IF NOT EXISTS next_attempt_at TIMESTAMP;
+
+CREATE INDEX IF NOT EXISTS ix_chat_jobs_status_updated ON chat_jobs (status, updated_at);
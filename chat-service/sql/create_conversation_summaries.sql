@@ -0,0 +1,10 @@
+-- Rolling per-conversation summary maintained by the background compaction
+-- worker. covered_until_* is the (created_at, id) position of the last
+-- message folded into the summary; later messages are sent verbatim.
+CREATE TABLE IF NOT EXISTS conversation_summaries (
+    conversation_id UUID PRIMARY KEY REFERENCES conversations (id) ON DELETE CASCADE,
+    content TEXT NOT NULL,
+    covered_until_created_at TIMESTAMP NOT NULL,
+    covered_until_id UUID NOT NULL,
+    updated_at TIMESTAMP NOT NULL DEFAULT now()
+);
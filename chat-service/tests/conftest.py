@@ -0,0 +1,5 @@
+import os
+
+# Settings are read at import time; no test connects to these
+os.environ.setdefault("DATABASE_URL", "postgresql://postgres@localhost/omnirouter_test")
+os.environ.setdefault("JWT_SECRET", "test-secret")
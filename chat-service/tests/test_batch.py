@@ -0,0 +1,28 @@
+import asyncio
+from app.domain.chat import BatchItem
+from app.services.batch import BatchService
+from app.services.llm_provider import LLMProvider
+
+class EchoProvider(LLMProvider):
+    async def send_message(self, messages):
+        return messages[-1].content
+
+class FailingSaves:
+    async def bulk_create_with_messages(self, project_id, conversations):
+        raise RuntimeError("insert failed")
+
+def run_batch(service, items):
+    async def collect():
+        return [result async for result in service.run("project", "user", items, concurrency=1)]
+    return asyncio.run(collect())
+
+def test_failed_save_is_reported_after_the_result():
+    service = BatchService(FailingSaves(), EchoProvider(), flush_size=1)
+    results = run_batch(service, [BatchItem(prompt="", input="a"), BatchItem(prompt="", input="b")])
+
+    # The route keeps the last report per index, so the error must follow the "ok" line
+    last = {}
+    for result in results:
+        last[result.index] = result
+    assert [(r.index, r.status) for r in results] == [(0, "ok"), (0, "error"), (1, "ok"), (1, "error")]
+    assert all(r.status == "error" and r.error == "Failed to save result" for r in last.values())
@@ -0,0 +1,11 @@
+import subprocess
+import sys
+from pathlib import Path
+import pytest
+
+SCRIPT = Path(__file__).resolve().parents[2] / "scripts" / "check_shared_modules.py"
+
+@pytest.mark.skipif(not SCRIPT.exists(), reason="needs the whole repository, not just this service")
+def test_shared_modules_match_across_services():
+    result = subprocess.run([sys.executable, str(SCRIPT)], capture_output=True, text=True)
+    assert result.returncode == 0, result.stdout
@@ -10,6 +10,7 @@ export default function ChatInterface({ project }) {
   const [inputValue, setInputValue] = useState('');
   const [loading, setLoading] = useState(false);
   const [conversationLoading, setConversationLoading] = useState(false);
+  const [olderCursor, setOlderCursor] = useState(null);
   const messagesEndRef = useRef(null);
 
   useEffect(() => {
@@ -51,17 +52,33 @@ export default function ChatInterface({ project }) {
     }
   };
 
+  const olderCursorFrom = (response) =>
+    response.headers['x-has-more'] === 'true' ? response.headers['x-before-cursor'] : null;
+
   const selectConversation = async (conversation) => {
     setActiveConversation(conversation);
     setMessages([]);
+    setOlderCursor(null);
     try {
       const response = await chatAPI.getConversationMessages(conversation.id);
       setMessages(response.data || []);
+      setOlderCursor(olderCursorFrom(response));
     } catch (err) {
       console.error('Failed to load messages:', err);
     }
   };
 
+  const loadOlderMessages = async () => {
+    if (!activeConversation || !olderCursor) return;
+    try {
+      const response = await chatAPI.getConversationMessages(activeConversation.id, { before: olderCursor });
+      setMessages(prev => [...(response.data || []), ...prev]);
+      setOlderCursor(olderCursorFrom(response));
+    } catch (err) {
+      console.error('Failed to load older messages:', err);
+    }
+  };
+
   const handleSendMessage = async (e) => {
     e.preventDefault();
     if (!inputValue.trim() || !activeConversation) return;
@@ -79,18 +96,19 @@ export default function ChatInterface({ project }) {
         created_at: new Date().toISOString()
       }]);
 
-      // Send message to backend
-      const response = await chatAPI.sendMessage(activeConversation.id, userMessage);
-      
-      // Add assistant response
-      if (response.data && response.data.response) {
-        setMessages(prev => [...prev, {
-          id: 'assistant-' + Date.now(),
-          role: 'assistant',
-          content: response.data.response,
-          created_at: new Date().toISOString()
-        }]);
-      }
+      // Stream assistant response into the UI as tokens arrive
+      const assistantId = 'assistant-' + Date.now();
+      setMessages(prev => [...prev, {
+        id: assistantId,
+        role: 'assistant',
+        content: '',
+        created_at: new Date().toISOString()
+      }]);
+      await chatAPI.streamMessage(activeConversation.id, userMessage, (delta) => {
+        setMessages(prev => prev.map(msg =>
+          msg.id === assistantId ? { ...msg, content: msg.content + delta } : msg
+        ));
+      });
     } catch (err) {
       console.error('Failed to send message:', err);
       // Remove optimistic user message on error
@@ -177,6 +195,11 @@ export default function ChatInterface({ project }) {
           ) : (
             <>
               <div className="messages-list">
+                {olderCursor && (
+                  <button className="load-older-btn" onClick={loadOlderMessages}>
+                    Load older messages
+                  </button>
+                )}
                 {messages.length === 0 ? (
                   <div className="empty-state">
                     <p>Start the conversation by sending a message</p>
@@ -20,6 +20,20 @@ const addTokenToRequest = (token) => {
   }
 };
 
+// Listings are keyset-paginated: follow X-Next-Cursor until the last page and
+// resolve like a single response whose data holds every item
+const getAllPages = async (api, url, params = {}) => {
+  const items = [];
+  let response;
+  let after = params.after;
+  do {
+    response = await api.get(url, { params: { ...params, after } });
+    items.push(...(response.data || []));
+    after = response.headers['x-next-cursor'];
+  } while (after);
+  return { ...response, data: items };
+};
+
 // Auth API
 export const authAPI = {
   register: (email, password) =>
@@ -32,8 +46,8 @@ export const authAPI = {
 export const projectAPI = {
   createProject: (name, description) =>
     projectApi.post('/projects', { name, description }),
-  getProjects: () =>
-    projectApi.get('/projects'),
+  getProjects: (params = {}) =>
+    getAllPages(projectApi, '/projects', params),
   getProject: (projectId) =>
     projectApi.get(`/projects/${projectId}`),
   updateProject: (projectId, name, description) =>
@@ -44,8 +58,8 @@ export const projectAPI = {
   // Prompts
   createPrompt: (projectId, name, content) =>
     projectApi.post(`/projects/${projectId}/prompts`, { name, content }),
-  getPrompts: (projectId) =>
-    projectApi.get(`/projects/${projectId}/prompts`),
+  getPrompts: (projectId, params = {}) =>
+    getAllPages(projectApi, `/projects/${projectId}/prompts`, params),
   updatePrompt: (projectId, promptId, name, content) =>
     projectApi.put(`/projects/${projectId}/prompts/${promptId}`, { name, content }),
   deletePrompt: (projectId, promptId) =>
@@ -58,12 +72,47 @@ export const chatAPI = {
     chatApi.post('/conversations', null, { params: { project_id: projectId } }),
   getConversation: (conversationId) =>
     chatApi.get(`/conversations/${conversationId}`),
-  getConversationMessages: (conversationId) =>
-    chatApi.get(`/conversations/${conversationId}/messages`),
+  // Newest page first; pass { before: cursor } (from the X-Before-Cursor header) for older pages
+  getConversationMessages: (conversationId, params = {}) =>
+    chatApi.get(`/conversations/${conversationId}/messages`, { params }),
   sendMessage: (conversationId, content) =>
     chatApi.post(`/conversations/${conversationId}/messages`, { content }),
-  listProjectConversations: (projectId) =>
-    chatApi.get(`/conversations/project/${projectId}`),
+  // Streams the assistant reply as Server-Sent Events, calling onDelta for each token chunk
+  streamMessage: async (conversationId, content, onDelta) => {
+    const response = await fetch(`${API_BASE_URLs.chat}/conversations/${conversationId}/messages/stream`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+        Authorization: chatApi.defaults.headers.common['Authorization']
+      },
+      body: JSON.stringify({ content })
+    });
+    if (!response.ok) {
+      throw new Error(`Stream request failed with status ${response.status}`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      const frames = buffer.split('\n\n');
+      buffer = frames.pop();
+      for (const frame of frames) {
+        const event = frame.match(/^event: (.*)$/m)?.[1];
+        const data = frame.match(/^data: (.*)$/m)?.[1];
+        if (!data) continue;
+        const payload = JSON.parse(data);
+        if (event === 'error') throw new Error(payload.detail);
+        if (event === 'done') return payload;
+        onDelta(payload.delta);
+      }
+    }
+  },
+  listProjectConversations: (projectId, params = {}) =>
+    getAllPages(chatApi, `/conversations/project/${projectId}`, params),
   deleteConversation: (conversationId) =>
     chatApi.delete(`/conversations/${conversationId}`)
 };
@@ -4,6 +4,35 @@ class Settings(BaseSettings):
     DATABASE_URL: str
     JWT_SECRET: str
     JWT_ALGORITHM: str = "HS256"
+    TOKEN_CACHE_MAX_ENTRIES: int = 10000
+    TOKEN_CACHE_TTL_SECONDS: float = 60.0
+    AUTH_HTTP_TIMEOUT: float = 5.0
+    PROMPT_TEMPLATE_CACHE_MAX_ENTRIES: int = 10000  # compiled prompt templates kept per process
+    PROMPT_VERSION_SNAPSHOT_INTERVAL: int = 20  # history stores a full copy at least this often
+    PROMPT_VERSION_CACHE_MAX_ENTRIES: int = 1000  # rebuilt past versions kept per process
+
+    # Database connection pool, per worker process. Keep workers x (DB_POOL_SIZE + DB_MAX_OVERFLOW),
+    # summed over all services, under the Postgres connection limit
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 5
+    DB_POOL_TIMEOUT_SECONDS: float = 10.0  # wait for a free connection, then fail the request
+    DB_POOL_RECYCLE_SECONDS: int = 1800  # reopen older connections before server or proxy idle limits drop them
+    DB_POOL_PRE_PING: bool = False  # test connections at checkout, at one round trip per checkout
+    DB_STATEMENT_CACHE_SIZE: int = 100  # prepared statements per connection; 0 behind pgbouncer in transaction mode
+
+    # Optional read replica for list and get queries. Reads fall back to the primary while
+    # it is down or lagging, and after the request has written
+    DATABASE_READ_URL: str = ""
+    DB_REPLICA_MAX_LAG_SECONDS: float = 5.0
+    DB_REPLICA_CHECK_INTERVAL_SECONDS: float = 5.0  # lag and health re-checked this often, while reads come in
+    DB_REPLICA_CONNECT_TIMEOUT_SECONDS: float = 2.0
+
+    # Tracing (W3C traceparent); TRACE_EXPORTER is none, memory or file
+    SERVICE_NAME: str = "project-service"
+    TRACE_EXPORTER: str = "none"
+    TRACE_SAMPLE_RATIO: float = 1.0  # share of new traces recorded; incoming traceparents decide for theirs
+    TRACE_FILE: str = "traces.jsonl"
+    TRACE_MEMORY_MAX_SPANS: int = 10000
 
     class Config:
         env_file = ".env"
@@ -1,24 +1,195 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import sessionmaker
+import asyncio
+import logging
+import time
+from sqlalchemy import event, text
+from sqlalchemy.engine import Result
+from sqlalchemy.exc import InterfaceError, OperationalError, TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession
+from sqlalchemy.orm import Session, sessionmaker
 from app.core.config import settings
+from app.core.metrics import DB_READS, DB_REPLICA_LAG, DB_REPLICA_UP, instrument_engine, instrument_pool
+from app.core.tracing import trace_statement
 
-DATABASE_URL = settings.DATABASE_URL.replace(
-    "postgresql://",
-    "postgresql+asyncpg://"
-)
+logger = logging.getLogger(__name__)
 
-engine = create_async_engine(
-    DATABASE_URL,
-    echo=False,
-    pool_pre_ping=True
-)
+def _async_url(url: str) -> str:
+    return url.replace(
+        "postgresql://",
+        "postgresql+asyncpg://"
+    )
+
+DATABASE_URL = _async_url(settings.DATABASE_URL)
+
+def _create_engine(url: str, connect_args: dict | None = None, **options) -> AsyncEngine:
+    engine = create_async_engine(
+        url,
+        echo=False,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+        pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        connect_args={
+            # SQLAlchemy's per-connection prepared statement cache, and asyncpg's own
+            "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            **(connect_args or {}),
+        },
+        **options
+    )
+    instrument_engine(engine, trace_statement)
+    return engine
+
+engine = _create_engine(DATABASE_URL)
+instrument_pool(engine, max_overflow=settings.DB_MAX_OVERFLOW)
+
+class PrimarySession(Session):
+    """Session class behind AsyncSessionLocal; `info["committed"]` is set once it has committed"""
+
+@event.listens_for(PrimarySession, "after_commit")
+def _mark_committed(session: Session) -> None:
+    session.info["committed"] = True
 
 AsyncSessionLocal = sessionmaker(
     bind=engine,
     class_=AsyncSession,
-    expire_on_commit=False
+    expire_on_commit=False,
+    sync_session_class=PrimarySession
 )
 
 async def get_db():
+    """Request-scoped session.
+
+    Creating the session is cheap: it checks out a connection at its first
+    statement and returns it at each commit, so a request that fails auth
+    (routes resolve the current user first) or never queries holds none.
+    Repositories commit after reads that precede slow work for the same reason.
+    """
     async with AsyncSessionLocal() as session:
         yield session
+
+# Replay lag in seconds; 0 when fully caught up, and on a server that is not a standby
+REPLICA_LAG_QUERY = text(
+    "SELECT CASE WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+# Failures that mean the replica cannot serve reads right now; other errors are the query's own
+REPLICA_ERRORS = (OperationalError, InterfaceError, PoolTimeoutError, OSError, asyncio.TimeoutError)
+
+class ReplicaMonitor:
+    """Whether the read replica may serve reads: reachable, and within `max_lag` seconds of the primary.
+
+    The check runs in the background, started by reads at most every
+    `interval` seconds, so an idle worker sends none. Until a check passes,
+    and from a failed read until the next one does, reads use the primary.
+    """
+
+    def __init__(self, engine: AsyncEngine, max_lag: float, interval: float):
+        self.engine = engine
+        self.max_lag = max_lag
+        self.interval = interval
+        self.healthy = False
+        self.lag_seconds: float | None = None
+        self._next_check = 0.0
+        self._check_task: asyncio.Task | None = None
+        DB_REPLICA_UP.set(0)
+
+    def available(self) -> bool:
+        now = time.monotonic()
+        if now >= self._next_check and self._check_task is None:
+            self._next_check = now + self.interval
+            self._check_task = asyncio.create_task(self._run_check())
+        return self.healthy
+
+    async def _run_check(self) -> None:
+        try:
+            await self.check()
+        finally:
+            self._check_task = None
+
+    async def check(self) -> bool:
+        try:
+            async with self.engine.connect() as conn:
+                lag = (await conn.execute(REPLICA_LAG_QUERY)).scalar()
+        except Exception as e:
+            self.mark_down(e)
+            return False
+        self.lag_seconds = float(lag) if lag is not None else None
+        healthy = self.lag_seconds is not None and self.lag_seconds <= self.max_lag
+        if healthy != self.healthy:
+            logger.warning(
+                "Read replica %s (lag %s s)", "in use" if healthy else "lagging, reads use the primary",
+                self.lag_seconds
+            )
+        self._set(healthy)
+        if self.lag_seconds is not None:
+            DB_REPLICA_LAG.set(self.lag_seconds)
+        return healthy
+
+    def mark_down(self, error: BaseException) -> None:
+        if self.healthy:
+            logger.warning("Read replica unavailable, reads use the primary: %r", error)
+        self._set(False)
+
+    def _set(self, healthy: bool) -> None:
+        self.healthy = healthy
+        DB_REPLICA_UP.set(1 if healthy else 0)
+
+read_engine: AsyncEngine | None = None
+ReadSessionLocal = None
+replica: ReplicaMonitor | None = None
+if settings.DATABASE_READ_URL:
+    # Autocommit: a replica read is a single statement with no BEGIN/COMMIT
+    # round trips, and its connection returns to the pool straight after
+    read_engine = _create_engine(
+        _async_url(settings.DATABASE_READ_URL),
+        {"timeout": settings.DB_REPLICA_CONNECT_TIMEOUT_SECONDS},
+        isolation_level="AUTOCOMMIT"
+    )
+    instrument_pool(read_engine, "replica", settings.DB_MAX_OVERFLOW)
+    ReadSessionLocal = sessionmaker(bind=read_engine, class_=AsyncSession, expire_on_commit=False)
+    replica = ReplicaMonitor(
+        read_engine, settings.DB_REPLICA_MAX_LAG_SECONDS, settings.DB_REPLICA_CHECK_INTERVAL_SECONDS
+    )
+
+_primary_reads = DB_READS.labels("primary")
+_replica_reads = DB_READS.labels("replica")
+
+class ReadRouter:
+    """Sends a repository's read-only statements to the replica when that is safe.
+
+    They run on the request's primary session instead when no replica is
+    configured, while it is down or lagging, and once that session has
+    committed, so a request always reads its own writes. With
+    `must_exist=True` an empty replica result is retried on the primary,
+    which covers rows the client created in its previous request.
+    """
+
+    __slots__ = ("primary",)
+
+    def __init__(self, primary: AsyncSession):
+        self.primary = primary
+
+    async def execute(self, statement, must_exist: bool = False) -> Result:
+        if replica is not None and not self.primary.info.get("committed") and replica.available():
+            try:
+                async with ReadSessionLocal() as session:
+                    result = await session.execute(statement)
+            except REPLICA_ERRORS as e:
+                replica.mark_down(e)
+            else:
+                if not must_exist:
+                    _replica_reads.inc()
+                    return result
+                frozen = result.freeze()
+                if frozen.data:
+                    _replica_reads.inc()
+                    return frozen()
+        _primary_reads.inc()
+        return await self.primary.execute(statement)
+
+async def close_engines() -> None:
+    await engine.dispose()
+    if read_engine is not None:
+        await read_engine.dispose()
@@ -0,0 +1,28 @@
+import httpx
+from app.core.config import settings
+from app.core.tracing import instrument_client
+
+_auth_client: httpx.AsyncClient | None = None
+
+def _build_auth_client() -> httpx.AsyncClient:
+    return instrument_client(httpx.AsyncClient(timeout=settings.AUTH_HTTP_TIMEOUT))
+
+async def init_http_clients() -> None:
+    """Create the process-wide HTTP clients (called on app startup)"""
+    global _auth_client
+    if _auth_client is None:
+        _auth_client = _build_auth_client()
+
+async def close_http_clients() -> None:
+    """Close the process-wide HTTP clients (called on app shutdown)"""
+    global _auth_client
+    if _auth_client is not None:
+        await _auth_client.aclose()
+        _auth_client = None
+
+def get_auth_http_client() -> httpx.AsyncClient:
+    """Return the shared client used to call the auth service"""
+    global _auth_client
+    if _auth_client is None:
+        _auth_client = _build_auth_client()
+    return _auth_client
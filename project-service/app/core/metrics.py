@@ -0,0 +1,332 @@
+"""Prometheus metrics for the service, exposed in the text format at `/metrics`.
+
+A deliberately small registry (counters, gauges, fixed-bucket histograms)
+so that recording stays a dict lookup plus an addition on the hot path.
+Updates happen on the event loop thread; the registry is per process, so
+scrape each worker separately (or run one worker per container).
+"""
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterator, List, Sequence, Tuple
+from fastapi import Response
+from sqlalchemy import event
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Histogram upper bounds in seconds; `+Inf` is always added
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, "_Metric"] = {}
+
+    def register(self, metric: "_Metric") -> None:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric already registered: {metric.name}")
+        self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.samples())
+        lines.append("")
+        return "\n".join(lines)
+
+REGISTRY = Registry()
+
+class _Metric:
+    type = "untyped"
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: Sequence[str] = (), registry: Registry | None = REGISTRY
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        if registry is not None:
+            registry.register(self)
+
+    def labels(self, *values: str):
+        """The child for these label values; keep a reference to it on hot paths"""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            child = self._children[values] = self._new_child()
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _label_text(self, values: Tuple[str, ...], extra: str = "") -> str:
+        pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(self.labelnames, values)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def samples(self) -> Iterator[str]:
+        for values, child in list(self._children.items()):
+            yield f"{self.name}{self._label_text(values)} {_format(child.get())}"
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: float = 1) -> None:
+        self.value += amount
+
+    def get(self) -> float:
+        return self.value
+
+class Counter(_Metric):
+    type = "counter"
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def inc(self, amount: float = 1) -> None:
+        self.labels().inc(amount)
+
+class _GaugeChild:
+    __slots__ = ("value", "function")
+
+    def __init__(self):
+        self.value = 0
+        self.function: Callable[[], float] | None = None
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def inc(self, amount: float = 1) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1) -> None:
+        self.value -= amount
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """Read the value from `function` at scrape time instead"""
+        self.function = function
+
+    def get(self) -> float:
+        return self.function() if self.function is not None else self.value
+
+class Gauge(_Metric):
+    type = "gauge"
+
+    def _new_child(self) -> _GaugeChild:
+        return _GaugeChild()
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        self.labels().set_function(function)
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # per bucket, not cumulative; last is +Inf
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+        registry: Registry | None = REGISTRY
+    ):
+        self.bounds = tuple(sorted(float(bound) for bound in buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.bounds)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def samples(self) -> Iterator[str]:
+        for values, child in list(self._children.items()):
+            cumulative = 0
+            for bound, count in zip(self.bounds + (float("inf"),), list(child.counts)):
+                cumulative += count
+                le = f'le="{_format(bound)}"'
+                yield f"{self.name}_bucket{self._label_text(values, le)} {cumulative}"
+            yield f"{self.name}_sum{self._label_text(values)} {_format(child.sum)}"
+            yield f"{self.name}_count{self._label_text(values)} {cumulative}"
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Time to serve a request, until the last body chunk is sent",
+    ("method", "route", "status")
+)
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds",
+    "Database statement execution time, by leading SQL keyword",
+    ("operation",),
+    DB_BUCKETS
+)
+TOKEN_CACHE_LOOKUPS = Counter(
+    "auth_token_cache_lookups_total",
+    "Token validations by cache result (hit, miss, or coalesced onto a pending miss)",
+    ("result",)
+)
+DB_POOL_CONNECTIONS = Gauge(
+    "db_pool_connections",
+    "Open database connections by state (checked_out, idle)",
+    ("pool", "state")
+)
+DB_POOL_MAX_CONNECTIONS = Gauge(
+    "db_pool_max_connections",
+    "Connections the pool may open: pool size plus max overflow",
+    ("pool",)
+)
+DB_POOL_CONNECTS = Counter(
+    "db_pool_connects_total",
+    "New database connections opened; a steady climb means connections are being recycled or dropped",
+    ("pool",)
+)
+DB_READS = Counter(
+    "db_reads_total",
+    "Routed repository reads by the database that served them (primary, replica)",
+    ("target",)
+)
+DB_REPLICA_UP = Gauge("db_replica_up", "1 while reads may go to the read replica, else 0")
+DB_REPLICA_LAG = Gauge("db_replica_lag_seconds", "Read replica replay lag at its last health check")
+
+class MetricsMiddleware:
+    """ASGI middleware recording `http_request_duration_seconds` per route template.
+
+    Requests that match no route are grouped under `<unmatched>` so unknown
+    paths cannot blow up label cardinality.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "<unmatched>"
+            HTTP_REQUEST_DURATION.labels(scope["method"], path, str(status)).observe(
+                time.perf_counter() - started
+            )
+
+_OPERATIONS = frozenset(("SELECT", "INSERT", "UPDATE", "DELETE", "WITH"))
+
+def _operation(statement: str) -> str:
+    head = statement[:16].split(None, 1)
+    keyword = head[0].upper() if head else ""
+    return keyword if keyword in _OPERATIONS else "OTHER"
+
+# SQL text -> histogram child; compiled statements are cached strings, so this stays small
+_statement_series: Dict[str, _HistogramChild] = {}
+
+def _query_series(statement: str) -> _HistogramChild:
+    series = _statement_series.get(statement)
+    if series is None:
+        if len(_statement_series) >= 1000:
+            _statement_series.clear()  # unbounded ad-hoc SQL; start over
+        series = _statement_series[statement] = DB_QUERY_DURATION.labels(_operation(statement))
+    return series
+
+def instrument_engine(
+    engine, on_statement: Callable[[str, float, float], None] | None = None
+) -> None:
+    """Time every statement run through `engine` (an AsyncEngine or Engine).
+
+    Hooks the dialect's execute calls rather than `before/after_cursor_execute`:
+    any cursor event listener moves every statement onto SQLAlchemy's slower
+    event-dispatching path, which costs more than the timing itself.
+    `on_statement(statement, started, ended)` also receives each timing
+    (`time.perf_counter()` values), e.g. for tracing.
+    """
+    sync_engine = getattr(engine, "sync_engine", engine)
+    dialect = sync_engine.dialect
+
+    def _record(statement: str, started: float) -> None:
+        ended = time.perf_counter()
+        _query_series(statement).observe(ended - started)
+        if on_statement is not None:
+            on_statement(statement, started, ended)
+
+    @event.listens_for(sync_engine, "do_execute")
+    def _execute(cursor, statement, parameters, context):
+        started = time.perf_counter()
+        try:
+            dialect.do_execute(cursor, statement, parameters, context)
+        finally:
+            _record(statement, started)
+        return True  # executed here; the dialect must not run it again
+
+    @event.listens_for(sync_engine, "do_execute_no_params")
+    def _execute_no_params(cursor, statement, context):
+        started = time.perf_counter()
+        try:
+            dialect.do_execute_no_params(cursor, statement, context)
+        finally:
+            _record(statement, started)
+        return True
+
+    @event.listens_for(sync_engine, "do_executemany")
+    def _executemany(cursor, statement, parameters, context):
+        started = time.perf_counter()
+        try:
+            dialect.do_executemany(cursor, statement, parameters, context)
+        finally:
+            _record(statement, started)
+        return True
+
+def instrument_pool(engine, name: str = "primary", max_overflow: int = 0) -> None:
+    """Export the connection pool's usage of `engine` as `db_pool_*`, read at scrape time"""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    # Looked up on every scrape: `engine.dispose()` swaps in a new pool
+    DB_POOL_CONNECTIONS.labels(name, "checked_out").set_function(lambda: sync_engine.pool.checkedout())
+    DB_POOL_CONNECTIONS.labels(name, "idle").set_function(lambda: sync_engine.pool.checkedin())
+    DB_POOL_MAX_CONNECTIONS.labels(name).set(sync_engine.pool.size() + max_overflow)
+    connects = DB_POOL_CONNECTS.labels(name)
+
+    @event.listens_for(sync_engine.pool, "connect")  # carried over to replacement pools
+    def _connect(dbapi_connection, connection_record):
+        connects.inc()
+
+def metrics_response() -> Response:
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
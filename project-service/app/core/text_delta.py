@@ -0,0 +1,32 @@
+import difflib
+import json
+import zlib
+from typing import List
+
+def make_delta(old: str, new: str) -> bytes:
+    """Compressed line delta turning `old` into `new`.
+
+    The delta is a JSON list of operations: `[start, end]` copies that range
+    of `old`'s lines, a string inserts new text. Unchanged lines cost a few
+    bytes however long they are.
+    """
+    old_lines = old.splitlines(keepends=True)
+    new_lines = new.splitlines(keepends=True)
+    ops: List = []
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            ops.append([i1, i2])
+        elif j1 < j2:  # replace or insert; deletes simply copy nothing
+            ops.append("".join(new_lines[j1:j2]))
+    return zlib.compress(json.dumps(ops, separators=(",", ":")).encode())
+
+def apply_delta(old: str, delta: bytes) -> str:
+    old_lines = old.splitlines(keepends=True)
+    parts: List[str] = []
+    for op in json.loads(zlib.decompress(delta)):
+        if isinstance(op, str):
+            parts.append(op)
+        else:
+            parts.extend(old_lines[op[0]:op[1]])
+    return "".join(parts)
@@ -0,0 +1,102 @@
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Tuple
+from jose import jwt, JWTError
+from app.core.metrics import TOKEN_CACHE_LOOKUPS
+
+# A validator returns the user_id and, if known, the token's expiry (unix seconds)
+Validator = Callable[[], Awaitable[Tuple[str, float | None]]]
+
+_hits = TOKEN_CACHE_LOOKUPS.labels("hit")
+_misses = TOKEN_CACHE_LOOKUPS.labels("miss")
+_coalesced = TOKEN_CACHE_LOOKUPS.labels("coalesced")
+
+def token_expiry(token: str) -> float | None:
+    """Read `exp` from a token without verifying it (only used to bound cache TTLs)"""
+    try:
+        exp = jwt.get_unverified_claims(token).get("exp")
+    except JWTError:
+        return None
+    return float(exp) if exp is not None else None
+
+class TokenCache:
+    """Bounded LRU cache of verified tokens, keyed by token hash.
+
+    Entries live for at most `ttl` seconds and never past the token's `exp`.
+    Concurrent lookups of the same uncached token share one validation call.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._inflight: dict[str, asyncio.Future] = {}
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token: str) -> str | None:
+        key = self._key(token)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        user_id, expires_at = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return user_id
+
+    def put(self, token: str, user_id: str, exp: float | None = None) -> None:
+        expires_at = time.time() + self.ttl
+        if exp is not None:
+            expires_at = min(expires_at, exp)
+        if expires_at <= time.time() or self.max_entries <= 0:
+            return
+        key = self._key(token)
+        self._entries[key] = (user_id, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get_or_validate(self, token: str, validate: Validator) -> str:
+        """Return the cached user_id for `token`, validating it at most once concurrently"""
+        key = self._key(token)
+        while True:
+            user_id = self.get(token)
+            if user_id is not None:
+                _hits.inc()
+                return user_id
+
+            pending = self._inflight.get(key)
+            if pending is None:
+                break
+            _coalesced.inc()
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                # The leading validation was cancelled, not us: try again
+                if not pending.cancelled():
+                    raise
+
+        _misses.inc()
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            user_id, exp = await validate()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # mark retrieved when nobody else was waiting
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+        self.put(token, user_id, exp if exp is not None else token_expiry(token))
+        future.set_result(user_id)
+        return user_id
@@ -1,5 +1,6 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
+from typing import List, Sequence, Tuple
 
 @dataclass
 class Project:
@@ -19,3 +20,52 @@ class Prompt:
     version: int = 1
     created_at: datetime = None
     updated_at: datetime = None
+    variables: List[str] = field(default_factory=list)  # declared `{{name}}` placeholders
+
+@dataclass
+class RenderedPrompt:
+    prompt_id: str
+    version: int  # the prompt version the content was rendered from
+    content: str
+
+@dataclass
+class PromptVersion:
+    prompt_id: str
+    version: int
+    name: str
+    content: str
+    variables: List[str]
+    created_at: datetime
+
+@dataclass
+class StoredPromptVersion:
+    """A `prompt_versions` row: a full snapshot, or a delta against the previous version"""
+    version: int
+    name: str
+    variables: List[str]
+    snapshot: str | None
+    delta: bytes | None
+    created_at: datetime
+
+@dataclass
+class RowPage:
+    """A listing page as plain DB rows, for encoding straight to JSON without domain objects"""
+    columns: Tuple[str, ...]  # names of the values in each row; also the JSON keys
+    rows: Sequence[tuple]
+    has_more: bool
+
+@dataclass
+class ProjectPage:
+    projects: List[Project]  # ordered by (created_at, id)
+    has_more: bool
+
+@dataclass
+class PromptPage:
+    prompts: List[Prompt]  # ordered by (created_at, id)
+    has_more: bool
+
+class ProjectNotFoundError(LookupError):
+    """The project does not exist or is not owned by the requesting user"""
+
+class PromptTemplateError(ValueError):
+    """The prompt template is malformed, or rendering it got the wrong variables"""
@@ -1,8 +1,22 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from app.core.database import close_engines
+from app.core.metrics import MetricsMiddleware, metrics_response
+from app.core.tracing import InMemoryExporter, TracingMiddleware, tracer
+from app.core.http_client import init_http_clients, close_http_clients
 from app.routes.projects import router as projects_router
 
-app = FastAPI(title="Project Service")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One pooled keep-alive HTTP client per process for auth-service calls
+    await init_http_clients()
+    yield
+    await close_http_clients()
+    await close_engines()
+    tracer.shutdown()
+
+app = FastAPI(title="Project Service", lifespan=lifespan)
 
 origins = [
     "https://omnirouter-j94q.onrender.com",  # production frontend
@@ -19,6 +33,22 @@ app.add_middleware(
     expose_headers=["*"],           # optional but helpful
 )
 
+# The last added runs outermost: tracing wraps metrics, and both wrap CORS,
+# so the recorded latency and the server span include CORS handling
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(TracingMiddleware)
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint"""
+    return metrics_response()
+
+if isinstance(tracer.exporter, InMemoryExporter):
+    @app.get("/debug/traces/{trace_id}", include_in_schema=False)
+    async def trace_spans(trace_id: str):
+        """This service's recorded spans of one trace (TRACE_EXPORTER=memory only)"""
+        return tracer.exporter.spans(trace_id)
+
 
 @app.get("/")
 async def root():
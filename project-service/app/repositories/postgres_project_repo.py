@@ -1,12 +1,19 @@
 import uuid
 from datetime import datetime
 from typing import List
-from sqlalchemy import Column, String, DateTime, ForeignKey, Integer
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import (
+    Column, String, DateTime, ForeignKey, Integer, Index, LargeBinary, Text,
+    and_, delete, exists, func, insert, literal, tuple_, update
+)
+from sqlalchemy.dialects.postgresql import ARRAY, UUID
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.future import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.domain.project import Project, Prompt
+from app.core.database import ReadRouter
+from app.core.text_delta import make_delta
+from app.domain.project import (
+    Project, ProjectNotFoundError, ProjectPage, Prompt, PromptPage, RowPage, StoredPromptVersion
+)
 
 Base = declarative_base()
 
@@ -19,6 +26,10 @@ class ProjectTable(Base):
     description = Column(String(1000), nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        Index("ix_projects_user_created_id", "user_id", "created_at", "id"),
+    )
 
 class PromptTable(Base):
     __tablename__ = "prompts"
@@ -28,12 +39,33 @@ class PromptTable(Base):
     name = Column(String(255), nullable=False)
     content = Column(String(10000), nullable=False)
     version = Column(Integer, default=1)
+    variables = Column(ARRAY(String(100)), nullable=False, default=list, server_default="{}")
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        Index("ix_prompts_project_created_id", "project_id", "created_at", "id"),
+    )
+
+class PromptVersionTable(Base):
+    """Append-only prompt history: every version, as a full snapshot or a delta"""
+    __tablename__ = "prompt_versions"
+    
+    prompt_id = Column(UUID(as_uuid=True), ForeignKey("prompts.id", ondelete="CASCADE"), primary_key=True)
+    version = Column(Integer, primary_key=True)
+    name = Column(String(255), nullable=False)
+    variables = Column(ARRAY(String(100)), nullable=False, default=list, server_default="{}")
+    snapshot = Column(Text, nullable=True)  # full content; set on snapshot versions only
+    delta = Column(LargeBinary, nullable=True)  # compressed text_delta against version - 1
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+def _row_page(rows: list, has_more: bool) -> RowPage:
+    return RowPage(columns=tuple(rows[0]._fields) if rows else (), rows=rows, has_more=has_more)
 
 class PostgresProjectRepository:
     def __init__(self, db: AsyncSession):
         self.db = db
+        self.reads = ReadRouter(db)
     
     async def create(self, user_id: str, name: str, description: str | None) -> Project:
         project = ProjectTable(
@@ -54,11 +86,12 @@ class PostgresProjectRepository:
         )
     
     async def get_by_id(self, project_id: str, user_id: str) -> Project | None:
-        result = await self.db.execute(
+        result = await self.reads.execute(
             select(ProjectTable).where(
                 (ProjectTable.id == uuid.UUID(project_id)) & 
                 (ProjectTable.user_id == uuid.UUID(user_id))
-            )
+            ),
+            must_exist=True
         )
         row = result.scalar_one_or_none()
         if not row:
@@ -72,37 +105,61 @@ class PostgresProjectRepository:
             updated_at=row.updated_at
         )
     
-    async def list_by_user(self, user_id: str) -> List[Project]:
-        result = await self.db.execute(
-            select(ProjectTable).where(ProjectTable.user_id == uuid.UUID(user_id))
+    async def _user_page(
+        self, user_id: str, limit: int, after: tuple[datetime, uuid.UUID] | None
+    ) -> tuple[list, bool]:
+        stmt = select(*ProjectTable.__table__.c).where(ProjectTable.user_id == uuid.UUID(user_id))
+        if after is not None:
+            stmt = stmt.where(tuple_(ProjectTable.created_at, ProjectTable.id) > tuple_(*after))
+        result = await self.reads.execute(
+            stmt.order_by(ProjectTable.created_at, ProjectTable.id).limit(limit + 1)
         )
-        rows = result.scalars().all()
-        return [
-            Project(
-                id=str(row.id),
-                user_id=str(row.user_id),
-                name=row.name,
-                description=row.description,
-                created_at=row.created_at,
-                updated_at=row.updated_at
-            )
-            for row in rows
-        ]
+        rows = result.all()
+        return rows[:limit], len(rows) > limit
+    
+    async def list_by_user(
+        self, user_id: str, limit: int, after: tuple[datetime, uuid.UUID] | None = None
+    ) -> ProjectPage:
+        """Keyset page of a user's projects ordered by (created_at, id)"""
+        rows, has_more = await self._user_page(user_id, limit, after)
+        return ProjectPage(
+            projects=[
+                Project(
+                    id=str(row.id),
+                    user_id=str(row.user_id),
+                    name=row.name,
+                    description=row.description,
+                    created_at=row.created_at,
+                    updated_at=row.updated_at
+                )
+                for row in rows
+            ],
+            has_more=has_more
+        )
+    
+    async def list_rows_by_user(
+        self, user_id: str, limit: int, after: tuple[datetime, uuid.UUID] | None = None
+    ) -> RowPage:
+        """Same page as `list_by_user`, as plain rows for direct JSON encoding"""
+        rows, has_more = await self._user_page(user_id, limit, after)
+        return _row_page(rows, has_more)
     
     async def update(self, project_id: str, user_id: str, name: str, description: str | None) -> Project | None:
-        project = await self.get_by_id(project_id, user_id)
-        if not project:
-            return None
-        
+        """Ownership-checked update in a single UPDATE ... RETURNING statement"""
         result = await self.db.execute(
-            select(ProjectTable).where(ProjectTable.id == uuid.UUID(project_id))
+            update(ProjectTable)
+            .where(
+                (ProjectTable.id == uuid.UUID(project_id)) &
+                (ProjectTable.user_id == uuid.UUID(user_id))
+            )
+            .values(name=name, description=description, updated_at=datetime.utcnow())
+            .returning(*ProjectTable.__table__.c)
+            .execution_options(synchronize_session=False)
         )
-        row = result.scalar_one_or_none()
-        row.name = name
-        row.description = description
-        row.updated_at = datetime.utcnow()
+        row = result.one_or_none()
         await self.db.commit()
-        await self.db.refresh(row)
+        if not row:
+            return None
         
         return Project(
             id=str(row.id),
@@ -114,48 +171,52 @@ class PostgresProjectRepository:
         )
     
     async def delete(self, project_id: str, user_id: str) -> bool:
-        project = await self.get_by_id(project_id, user_id)
-        if not project:
-            return False
-        
+        """Ownership-checked delete in a single DELETE ... RETURNING statement"""
         result = await self.db.execute(
-            select(ProjectTable).where(ProjectTable.id == uuid.UUID(project_id))
+            delete(ProjectTable)
+            .where(
+                (ProjectTable.id == uuid.UUID(project_id)) &
+                (ProjectTable.user_id == uuid.UUID(user_id))
+            )
+            .returning(ProjectTable.id)
+            .execution_options(synchronize_session=False)
         )
-        row = result.scalar_one_or_none()
-        await self.db.delete(row)
+        deleted = result.scalar_one_or_none()
         await self.db.commit()
-        return True
+        return deleted is not None
 
 class PostgresPromptRepository:
-    def __init__(self, db: AsyncSession):
+    """Prompt access with the project-ownership check fused into each statement.
+
+    Methods raise ProjectNotFoundError when the project does not exist or is
+    not owned by `user_id`, and return None/False when only the prompt is
+    missing. The extra ownership lookup runs on the miss path only.
+
+    Every version is also appended to `prompt_versions`: a full snapshot at
+    least every `snapshot_interval` versions, and compressed line deltas
+    against the previous version in between.
+    """
+
+    def __init__(self, db: AsyncSession, snapshot_interval: int = 20):
         self.db = db
+        self.reads = ReadRouter(db)
+        self.snapshot_interval = snapshot_interval
     
-    async def create(self, project_id: str, name: str, content: str) -> Prompt:
-        prompt = PromptTable(
-            project_id=uuid.UUID(project_id),
-            name=name,
-            content=content
-        )
-        self.db.add(prompt)
-        await self.db.commit()
-        await self.db.refresh(prompt)
-        return Prompt(
-            id=str(prompt.id),
-            project_id=str(prompt.project_id),
-            name=prompt.name,
-            content=prompt.content,
-            version=prompt.version,
-            created_at=prompt.created_at,
-            updated_at=prompt.updated_at
+    @staticmethod
+    def _owned_project(project_id: uuid.UUID, user_id: uuid.UUID):
+        return exists().where(
+            (ProjectTable.id == project_id) & (ProjectTable.user_id == user_id)
         )
     
-    async def get_by_id(self, prompt_id: str) -> Prompt | None:
+    async def _ensure_project_owned(self, project_id: str, user_id: str) -> None:
         result = await self.db.execute(
-            select(PromptTable).where(PromptTable.id == uuid.UUID(prompt_id))
+            select(self._owned_project(uuid.UUID(project_id), uuid.UUID(user_id)))
         )
-        row = result.scalar_one_or_none()
-        if not row:
-            return None
+        if not result.scalar():
+            raise ProjectNotFoundError(project_id)
+    
+    @staticmethod
+    def _to_prompt(row) -> Prompt:
         return Prompt(
             id=str(row.id),
             project_id=str(row.project_id),
@@ -163,60 +224,290 @@ class PostgresPromptRepository:
             content=row.content,
             version=row.version,
             created_at=row.created_at,
-            updated_at=row.updated_at
+            updated_at=row.updated_at,
+            variables=list(row.variables or [])
         )
     
-    async def list_by_project(self, project_id: str) -> List[Prompt]:
-        result = await self.db.execute(
-            select(PromptTable).where(PromptTable.project_id == uuid.UUID(project_id))
+    async def create(
+        self, project_id: str, user_id: str, name: str, content: str, variables: List[str] | None = None
+    ) -> Prompt:
+        """INSERT ... SELECT ... WHERE EXISTS (owned project) RETURNING; version 1 is stored as a snapshot"""
+        pid = uuid.UUID(project_id)
+        now = datetime.utcnow()
+        source = select(
+            literal(uuid.uuid4(), PromptTable.id.type),
+            literal(pid, PromptTable.project_id.type),
+            literal(name, PromptTable.name.type),
+            literal(content, PromptTable.content.type),
+            literal(1),
+            literal(variables or [], PromptTable.variables.type),
+            literal(now, PromptTable.created_at.type),
+            literal(now, PromptTable.updated_at.type)
+        ).where(self._owned_project(pid, uuid.UUID(user_id)))
+        created = (
+            insert(PromptTable)
+            .from_select(
+                ["id", "project_id", "name", "content", "version", "variables", "created_at", "updated_at"],
+                source
+            )
+            .returning(*PromptTable.__table__.c)
+            .cte("created")
+        )
+        versioned = (
+            insert(PromptVersionTable)
+            .from_select(
+                ["prompt_id", "version", "name", "variables", "snapshot", "created_at"],
+                select(
+                    created.c.id, created.c.version, created.c.name,
+                    created.c.variables, created.c.content, created.c.created_at
+                )
+            )
+            .cte("versioned")
+        )
+        result = await self.db.execute(select(*created.c).add_cte(versioned))
+        row = result.one_or_none()
+        await self.db.commit()
+        if not row:
+            raise ProjectNotFoundError(project_id)
+        return self._to_prompt(row)
+    
+    async def get_by_id(self, prompt_id: str) -> Prompt | None:
+        result = await self.reads.execute(
+            select(PromptTable).where(PromptTable.id == uuid.UUID(prompt_id)),
+            must_exist=True
+        )
+        row = result.scalar_one_or_none()
+        if not row:
+            return None
+        return self._to_prompt(row)
+    
+    async def get(self, project_id: str, prompt_id: str, user_id: str) -> Prompt | None:
+        """Ownership-checked read of one prompt"""
+        pid = uuid.UUID(project_id)
+        result = await self.reads.execute(
+            select(*PromptTable.__table__.c)
+            .where(
+                (PromptTable.id == uuid.UUID(prompt_id)) &
+                (PromptTable.project_id == pid) &
+                self._owned_project(pid, uuid.UUID(user_id))
+            ),
+            must_exist=True
+        )
+        row = result.one_or_none()
+        if not row:
+            await self._ensure_project_owned(project_id, user_id)
+            return None
+        return self._to_prompt(row)
+    
+    async def get_version_chain(
+        self, project_id: str, prompt_id: str, user_id: str, version: int, after: int | None = None
+    ) -> List[StoredPromptVersion] | None:
+        """History rows needed to rebuild `version`, oldest first.
+
+        Starts at the latest snapshot at or below `version`, or just past
+        `after` (a version the caller already has) if that is later. Returns
+        None if the prompt is missing, and a list not ending at `version`
+        if that version does not exist. Like `list_by_project`, the rows come
+        from prompts LEFT JOIN prompt_versions so ownership is checked in
+        the same statement. A lagging replica can have the prompt but not its
+        newest versions, so a chain that stops short of `version` is read
+        again from the primary.
+        """
+        pid = uuid.UUID(project_id)
+        prid = uuid.UUID(prompt_id)
+        snapshots = PromptVersionTable.__table__.alias("snapshots")
+        start = (
+            select(func.max(snapshots.c.version))
+            .where(
+                snapshots.c.prompt_id == prid,
+                snapshots.c.version <= version,
+                snapshots.c.snapshot.isnot(None)
+            )
+            .scalar_subquery()
+        )
+        if after is not None:
+            start = func.greatest(start, after + 1)
+        history = PromptVersionTable.__table__
+        stmt = (
+            select(
+                history.c.version, history.c.name, history.c.variables,
+                history.c.snapshot, history.c.delta, history.c.created_at
+            )
+            .select_from(PromptTable)
+            .outerjoin(
+                history,
+                and_(
+                    history.c.prompt_id == PromptTable.id,
+                    history.c.version >= start,
+                    history.c.version <= version
+                )
+            )
+            .where(
+                (PromptTable.id == prid) &
+                (PromptTable.project_id == pid) &
+                self._owned_project(pid, uuid.UUID(user_id))
+            )
+            .order_by(history.c.version)
         )
-        rows = result.scalars().all()
+        rows = (await self.reads.execute(stmt, must_exist=True)).all()
+        if rows and rows[-1].version != version and (after is None or after < version):
+            rows = (await self.db.execute(stmt)).all()
+        if not rows:
+            await self._ensure_project_owned(project_id, user_id)
+            return None
         return [
-            Prompt(
-                id=str(row.id),
-                project_id=str(row.project_id),
-                name=row.name,
-                content=row.content,
+            StoredPromptVersion(
                 version=row.version,
-                created_at=row.created_at,
-                updated_at=row.updated_at
+                name=row.name,
+                variables=list(row.variables or []),
+                snapshot=row.snapshot,
+                delta=row.delta,
+                created_at=row.created_at
             )
             for row in rows
+            if row.version is not None
         ]
     
-    async def update(self, prompt_id: str, name: str, content: str) -> Prompt | None:
+    async def _project_page(
+        self, project_id: str, user_id: str, limit: int, after: tuple[datetime, uuid.UUID] | None
+    ) -> tuple[list, bool]:
+        join_on = PromptTable.project_id == ProjectTable.id
+        if after is not None:
+            join_on = and_(join_on, tuple_(PromptTable.created_at, PromptTable.id) > tuple_(*after))
+        result = await self.reads.execute(
+            select(*PromptTable.__table__.c)
+            .select_from(ProjectTable)
+            .outerjoin(PromptTable, join_on)
+            .where(
+                (ProjectTable.id == uuid.UUID(project_id)) &
+                (ProjectTable.user_id == uuid.UUID(user_id))
+            )
+            .order_by(PromptTable.created_at, PromptTable.id)
+            .limit(limit + 1),
+            must_exist=True
+        )
+        rows = result.all()
+        if not rows:
+            raise ProjectNotFoundError(project_id)
+        rows = [row for row in rows if row.id is not None]
+        return rows[:limit], len(rows) > limit
+    
+    async def list_by_project(
+        self,
+        project_id: str,
+        user_id: str,
+        limit: int,
+        after: tuple[datetime, uuid.UUID] | None = None
+    ) -> PromptPage:
+        """Keyset page of a project's prompts ordered by (created_at, id).
+
+        projects LEFT JOIN prompts: no row at all means the project is not
+        owned; a single all-NULL prompt row means the page is empty.
+        """
+        rows, has_more = await self._project_page(project_id, user_id, limit, after)
+        return PromptPage(
+            prompts=[self._to_prompt(row) for row in rows],
+            has_more=has_more
+        )
+    
+    async def list_rows_by_project(
+        self,
+        project_id: str,
+        user_id: str,
+        limit: int,
+        after: tuple[datetime, uuid.UUID] | None = None
+    ) -> RowPage:
+        """Same page as `list_by_project`, as plain rows for direct JSON encoding"""
+        rows, has_more = await self._project_page(project_id, user_id, limit, after)
+        return _row_page(rows, has_more)
+    
+    async def update(
+        self,
+        project_id: str,
+        prompt_id: str,
+        user_id: str,
+        name: str,
+        content: str,
+        variables: List[str] | None = None
+    ) -> Prompt | None:
+        """Ownership-checked update that bumps `version` and appends it to the history.
+
+        The prompt row is locked first, so the delta is computed against the
+        version it replaces even when updates race.
+        """
+        pid = uuid.UUID(project_id)
+        prid = uuid.UUID(prompt_id)
+        last_snapshot = (
+            select(func.max(PromptVersionTable.version))
+            .where(PromptVersionTable.prompt_id == prid, PromptVersionTable.snapshot.isnot(None))
+            .scalar_subquery()
+        )
         result = await self.db.execute(
-            select(PromptTable).where(PromptTable.id == uuid.UUID(prompt_id))
+            select(PromptTable.content, PromptTable.version, last_snapshot.label("last_snapshot"))
+            .where(
+                (PromptTable.id == prid) &
+                (PromptTable.project_id == pid) &
+                self._owned_project(pid, uuid.UUID(user_id))
+            )
+            .with_for_update(of=PromptTable)
         )
-        row = result.scalar_one_or_none()
-        if not row:
+        current = result.one_or_none()
+        if not current:
+            await self.db.commit()
+            await self._ensure_project_owned(project_id, user_id)
             return None
         
-        row.name = name
-        row.content = content
-        row.version += 1
-        row.updated_at = datetime.utcnow()
+        now = datetime.utcnow()
+        version = current.version + 1
+        snapshot, delta = None, make_delta(current.content, content)
+        if (
+            current.last_snapshot is None
+            or version - current.last_snapshot >= self.snapshot_interval
+            or len(delta) >= len(content.encode())
+        ):
+            snapshot, delta = content, None
+        versioned = (
+            insert(PromptVersionTable)
+            .values(
+                prompt_id=prid, version=version, name=name, variables=variables or [],
+                snapshot=snapshot, delta=delta, created_at=now
+            )
+            .cte("versioned")
+        )
+        result = await self.db.execute(
+            update(PromptTable)
+            .where(PromptTable.id == prid)
+            .values(
+                name=name,
+                content=content,
+                variables=variables or [],
+                version=version,
+                updated_at=now
+            )
+            .returning(*PromptTable.__table__.c)
+            .add_cte(versioned)
+            .execution_options(synchronize_session=False)
+        )
+        row = result.one()
         await self.db.commit()
-        await self.db.refresh(row)
         
-        return Prompt(
-            id=str(row.id),
-            project_id=str(row.project_id),
-            name=row.name,
-            content=row.content,
-            version=row.version,
-            created_at=row.created_at,
-            updated_at=row.updated_at
-        )
+        return self._to_prompt(row)
     
-    async def delete(self, prompt_id: str) -> bool:
+    async def delete(self, project_id: str, prompt_id: str, user_id: str) -> bool:
+        pid = uuid.UUID(project_id)
         result = await self.db.execute(
-            select(PromptTable).where(PromptTable.id == uuid.UUID(prompt_id))
+            delete(PromptTable)
+            .where(
+                (PromptTable.id == uuid.UUID(prompt_id)) &
+                (PromptTable.project_id == pid) &
+                self._owned_project(pid, uuid.UUID(user_id))
+            )
+            .returning(PromptTable.id)
+            .execution_options(synchronize_session=False)
         )
-        row = result.scalar_one_or_none()
-        if not row:
-            return False
-        
-        await self.db.delete(row)
+        deleted = result.scalar_one_or_none()
         await self.db.commit()
+        if deleted is None:
+            await self._ensure_project_owned(project_id, user_id)
+            return False
         return True
@@ -1,16 +1,43 @@
+import uuid
+from datetime import datetime
 from typing import Protocol, List
-from app.domain.project import Project, Prompt
+from app.domain.project import Project, ProjectPage, Prompt, PromptPage, RowPage, StoredPromptVersion
 
 class ProjectRepository(Protocol):
     async def create(self, user_id: str, name: str, description: str | None) -> Project: ...
     async def get_by_id(self, project_id: str, user_id: str) -> Project | None: ...
-    async def list_by_user(self, user_id: str) -> List[Project]: ...
+    async def list_by_user(
+        self, user_id: str, limit: int, after: tuple[datetime, uuid.UUID] | None = None
+    ) -> ProjectPage: ...
+    async def list_rows_by_user(
+        self, user_id: str, limit: int, after: tuple[datetime, uuid.UUID] | None = None
+    ) -> RowPage: ...
     async def update(self, project_id: str, user_id: str, name: str, description: str | None) -> Project | None: ...
     async def delete(self, project_id: str, user_id: str) -> bool: ...
 
 class PromptRepository(Protocol):
-    async def create(self, project_id: str, name: str, content: str) -> Prompt: ...
+    """Prompt methods check project ownership and raise ProjectNotFoundError"""
+    async def create(
+        self, project_id: str, user_id: str, name: str, content: str, variables: List[str] | None = None
+    ) -> Prompt: ...
     async def get_by_id(self, prompt_id: str) -> Prompt | None: ...
-    async def list_by_project(self, project_id: str) -> List[Prompt]: ...
-    async def update(self, prompt_id: str, name: str, content: str) -> Prompt | None: ...
-    async def delete(self, prompt_id: str) -> bool: ...
+    async def get(self, project_id: str, prompt_id: str, user_id: str) -> Prompt | None: ...
+    async def get_version_chain(
+        self, project_id: str, prompt_id: str, user_id: str, version: int, after: int | None = None
+    ) -> List[StoredPromptVersion] | None: ...
+    async def list_by_project(
+        self, project_id: str, user_id: str, limit: int, after: tuple[datetime, uuid.UUID] | None = None
+    ) -> PromptPage: ...
+    async def list_rows_by_project(
+        self, project_id: str, user_id: str, limit: int, after: tuple[datetime, uuid.UUID] | None = None
+    ) -> RowPage: ...
+    async def update(
+        self,
+        project_id: str,
+        prompt_id: str,
+        user_id: str,
+        name: str,
+        content: str,
+        variables: List[str] | None = None
+    ) -> Prompt | None: ...
+    async def delete(self, project_id: str, prompt_id: str, user_id: str) -> bool: ...
@@ -1,10 +1,29 @@
-from fastapi import APIRouter, Depends, HTTPException
-from app.schemas.project import ProjectCreate, ProjectUpdate, ProjectResponse, PromptCreate, PromptUpdate, PromptResponse
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, Response
+from app.domain.project import ProjectNotFoundError, PromptTemplateError, RowPage
+from app.schemas.project import (
+    ProjectCreate, ProjectUpdate, ProjectResponse, PromptCreate, PromptUpdate, PromptResponse,
+    PromptRenderRequest, PromptVersionResponse, RenderedPromptResponse
+)
 from app.services.project_service import ProjectService, PromptService
 from app.utils.dependencies import get_current_user, get_project_service, get_prompt_service
+from app.utils.json_stream import StreamFormat, stream_rows
+from app.utils.pagination import encode_cursor, decode_cursor
 
 router = APIRouter(prefix="/projects", tags=["Projects"])
 
+def _decode_after(after: str | None):
+    try:
+        return decode_cursor(after) if after else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def _stream_page(page: RowPage, fmt: StreamFormat):
+    headers = {}
+    if page.has_more:
+        last = page.rows[-1]
+        headers["X-Next-Cursor"] = encode_cursor(last.created_at, last.id)
+    return stream_rows(page.columns, page.rows, fmt, headers)
+
 @router.post("", response_model=ProjectResponse)
 async def create_project(
     req: ProjectCreate,
@@ -23,10 +42,23 @@ async def create_project(
 
 @router.get("", response_model=list[ProjectResponse])
 async def list_projects(
+    response: Response,
+    limit: int = Query(100, ge=1, le=500),
+    after: str | None = Query(None, description="Cursor from the previous page's X-Next-Cursor header"),
+    stream: StreamFormat | None = Query(
+        None, description="Stream rows straight from the DB as a JSON array ('json') or NDJSON ('ndjson')"
+    ),
     current_user: str = Depends(get_current_user),
     service: ProjectService = Depends(get_project_service)
 ):
-    projects = await service.list_projects(current_user)
+    if stream is not None:
+        rows = await service.list_project_rows(current_user, limit, _decode_after(after))
+        return _stream_page(rows, stream)
+    
+    page = await service.list_projects(current_user, limit, _decode_after(after))
+    if page.has_more:
+        last = page.projects[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor(last.created_at, last.id)
     return [
         ProjectResponse(
             id=p.id,
@@ -36,7 +68,7 @@ async def list_projects(
             created_at=p.created_at,
             updated_at=p.updated_at
         )
-        for p in projects
+        for p in page.projects
     ]
 
 @router.get("/{project_id}", response_model=ProjectResponse)
@@ -92,21 +124,23 @@ async def create_prompt(
     project_id: str,
     req: PromptCreate,
     current_user: str = Depends(get_current_user),
-    project_service: ProjectService = Depends(get_project_service),
     prompt_service: PromptService = Depends(get_prompt_service)
 ):
-    # Verify project exists and belongs to user
-    project = await project_service.get_project(project_id, current_user)
-    if not project:
+    # Project ownership is checked inside the insert statement
+    try:
+        prompt = await prompt_service.create_prompt(project_id, current_user, req.name, req.content, req.variables)
+    except ProjectNotFoundError:
         raise HTTPException(status_code=404, detail="Project not found")
+    except PromptTemplateError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    prompt = await prompt_service.create_prompt(project_id, req.name, req.content)
     return PromptResponse(
         id=prompt.id,
         project_id=prompt.project_id,
         name=prompt.name,
         content=prompt.content,
         version=prompt.version,
+        variables=prompt.variables,
         created_at=prompt.created_at,
         updated_at=prompt.updated_at
     )
@@ -114,16 +148,27 @@ async def create_prompt(
 @router.get("/{project_id}/prompts", response_model=list[PromptResponse])
 async def list_prompts(
     project_id: str,
+    response: Response,
+    limit: int = Query(100, ge=1, le=500),
+    after: str | None = Query(None, description="Cursor from the previous page's X-Next-Cursor header"),
+    stream: StreamFormat | None = Query(
+        None, description="Stream rows straight from the DB as a JSON array ('json') or NDJSON ('ndjson')"
+    ),
     current_user: str = Depends(get_current_user),
-    project_service: ProjectService = Depends(get_project_service),
     prompt_service: PromptService = Depends(get_prompt_service)
 ):
-    # Verify project exists and belongs to user
-    project = await project_service.get_project(project_id, current_user)
-    if not project:
+    # Project ownership is checked in the same query that reads the page
+    try:
+        if stream is not None:
+            rows = await prompt_service.list_prompt_rows(project_id, current_user, limit, _decode_after(after))
+            return _stream_page(rows, stream)
+        page = await prompt_service.list_prompts(project_id, current_user, limit, _decode_after(after))
+    except ProjectNotFoundError:
         raise HTTPException(status_code=404, detail="Project not found")
     
-    prompts = await prompt_service.list_prompts(project_id)
+    if page.has_more:
+        last = page.prompts[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor(last.created_at, last.id)
     return [
         PromptResponse(
             id=p.id,
@@ -131,10 +176,11 @@ async def list_prompts(
             name=p.name,
             content=p.content,
             version=p.version,
+            variables=p.variables,
             created_at=p.created_at,
             updated_at=p.updated_at
         )
-        for p in prompts
+        for p in page.prompts
     ]
 
 @router.put("/{project_id}/prompts/{prompt_id}", response_model=PromptResponse)
@@ -143,15 +189,16 @@ async def update_prompt(
     prompt_id: str,
     req: PromptUpdate,
     current_user: str = Depends(get_current_user),
-    project_service: ProjectService = Depends(get_project_service),
     prompt_service: PromptService = Depends(get_prompt_service)
 ):
-    # Verify project exists and belongs to user
-    project = await project_service.get_project(project_id, current_user)
-    if not project:
+    try:
+        prompt = await prompt_service.update_prompt(
+            project_id, prompt_id, current_user, req.name, req.content, req.variables
+        )
+    except ProjectNotFoundError:
         raise HTTPException(status_code=404, detail="Project not found")
-    
-    prompt = await prompt_service.update_prompt(prompt_id, req.name, req.content)
+    except PromptTemplateError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     if not prompt:
         raise HTTPException(status_code=404, detail="Prompt not found")
     
@@ -161,24 +208,71 @@ async def update_prompt(
         name=prompt.name,
         content=prompt.content,
         version=prompt.version,
+        variables=prompt.variables,
         created_at=prompt.created_at,
         updated_at=prompt.updated_at
     )
 
+@router.get("/{project_id}/prompts/{prompt_id}/versions/{version}", response_model=PromptVersionResponse)
+async def get_prompt_version(
+    project_id: str,
+    prompt_id: str,
+    version: int = Path(..., ge=1),
+    current_user: str = Depends(get_current_user),
+    prompt_service: PromptService = Depends(get_prompt_service)
+):
+    """Read a prompt as it was at `version`; past versions are immutable"""
+    try:
+        found = await prompt_service.get_prompt_version(project_id, prompt_id, current_user, version)
+    except ProjectNotFoundError:
+        raise HTTPException(status_code=404, detail="Project not found")
+    if not found:
+        raise HTTPException(status_code=404, detail="Prompt version not found")
+    
+    return PromptVersionResponse(
+        prompt_id=found.prompt_id,
+        version=found.version,
+        name=found.name,
+        content=found.content,
+        variables=found.variables,
+        created_at=found.created_at
+    )
+
+@router.post("/{project_id}/prompts/{prompt_id}/render", response_model=RenderedPromptResponse)
+async def render_prompt(
+    project_id: str,
+    prompt_id: str,
+    req: PromptRenderRequest,
+    current_user: str = Depends(get_current_user),
+    prompt_service: PromptService = Depends(get_prompt_service)
+):
+    """Render the prompt's current version with the given variable values"""
+    try:
+        rendered = await prompt_service.render_prompt(project_id, prompt_id, current_user, req.variables)
+    except ProjectNotFoundError:
+        raise HTTPException(status_code=404, detail="Project not found")
+    except PromptTemplateError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not rendered:
+        raise HTTPException(status_code=404, detail="Prompt not found")
+    
+    return RenderedPromptResponse(
+        prompt_id=rendered.prompt_id,
+        version=rendered.version,
+        content=rendered.content
+    )
+
 @router.delete("/{project_id}/prompts/{prompt_id}")
 async def delete_prompt(
     project_id: str,
     prompt_id: str,
     current_user: str = Depends(get_current_user),
-    project_service: ProjectService = Depends(get_project_service),
     prompt_service: PromptService = Depends(get_prompt_service)
 ):
-    # Verify project exists and belongs to user
-    project = await project_service.get_project(project_id, current_user)
-    if not project:
+    try:
+        success = await prompt_service.delete_prompt(project_id, prompt_id, current_user)
+    except ProjectNotFoundError:
         raise HTTPException(status_code=404, detail="Project not found")
-    
-    success = await prompt_service.delete_prompt(prompt_id)
     if not success:
         raise HTTPException(status_code=404, detail="Prompt not found")
     
@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional
+from typing import Dict, List, Optional
 
 class ProjectCreate(BaseModel):
     name: str
@@ -21,10 +21,12 @@ class ProjectResponse(BaseModel):
 class PromptCreate(BaseModel):
     name: str
     content: str
+    variables: List[str] = []  # names usable as {{name}} in content
 
 class PromptUpdate(BaseModel):
     name: str
     content: str
+    variables: List[str] = []
 
 class PromptResponse(BaseModel):
     id: str
@@ -32,5 +34,22 @@ class PromptResponse(BaseModel):
     name: str
     content: str
     version: int
+    variables: List[str]
     created_at: datetime
     updated_at: datetime
+
+class PromptVersionResponse(BaseModel):
+    prompt_id: str
+    version: int
+    name: str
+    content: str
+    variables: List[str]
+    created_at: datetime
+
+class PromptRenderRequest(BaseModel):
+    variables: Dict[str, str] = {}
+
+class RenderedPromptResponse(BaseModel):
+    prompt_id: str
+    version: int
+    content: str
@@ -1,6 +1,10 @@
-from typing import List
-from app.domain.project import Project, Prompt
+import uuid
+from datetime import datetime
+from typing import List, Mapping
+from app.domain.project import Project, ProjectPage, Prompt, PromptPage, PromptVersion, RenderedPrompt, RowPage
 from app.repositories.project_repository import ProjectRepository, PromptRepository
+from app.services.prompt_history import PromptVersionCache, rebuild
+from app.services.prompt_templates import TemplateCache, check_variables, compile_template
 
 class ProjectService:
     def __init__(self, project_repo: ProjectRepository, prompt_repo: PromptRepository):
@@ -13,8 +17,15 @@ class ProjectService:
     async def get_project(self, project_id: str, user_id: str) -> Project | None:
         return await self.project_repo.get_by_id(project_id, user_id)
     
-    async def list_projects(self, user_id: str) -> List[Project]:
-        return await self.project_repo.list_by_user(user_id)
+    async def list_projects(
+        self, user_id: str, limit: int, after: tuple[datetime, uuid.UUID] | None = None
+    ) -> ProjectPage:
+        return await self.project_repo.list_by_user(user_id, limit, after)
+    
+    async def list_project_rows(
+        self, user_id: str, limit: int, after: tuple[datetime, uuid.UUID] | None = None
+    ) -> RowPage:
+        return await self.project_repo.list_rows_by_user(user_id, limit, after)
     
     async def update_project(self, project_id: str, user_id: str, name: str, description: str | None) -> Project | None:
         return await self.project_repo.update(project_id, user_id, name, description)
@@ -23,20 +34,87 @@ class ProjectService:
         return await self.project_repo.delete(project_id, user_id)
 
 class PromptService:
-    def __init__(self, prompt_repo: PromptRepository):
+    def __init__(
+        self,
+        prompt_repo: PromptRepository,
+        templates: TemplateCache | None = None,
+        versions: PromptVersionCache | None = None
+    ):
         self.prompt_repo = prompt_repo
+        self.templates = templates or TemplateCache(0)
+        self.versions = versions or PromptVersionCache(0)
     
-    async def create_prompt(self, project_id: str, name: str, content: str) -> Prompt:
-        return await self.prompt_repo.create(project_id, name, content)
+    async def create_prompt(
+        self, project_id: str, user_id: str, name: str, content: str, variables: List[str] | None = None
+    ) -> Prompt:
+        """Raises PromptTemplateError if `content` uses a variable that is not declared"""
+        variables = check_variables(variables or [])
+        compile_template(content, variables)
+        return await self.prompt_repo.create(project_id, user_id, name, content, variables)
     
     async def get_prompt(self, prompt_id: str) -> Prompt | None:
         return await self.prompt_repo.get_by_id(prompt_id)
     
-    async def list_prompts(self, project_id: str) -> List[Prompt]:
-        return await self.prompt_repo.list_by_project(project_id)
+    async def list_prompts(
+        self, project_id: str, user_id: str, limit: int, after: tuple[datetime, uuid.UUID] | None = None
+    ) -> PromptPage:
+        return await self.prompt_repo.list_by_project(project_id, user_id, limit, after)
+    
+    async def list_prompt_rows(
+        self, project_id: str, user_id: str, limit: int, after: tuple[datetime, uuid.UUID] | None = None
+    ) -> RowPage:
+        return await self.prompt_repo.list_rows_by_project(project_id, user_id, limit, after)
+    
+    async def update_prompt(
+        self,
+        project_id: str,
+        prompt_id: str,
+        user_id: str,
+        name: str,
+        content: str,
+        variables: List[str] | None = None
+    ) -> Prompt | None:
+        variables = check_variables(variables or [])
+        compile_template(content, variables)
+        prompt = await self.prompt_repo.update(project_id, prompt_id, user_id, name, content, variables)
+        self.templates.invalidate(prompt_id)
+        return prompt
     
-    async def update_prompt(self, prompt_id: str, name: str, content: str) -> Prompt | None:
-        return await self.prompt_repo.update(prompt_id, name, content)
+    async def delete_prompt(self, project_id: str, prompt_id: str, user_id: str) -> bool:
+        deleted = await self.prompt_repo.delete(project_id, prompt_id, user_id)
+        self.templates.invalidate(prompt_id)
+        if deleted:
+            self.versions.invalidate(prompt_id)
+        return deleted
+    
+    async def get_prompt_version(
+        self, project_id: str, prompt_id: str, user_id: str, version: int
+    ) -> PromptVersion | None:
+        """Rebuild a past (or the current) version from its snapshot and deltas.
+
+        Only the history rows after the nearest cached version (or the
+        nearest snapshot) are read; ownership is checked on every call.
+        """
+        base = self.versions.nearest(prompt_id, version)
+        chain = await self.prompt_repo.get_version_chain(
+            project_id, prompt_id, user_id, version, base.version if base else None
+        )
+        if chain is None:
+            return None
+        if chain and chain[0].snapshot is not None:
+            base = None
+        rebuilt = rebuild(prompt_id, base, chain)
+        if rebuilt is None or rebuilt.version != version:
+            return None
+        self.versions.put(rebuilt)
+        return rebuilt
     
-    async def delete_prompt(self, prompt_id: str) -> bool:
-        return await self.prompt_repo.delete(prompt_id)
+    async def render_prompt(
+        self, project_id: str, prompt_id: str, user_id: str, values: Mapping[str, str]
+    ) -> RenderedPrompt | None:
+        """Fill the prompt's current version with `values`; the compiled template is cached per version"""
+        prompt = await self.prompt_repo.get(project_id, prompt_id, user_id)
+        if prompt is None:
+            return None
+        content = self.templates.get(prompt).render(values)
+        return RenderedPrompt(prompt_id=prompt.id, version=prompt.version, content=content)
@@ -0,0 +1,68 @@
+from collections import OrderedDict
+from typing import Sequence, Tuple
+from app.core.text_delta import apply_delta
+from app.domain.project import PromptVersion, StoredPromptVersion
+
+class PromptVersionCache:
+    """Bounded LRU of reconstructed prompt versions, keyed by `(prompt_id, version)`.
+
+    Versions are immutable, so entries never go stale; a hit also serves as
+    the starting point for rebuilding a later version of the same prompt.
+    """
+
+    def __init__(self, max_entries: int, search_window: int = 20):
+        self.max_entries = max_entries
+        self.search_window = search_window
+        self._entries: "OrderedDict[Tuple[str, int], PromptVersion]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def nearest(self, prompt_id: str, version: int) -> PromptVersion | None:
+        """The cached version closest to `version` from below (within `search_window`)"""
+        for candidate in range(version, max(version - self.search_window, 0), -1):
+            entry = self._entries.get((prompt_id, candidate))
+            if entry is not None:
+                self._entries.move_to_end((prompt_id, candidate))
+                if candidate == version:
+                    self.hits += 1
+                return entry
+        self.misses += 1
+        return None
+
+    def put(self, entry: PromptVersion) -> None:
+        if self.max_entries <= 0:
+            return
+        key = (entry.prompt_id, entry.version)
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, prompt_id: str) -> None:
+        for key in [key for key in self._entries if key[0] == prompt_id]:
+            del self._entries[key]
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+def rebuild(
+    prompt_id: str, base: PromptVersion | None, chain: Sequence[StoredPromptVersion]
+) -> PromptVersion | None:
+    """Replay `chain` (oldest first) on top of `base`; None if it cannot be rebuilt"""
+    current = base
+    for stored in chain:
+        if stored.snapshot is not None:
+            content = stored.snapshot
+        elif current is not None and current.version == stored.version - 1:
+            content = apply_delta(current.content, stored.delta)
+        else:
+            return None  # history before this delta is missing
+        current = PromptVersion(
+            prompt_id=prompt_id,
+            version=stored.version,
+            name=stored.name,
+            content=content,
+            variables=stored.variables,
+            created_at=stored.created_at
+        )
+    return current
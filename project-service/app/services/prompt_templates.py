@@ -0,0 +1,96 @@
+import re
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Iterable, List, Mapping, Tuple
+from app.domain.project import Prompt, PromptTemplateError
+
+# `{{name}}`, optionally padded with spaces; any other braces are literal text
+PLACEHOLDER = re.compile(r"\{\{\s*([A-Za-z_][A-Za-z0-9_]*)\s*\}\}")
+VARIABLE_NAME = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+MAX_VARIABLE_NAME_LENGTH = 100  # prompts.variables is VARCHAR(100)[]
+
+@dataclass(frozen=True)
+class CompiledTemplate:
+    """A template split once into literal chunks and the placeholders between them"""
+    chunks: Tuple[str, ...]  # len(names) + 1 literal pieces
+    names: Tuple[str, ...]  # placeholder filled in after chunks[i]
+    variables: frozenset  # declared variables; all must be given to render
+
+    def render(self, values: Mapping[str, str]) -> str:
+        missing = self.variables.difference(values)
+        if missing:
+            raise PromptTemplateError(f"Missing values for variables: {', '.join(sorted(missing))}")
+        unknown = set(values).difference(self.variables)
+        if unknown:
+            raise PromptTemplateError(f"Unknown variables: {', '.join(sorted(unknown))}")
+        if not self.names:
+            return self.chunks[0]
+        parts = [self.chunks[0]]
+        for name, chunk in zip(self.names, self.chunks[1:]):
+            parts.append(values[name])
+            parts.append(chunk)
+        return "".join(parts)
+
+def check_variables(variables: Iterable[str]) -> List[str]:
+    """Validate declared variable names; returns them de-duplicated in declaration order"""
+    seen: dict[str, None] = {}
+    for name in variables:
+        if not VARIABLE_NAME.fullmatch(name):
+            raise PromptTemplateError(f"Invalid variable name: {name!r}")
+        if len(name) > MAX_VARIABLE_NAME_LENGTH:
+            raise PromptTemplateError(f"Variable name is longer than {MAX_VARIABLE_NAME_LENGTH} characters")
+        seen[name] = None
+    return list(seen)
+
+def compile_template(content: str, variables: Iterable[str]) -> CompiledTemplate:
+    """Split `content` at its placeholders; each must be a declared variable"""
+    declared = frozenset(check_variables(variables))
+    chunks: List[str] = []
+    names: List[str] = []
+    position = 0
+    for match in PLACEHOLDER.finditer(content):
+        name = match.group(1)
+        if name not in declared:
+            raise PromptTemplateError(f"Undeclared variable in template: {name}")
+        chunks.append(content[position:match.start()])
+        names.append(name)
+        position = match.end()
+    chunks.append(content[position:])
+    return CompiledTemplate(chunks=tuple(chunks), names=tuple(names), variables=declared)
+
+class TemplateCache:
+    """Bounded LRU of compiled templates, one entry per prompt.
+
+    An entry is only used for the prompt version it was compiled from, so a
+    template is compiled once per `(prompt_id, version)`; a newer version
+    replaces the old entry. Updates and deletes also drop it explicitly so
+    stale templates do not hold memory until they are evicted.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[int, CompiledTemplate]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, prompt: Prompt) -> CompiledTemplate:
+        entry = self._entries.get(prompt.id)
+        if entry is not None and entry[0] == prompt.version:
+            self.hits += 1
+            self._entries.move_to_end(prompt.id)
+            return entry[1]
+
+        self.misses += 1
+        template = compile_template(prompt.content, prompt.variables)
+        if self.max_entries > 0:
+            self._entries[prompt.id] = (prompt.version, template)
+            self._entries.move_to_end(prompt.id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return template
+
+    def invalidate(self, prompt_id: str) -> None:
+        self._entries.pop(prompt_id, None)
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
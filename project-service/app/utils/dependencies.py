@@ -2,17 +2,54 @@ from fastapi import Depends, HTTPException, Header
 from sqlalchemy.ext.asyncio import AsyncSession
 import httpx
 import os
+from app.core.config import settings
 from app.core.database import get_db
+from app.core.http_client import get_auth_http_client
 from app.core.security import verify_token
+from app.core.token_cache import TokenCache
 from app.repositories.postgres_project_repo import PostgresProjectRepository, PostgresPromptRepository
 from app.services.project_service import ProjectService, PromptService
+from app.services.prompt_history import PromptVersionCache
+from app.services.prompt_templates import TemplateCache
 
 # Auth service URL from environment
 AUTH_SERVICE_URL = os.getenv("AUTH_SERVICE_URL", "https://omnirouter-auth1.onrender.com")
 USE_LOCAL_AUTH = os.getenv("USE_LOCAL_AUTH", "false").lower() == "true"
 
+token_cache = TokenCache(settings.TOKEN_CACHE_MAX_ENTRIES, settings.TOKEN_CACHE_TTL_SECONDS)
+template_cache = TemplateCache(settings.PROMPT_TEMPLATE_CACHE_MAX_ENTRIES)
+version_cache = PromptVersionCache(
+    settings.PROMPT_VERSION_CACHE_MAX_ENTRIES, settings.PROMPT_VERSION_SNAPSHOT_INTERVAL
+)
+
+def _verify_locally(token: str) -> str:
+    user_id = verify_token(token)
+    if not user_id:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    return user_id
+
+async def _validate_with_auth_service(authorization: str, token: str) -> tuple[str, float | None]:
+    """Call the auth service to validate a token, falling back to local verification"""
+    try:
+        response = await get_auth_http_client().get(
+            f"{AUTH_SERVICE_URL}/auth/validate",
+            headers={"Authorization": authorization}
+        )
+    except httpx.RequestError:
+        # Auth service unavailable, fallback to local validation
+        return _verify_locally(token), None
+    
+    if response.status_code == 200:
+        data = response.json()
+        return data["user_id"], data.get("exp")
+    elif response.status_code == 404:
+        # Auth service doesn't have validate endpoint yet, fallback to local
+        return _verify_locally(token), None
+    else:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
 async def get_current_user(authorization: str = Header(None)) -> str:
-    """Validate token by calling auth service, with local fallback."""
+    """Validate token by calling auth service (cached per token), with local fallback."""
     if not authorization:
         raise HTTPException(status_code=401, detail="Missing authorization header")
     
@@ -24,46 +61,24 @@ async def get_current_user(authorization: str = Header(None)) -> str:
     except ValueError:
         raise HTTPException(status_code=401, detail="Invalid authorization header format")
     
-    # Use local validation if configured or as fallback
+    # Use local validation if configured
     if USE_LOCAL_AUTH:
-        user_id = verify_token(token)
-        if not user_id:
-            raise HTTPException(status_code=401, detail="Invalid token")
-        return user_id
+        return _verify_locally(token)
     
-    # Call auth service to validate token
     try:
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            response = await client.get(
-                f"{AUTH_SERVICE_URL}/auth/validate",
-                headers={"Authorization": authorization}
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                return data["user_id"]
-            elif response.status_code == 404:
-                # Auth service doesn't have validate endpoint yet, fallback to local
-                user_id = verify_token(token)
-                if not user_id:
-                    raise HTTPException(status_code=401, detail="Invalid token")
-                return user_id
-            else:
-                raise HTTPException(status_code=401, detail="Invalid token")
-    except httpx.RequestError:
-        # Auth service unavailable, fallback to local validation
-        user_id = verify_token(token)
-        if not user_id:
-            raise HTTPException(status_code=401, detail="Invalid token")
-        return user_id
-    except Exception as e:
+        return await token_cache.get_or_validate(
+            token, lambda: _validate_with_auth_service(authorization, token)
+        )
+    except HTTPException:
+        raise
+    except Exception:
         raise HTTPException(status_code=401, detail="Token validation failed")
 
 def get_project_service(db: AsyncSession = Depends(get_db)) -> ProjectService:
     project_repo = PostgresProjectRepository(db)
-    prompt_repo = PostgresPromptRepository(db)
+    prompt_repo = PostgresPromptRepository(db, settings.PROMPT_VERSION_SNAPSHOT_INTERVAL)
     return ProjectService(project_repo, prompt_repo)
 
 def get_prompt_service(db: AsyncSession = Depends(get_db)) -> PromptService:
-    prompt_repo = PostgresPromptRepository(db)
-    return PromptService(prompt_repo)
+    prompt_repo = PostgresPromptRepository(db, settings.PROMPT_VERSION_SNAPSHOT_INTERVAL)
+    return PromptService(prompt_repo, template_cache, version_cache)
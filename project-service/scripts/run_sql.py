@@ -0,0 +1,67 @@
+"""Apply a SQL migration file statement by statement (autocommit).
+
+Usage: python scripts/run_sql.py sql/add_listing_indexes.sql
+"""
+import os
+import sys
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+try:
+    import psycopg2
+except ImportError:
+    print("psycopg2 is not installed. Install dependencies from requirements.txt")
+    sys.exit(1)
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+# Load .env from common locations (project root or app/core)
+env_candidates = [BASE_DIR / ".env", BASE_DIR / "app" / "core" / ".env"]
+for p in env_candidates:
+    if p.exists():
+        load_dotenv(dotenv_path=str(p))
+        break
+else:
+    load_dotenv()
+
+if len(sys.argv) != 2:
+    print(__doc__)
+    sys.exit(1)
+
+SQL_FILE = Path(sys.argv[1])
+if not SQL_FILE.is_absolute():
+    SQL_FILE = BASE_DIR / SQL_FILE
+
+DATABASE_URL = os.environ.get("DATABASE_URL")
+if not DATABASE_URL:
+    print("DATABASE_URL is not set in the environment. Please set it (or create a .env file).")
+    sys.exit(1)
+
+if not SQL_FILE.exists():
+    print(f"SQL file not found: {SQL_FILE}")
+    sys.exit(1)
+
+with open(SQL_FILE, "r", encoding="utf-8") as f:
+    sql_text = f.read()
+
+# Drop comment lines, then split on ';' so each statement runs in its own
+# implicit transaction (required for CREATE INDEX CONCURRENTLY)
+lines = [line for line in sql_text.splitlines() if not line.strip().startswith("--")]
+statements = [stmt.strip() for stmt in "\n".join(lines).split(";") if stmt.strip()]
+
+print(f"Applying {SQL_FILE.name} ({len(statements)} statements)...")
+conn = None
+try:
+    conn = psycopg2.connect(DATABASE_URL)
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        for stmt in statements:
+            cur.execute(stmt)
+    print("SQL executed successfully.")
+except Exception as e:
+    print("Error executing SQL:", e)
+    sys.exit(1)
+finally:
+    if conn:
+        conn.close()
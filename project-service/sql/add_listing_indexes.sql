@@ -0,0 +1,8 @@
+-- Indexes backing keyset-paginated listings ordered by (created_at, id).
+-- CONCURRENTLY cannot run inside a transaction block: apply with
+-- scripts/run_sql.py, which executes each statement on its own.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_projects_user_created_id
+    ON projects (user_id, created_at, id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_prompts_project_created_id
+    ON prompts (project_id, created_at, id);
@@ -0,0 +1,2 @@
+-- Declared template variables of each prompt; content refers to them as {{name}}.
+ALTER TABLE prompts ADD COLUMN IF NOT EXISTS variables VARCHAR(100)[] NOT NULL DEFAULT '{}';
@@ -0,0 +1,19 @@
+-- Append-only prompt history. Each version stores either a full snapshot
+-- (at least every PROMPT_VERSION_SNAPSHOT_INTERVAL versions) or a
+-- zlib-compressed line delta against the previous version.
+CREATE TABLE IF NOT EXISTS prompt_versions (
+    prompt_id UUID NOT NULL REFERENCES prompts (id) ON DELETE CASCADE,
+    version INTEGER NOT NULL,
+    name VARCHAR(255) NOT NULL,
+    variables VARCHAR(100)[] NOT NULL DEFAULT '{}',
+    snapshot TEXT,
+    delta BYTEA,
+    created_at TIMESTAMP NOT NULL DEFAULT now(),
+    PRIMARY KEY (prompt_id, version)
+);
+
+-- Existing prompts start their history with a snapshot of the current version.
+INSERT INTO prompt_versions (prompt_id, version, name, variables, snapshot, created_at)
+SELECT id, COALESCE(version, 1), name, variables, content, COALESCE(updated_at, now())
+FROM prompts
+ON CONFLICT DO NOTHING;
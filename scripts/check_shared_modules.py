@@ -0,0 +1,51 @@
+"""Check that the modules every service carries a copy of are identical.
+
+Each service is built from its own directory (its Dockerfile copies only
+`app/`), so code they share is kept as one copy per service. Edit the copy
+in `SOURCE`, then propagate it; without `--sync` this only reports copies
+that differ and exits with status 1. Run from the repository root:
+
+    python scripts/check_shared_modules.py [--sync]
+"""
+import argparse
+import filecmp
+import shutil
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+SOURCE = "chat-service"
+SERVICES = ("auth-service", "chat-service", "project-service")
+SHARED = (
+    "app/core/metrics.py",
+    "app/core/tracing.py",
+)
+
+def differing_copies() -> list[tuple[Path, Path]]:
+    """(source, copy) pairs whose copy is missing or not byte-for-byte equal to the source"""
+    stale = []
+    for module in SHARED:
+        source = ROOT / SOURCE / module
+        for service in SERVICES:
+            copy = ROOT / service / module
+            if service != SOURCE and not (copy.exists() and filecmp.cmp(source, copy, shallow=False)):
+                stale.append((source, copy))
+    return stale
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sync", action="store_true", help=f"overwrite the other copies with the one in {SOURCE}")
+    args = parser.parse_args()
+
+    stale = differing_copies()
+    if args.sync:
+        for source, copy in stale:
+            shutil.copyfile(source, copy)
+            print(f"updated {copy.relative_to(ROOT)}")
+        return 0
+    for _, copy in stale:
+        print(f"{copy.relative_to(ROOT)} differs from {SOURCE}; run with --sync after editing the {SOURCE} copy")
+    return 1 if stale else 0
+
+if __name__ == "__main__":
+    sys.exit(main())